@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import (Board, Class, Subject, Teacher, Venue, ExamType, ExamPattern, TeacherAvailability, ExamSchedule)
+from .models import (Board, Class, Subject, Teacher, Venue, ExamType, ExamPattern, TeacherAvailability, ExamSchedule, ScheduleJob, AnswerSubmission, SeatAssignment, VenueBooking, ResultSummary, AssessmentParameter, QuestionPaper)
 
 
 admin.site.register(Board)
@@ -9,7 +9,20 @@ admin.site.register(Teacher)
 admin.site.register(Venue)
 admin.site.register(ExamType)
 admin.site.register(ExamPattern)
-admin.site.register(ExamSchedule)
 admin.site.register(TeacherAvailability)
+admin.site.register(ScheduleJob)
+admin.site.register(AnswerSubmission)
+admin.site.register(SeatAssignment)
+admin.site.register(VenueBooking)
+admin.site.register(ResultSummary)
+admin.site.register(AssessmentParameter)
+admin.site.register(QuestionPaper)
+
+
+@admin.register(ExamSchedule)
+class ExamScheduleAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'date', 'start_time', 'teacher', 'venue')
+    # __str__ reads subject and class_assigned, so join them instead of one query per row
+    list_select_related = ('subject', 'class_assigned', 'teacher', 'venue')
 
 # Register your models here.
@@ -0,0 +1,174 @@
+import threading
+from collections import defaultdict
+from django.db import close_old_connections, transaction
+from django.db.models import Avg, Count, F, Max, Min, Q
+from django.utils import timezone
+from .jobs import get_executor
+from .models import ExamSchedule, ExamResult, ResultSummary
+from .stats import percentile
+
+
+PERCENTILES = (25, 50, 75, 90)
+TOPPERS = 3
+SUMMARY_FIELDS = ['class_assigned', 'subject', 'students', 'passed', 'average', 'highest', 'lowest',
+                  'grade_distribution', 'percentiles', 'toppers']
+
+_refreshing = set()   # exams with a background refresh queued in this process
+_refreshing_lock = threading.Lock()
+
+
+def mark_stale(exam_schedule_ids):
+    """
+    Flag the summaries of exams whose results just changed.
+
+    This is all a result write pays: one UPDATE, plus one insert the first time an exam
+    gets results. The statistics are recomputed in the background after the next read,
+    or by a rebuild. Bumping the version keeps a refresh that is already running from
+    clearing the flag with statistics computed before this write.
+    """
+    exam_schedule_ids = set(exam_schedule_ids)
+    if not exam_schedule_ids:
+        return
+    flagged = ResultSummary.objects.filter(exam_schedule_id__in=exam_schedule_ids).update(
+        stale=True, version=F('version') + 1)
+    if flagged < len(exam_schedule_ids):
+        ResultSummary.objects.bulk_create([
+            ResultSummary(exam_schedule_id=exam_id, class_assigned_id=class_id, subject_id=subject_id)
+            for exam_id, class_id, subject_id in ExamSchedule.objects.filter(
+                id__in=exam_schedule_ids).values_list('id', 'class_assigned_id', 'subject_id')
+        ], ignore_conflicts=True)
+
+
+def refresh_summaries(exam_schedule_ids):
+    """
+    Recompute the summaries of these exams from their results and store them.
+
+    The statistics take three queries for any number of exams. Each stored summary is
+    then updated only if its version is still the one read before computing, so a
+    result written meanwhile leaves the row stale for the next refresh. Returns the
+    computed summaries.
+    """
+    exam_schedule_ids = set(exam_schedule_ids)
+    if not exam_schedule_ids:
+        return []
+    versions = dict(ResultSummary.objects.filter(
+        exam_schedule_id__in=exam_schedule_ids).values_list('exam_schedule_id', 'version'))
+    summaries = compute_summaries(exam_schedule_ids)
+
+    now = timezone.now()
+    with transaction.atomic():
+        for summary in summaries:
+            if summary.exam_schedule_id in versions:
+                # update() skips auto_now, so updated_at is set by hand
+                ResultSummary.objects.filter(
+                    exam_schedule_id=summary.exam_schedule_id, version=versions[summary.exam_schedule_id]
+                ).update(stale=False, updated_at=now,
+                         **{field: getattr(summary, field) for field in SUMMARY_FIELDS})
+        # A summary created meanwhile by mark_stale wins, it is newer than these numbers
+        ResultSummary.objects.bulk_create(
+            [summary for summary in summaries if summary.exam_schedule_id not in versions], ignore_conflicts=True)
+    return summaries
+
+
+def compute_summaries(exam_schedule_ids):
+    """Unsaved summaries of these exams built from their results"""
+    results = ExamResult.objects.filter(exam_schedule_id__in=exam_schedule_ids)
+
+    totals = {
+        row['exam_schedule_id']: row
+        for row in results.values('exam_schedule_id').annotate(
+            students=Count('id'),
+            passed=Count('id', filter=Q(marks_obtained__gte=F('exam_schedule__passing_marks'))),
+            average=Avg('marks_obtained'),
+            highest=Max('marks_obtained'),
+            lowest=Min('marks_obtained'))
+    }
+
+    grades = defaultdict(dict)
+    for exam_id, grade, count in results.values_list('exam_schedule_id', 'graded_scale__name').annotate(Count('id')):
+        grades[exam_id][grade] = count
+
+    # Ordered best first, so the toppers are the head of each exam's run
+    marks = defaultdict(list)
+    toppers = defaultdict(list)
+    for exam_id, score, student_id, name in results.order_by(
+            'exam_schedule_id', '-marks_obtained', 'student__student_id'
+    ).values_list('exam_schedule_id', 'marks_obtained', 'student__student_id', 'student__name'):
+        marks[exam_id].append(score)
+        if len(toppers[exam_id]) < TOPPERS:
+            toppers[exam_id].append({'student_id': student_id, 'name': name, 'marks': score})
+
+    summaries = []
+    for exam_id, class_id, subject_id in ExamSchedule.objects.filter(
+            id__in=exam_schedule_ids).values_list('id', 'class_assigned_id', 'subject_id'):
+        row = totals.get(exam_id, {})
+        ascending = marks[exam_id][::-1]
+        summaries.append(ResultSummary(
+            exam_schedule_id=exam_id, class_assigned_id=class_id, subject_id=subject_id,
+            students=row.get('students', 0), passed=row.get('passed', 0), average=row.get('average'),
+            highest=row.get('highest'), lowest=row.get('lowest'), grade_distribution=grades[exam_id],
+            percentiles={f'p{p}': percentile(ascending, p / 100) for p in PERCENTILES} if ascending else {},
+            toppers=toppers[exam_id], stale=False))
+    return summaries
+
+
+def serve_summaries(summaries):
+    """
+    Serve a summary queryset as stored, one query however many results are behind it.
+    Rows flagged stale are refreshed in the background for the following reads.
+    """
+    summaries = list(summaries)
+    queue_refresh(summary.exam_schedule_id for summary in summaries if summary.stale)
+    return summaries
+
+
+def queue_refresh(exam_schedule_ids):
+    """Hand stale summaries to the worker pool, once per exam while a refresh is pending"""
+    with _refreshing_lock:
+        exam_schedule_ids = set(exam_schedule_ids) - _refreshing
+        _refreshing.update(exam_schedule_ids)
+    if exam_schedule_ids:
+        get_executor().submit(run_refresh, sorted(exam_schedule_ids))
+
+
+def run_refresh(exam_schedule_ids):
+    close_old_connections()
+    try:
+        refresh_summaries(exam_schedule_ids)
+    finally:
+        with _refreshing_lock:
+            _refreshing.difference_update(exam_schedule_ids)
+        close_old_connections()
+
+
+def rebuild_summaries(batch_size=500):
+    """Recompute every summary from scratch, a batch of exams at a time"""
+    ResultSummary.objects.exclude(exam_schedule_id__in=ExamResult.objects.values('exam_schedule_id')).delete()
+    exam_ids = list(ExamResult.objects.values_list('exam_schedule_id', flat=True).distinct().order_by())
+    for start in range(0, len(exam_ids), batch_size):
+        refresh_summaries(exam_ids[start:start + batch_size])
+    return len(exam_ids)
+
+
+def summary_as_dict(summary):
+    return {
+        'exam_schedule_id': summary.exam_schedule_id,
+        'class_id': summary.class_assigned_id,
+        'subject_id': summary.subject_id,
+        'students': summary.students,
+        'passed': summary.passed,
+        'pass_rate': round(summary.passed / summary.students * 100, 2) if summary.students else None,
+        'average': round(summary.average, 2) if summary.average is not None else None,
+        'highest': summary.highest,
+        'lowest': summary.lowest,
+        'grade_distribution': summary.grade_distribution,
+        'percentiles': summary.percentiles,
+        'toppers': summary.toppers,
+        'stale': summary.stale,
+        'updated_at': summary.updated_at.isoformat()
+    }
+
+
+def mark_result_stale(sender, instance, **kwargs):
+    """post_save/post_delete receiver for results written one at a time through the ORM"""
+    mark_stale([instance.exam_schedule_id])
@@ -0,0 +1,150 @@
+from collections import defaultdict
+from time import perf_counter
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from .grading import RESULT_BATCH_SIZE, get_grade_bands, save_results
+from .models import AssessmentParameter, ParameterScore, ExamSchedule, ExamResult, Student
+from .validators import calculate_grace_marks, validate_result_calculation, validate_parameter_weightages
+
+
+def load_weightages():
+    """parameter id -> weightage, rejected unless the rubric adds up to 100"""
+    weightages = dict(AssessmentParameter.objects.values_list('id', 'weightage'))
+    validate_parameter_weightages(weightages)
+    return weightages
+
+
+def record_scores(exam_schedule_id, scores):
+    """
+    Upsert per-parameter scores of one exam and recompute the totals of the students they
+    belong to. Each score is marked out of the exam's total_marks.
+    """
+    exam = ExamSchedule.objects.get(id=exam_schedule_id)
+    weightages = load_weightages()
+    try:
+        # JSON and form bodies may carry ids as strings, the lookups below hold ints
+        scores = [dict(score, student_id=int(score.get('student_id')), parameter_id=int(score.get('parameter_id')))
+                  for score in scores]
+    except (AttributeError, TypeError, ValueError):
+        raise ValidationError("Each score needs an integer student_id and parameter_id")
+    known_students = set(Student.objects.filter(
+        id__in={score['student_id'] for score in scores}).values_list('id', flat=True))
+
+    rows = []
+    for score in scores:
+        student_id, parameter_id, value = score['student_id'], score['parameter_id'], score.get('score')
+        if student_id not in known_students:
+            raise ValidationError(f"Invalid student ID {student_id}")
+        if parameter_id not in weightages:
+            raise ValidationError(f"Invalid assessment parameter {parameter_id}")
+        # bool is an int subclass, but true/false is not a score
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= exam.total_marks:
+            raise ValidationError(f"Score for parameter {parameter_id} must be between 0 and {exam.total_marks}")
+        rows.append(ParameterScore(student_id=student_id, exam_schedule=exam, parameter_id=parameter_id, score=value))
+
+    with transaction.atomic():
+        ParameterScore.objects.bulk_create(
+            rows, update_conflicts=True,
+            unique_fields=['student', 'exam_schedule', 'parameter'], update_fields=['score'])
+        return compute_totals(ParameterScore.objects.filter(
+            exam_schedule=exam, student_id__in={row.student_id for row in rows}), weightages)
+
+
+def compute_totals(parameter_scores, weightages=None):
+    """
+    Turn per-parameter scores into graded ExamResults in one streamed pass.
+
+    The weighted sum is done by the database, one row per student and exam. Students
+    missing a parameter, failing validation or matching no grade band are reported
+    instead of graded, and a rubric result they had before is withdrawn in the same
+    transaction, so a half-marked rubric never leaves a result behind.
+    """
+    started = perf_counter()
+    if weightages is None:
+        weightages = load_weightages()
+    grade_bands = get_grade_bands()
+    exams = {exam.id: exam for exam in ExamSchedule.objects.filter(
+        id__in=parameter_scores.values('exam_schedule_id'))}
+
+    graded = 0
+    incomplete = []
+    invalid = []
+    ungraded = []
+    withdrawn = defaultdict(list)
+    batch = []
+    rows = parameter_scores.values('exam_schedule_id', 'student_id').annotate(
+        weighted=Sum(F('score') * F('parameter__weightage')),
+        parameters=Count('parameter_id')
+    ).order_by('exam_schedule_id', 'student_id').iterator(chunk_size=RESULT_BATCH_SIZE)
+
+    with transaction.atomic():
+        for row in rows:
+            exam_schedule_id, student_id = row['exam_schedule_id'], row['student_id']
+            if row['parameters'] < len(weightages):
+                incomplete.append({'exam_schedule_id': exam_schedule_id, 'student_id': student_id})
+                withdrawn[exam_schedule_id].append(student_id)
+                continue
+
+            exam = exams[exam_schedule_id]
+            total_score = round(row['weighted'] / 100, 2)
+            grace_marks = calculate_grace_marks(student_id, exam_schedule_id, total_score, exam)
+            final_score = total_score + grace_marks
+            try:
+                validate_result_calculation(student_id, exam_schedule_id, final_score, grace_marks, exam)
+            except ValidationError as e:
+                # One bad total is reported, it does not hold back the rest of the batch
+                invalid.append({'exam_schedule_id': exam_schedule_id, 'student_id': student_id,
+                                'error': ' '.join(e.messages)})
+                withdrawn[exam_schedule_id].append(student_id)
+                continue
+
+            grade = grade_bands.lookup(final_score)
+            if grade is None:
+                ungraded.append(student_id)
+                withdrawn[exam_schedule_id].append(student_id)
+                continue
+
+            # Rubric marks are entered by examiners, so these count as manually marked
+            batch.append(ExamResult(student_id=student_id, exam_schedule_id=exam_schedule_id,
+                                    marks_obtained=final_score, graded_scale=grade, is_manual=True,
+                                    from_rubric=True))
+            if len(batch) >= RESULT_BATCH_SIZE:
+                graded += save_results(batch)
+                batch = []
+        graded += save_results(batch)
+
+        # Hand-entered results and graded answer sheets are not the rubric's to withdraw
+        for exam_schedule_id, student_ids in withdrawn.items():
+            for start in range(0, len(student_ids), RESULT_BATCH_SIZE):
+                ExamResult.objects.filter(exam_schedule_id=exam_schedule_id, from_rubric=True,
+                                          student_id__in=student_ids[start:start + RESULT_BATCH_SIZE]).delete()
+
+    return {
+        'students_graded': graded,
+        'incomplete': incomplete,
+        'invalid_students': invalid,
+        'ungraded_students': ungraded,
+        'seconds': round(perf_counter() - started, 4)
+    }
+
+
+def update_weightages(weightages):
+    """
+    Replace the rubric's weightages and recompute every rubric-based total in one batch
+    pass, all in one transaction so results never mix old and new weights.
+    """
+    try:
+        weightages = {int(parameter_id): float(weightage) for parameter_id, weightage in weightages.items()}
+    except (TypeError, ValueError):
+        raise ValidationError("Weightages must map parameter ids to numbers")
+    parameters = list(AssessmentParameter.objects.all())
+    if set(weightages) != {parameter.id for parameter in parameters}:
+        raise ValidationError("A weightage is required for every assessment parameter, and only for those")
+    validate_parameter_weightages(weightages)
+
+    with transaction.atomic():
+        for parameter in parameters:
+            parameter.weightage = weightages[parameter.id]
+        AssessmentParameter.objects.bulk_update(parameters, ['weightage'])
+        return compute_totals(ParameterScore.objects.all(), weightages)
@@ -0,0 +1,146 @@
+import atexit
+import logging
+import threading
+from time import monotonic, sleep
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from .models import AnswerSubmission, Student, StudentAnswer
+
+
+logger = logging.getLogger(__name__)
+
+
+class AnswerBuffer:
+    """
+    Coalesces autosaved answers in memory before they reach the database.
+
+    Answers are kept per (student, exam) with only the last option per question, and
+    flushed as one upsert when too many answers are pending or, from a daemon thread,
+    once the flush interval has passed. A final submit writes the submitted sheet
+    straight away and records an AnswerSubmission row. Every write checks those rows in
+    the same transaction, with the students' rows locked, so a sheet still buffered here
+    or in another worker never overwrites a submitted one.
+    """
+
+    def __init__(self, flush_seconds=5.0, max_pending=500):
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pending_count = 0
+        self._last_flush = monotonic()
+        self._thread = None
+        self._write_lock = threading.Lock()   # keeps a timer flush and a submit in this process apart
+
+    def start(self):
+        """Start the flush thread, once per process"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='answer-autosave', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            sleep(self.flush_seconds)
+            if not self._pending or monotonic() - self._last_flush < self.flush_seconds:
+                continue
+            try:
+                self.flush()
+            except Exception:
+                # The answers were put back, the next tick retries
+                logger.exception("Flushing autosaved answers failed")
+            finally:
+                close_old_connections()
+
+    def add(self, student_id, exam_schedule_id, answers):
+        self.start()
+        with self._lock:
+            sheet = self._pending.setdefault((student_id, exam_schedule_id), {})
+            for answer in answers:
+                question_id = int(answer['question_id'])
+                if question_id not in sheet:
+                    self._pending_count += 1
+                sheet[question_id] = answer['selected_option']
+            due = (self._pending_count >= self.max_pending or
+                   monotonic() - self._last_flush >= self.flush_seconds)
+        return self.flush() if due else 0
+
+    def flush(self, student_id=None, exam_schedule_id=None):
+        """Write pending answers, either everything or one student's sheet"""
+        with self._lock:
+            if student_id is None:
+                sheets, self._pending = self._pending, {}
+                self._pending_count = 0
+                self._last_flush = monotonic()
+            else:
+                sheet = self._pending.pop((student_id, exam_schedule_id), {})
+                self._pending_count -= len(sheet)
+                sheets = {(student_id, exam_schedule_id): sheet} if sheet else {}
+        return self._write(sheets)
+
+    def submit(self, student_id, exam_schedule_id, answers):
+        """
+        Write a final submit now: this worker's buffered answers overlaid with the full
+        sheet sent with the submit. Returns the number of answers written.
+        """
+        with self._lock:
+            sheet = self._pending.pop((student_id, exam_schedule_id), {})
+            self._pending_count -= len(sheet)
+        for answer in answers:
+            sheet[int(answer['question_id'])] = answer['selected_option']
+        return self._write({(student_id, exam_schedule_id): sheet}, final=True)
+
+    def _write(self, sheets, final=False):
+        if not sheets:
+            return 0
+        try:
+            with self._write_lock, transaction.atomic():
+                # Student rows serialise a flush and a submit of the same sheet across workers
+                list(Student.objects.select_for_update().filter(
+                    id__in={student for student, _ in sheets}).order_by('id').values_list('id'))
+                if final:
+                    AnswerSubmission.objects.bulk_create([
+                        AnswerSubmission(student_id=student, exam_schedule_id=exam) for student, exam in sheets
+                    ], ignore_conflicts=True)
+                else:
+                    # Sheets already submitted are dropped, not written over
+                    closed = set(AnswerSubmission.objects.filter(
+                        student_id__in={student for student, _ in sheets},
+                        exam_schedule_id__in={exam for _, exam in sheets}
+                    ).values_list('student_id', 'exam_schedule_id'))
+                    sheets = {key: sheet for key, sheet in sheets.items() if key not in closed}
+
+                rows = [
+                    StudentAnswer(student_id=student, exam_schedule_id=exam, question_id=question_id,
+                                  selected_option=selected_option)
+                    for (student, exam), sheet in sheets.items()
+                    for question_id, selected_option in sheet.items()
+                ]
+                StudentAnswer.objects.bulk_create(
+                    rows,
+                    update_conflicts=True,
+                    unique_fields=['student', 'exam_schedule', 'question'],
+                    update_fields=['selected_option']
+                )
+        except Exception:
+            if not final:
+                self._restore(sheets)
+            raise
+        return len(rows)
+
+    def _restore(self, sheets):
+        # Put unwritten answers back without overwriting anything newer
+        with self._lock:
+            for key, sheet in sheets.items():
+                pending = self._pending.setdefault(key, {})
+                for question_id, selected_option in sheet.items():
+                    if question_id not in pending:
+                        pending[question_id] = selected_option
+                        self._pending_count += 1
+
+
+answer_buffer = AnswerBuffer(
+    flush_seconds=getattr(settings, 'ANSWER_AUTOSAVE_FLUSH_SECONDS', 5.0),
+    max_pending=getattr(settings, 'ANSWER_AUTOSAVE_MAX_PENDING', 500)
+)
+atexit.register(answer_buffer.flush)
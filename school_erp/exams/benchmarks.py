@@ -0,0 +1,250 @@
+import random
+import tracemalloc
+from datetime import date, datetime, time, timedelta
+from time import perf_counter
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+from .grading import invalidate_answer_keys
+from .models import (Board, Class, Subject, Teacher, TeacherAvailability, Venue, ExamType, ExamPattern,
+                     ExamSchedule, Student, Question, GradeScale)
+from .validators import validate_exam_schedule, validate_teacher_availability
+
+
+BATCH_SIZE = 5000
+TERM_START = date(2025, 9, 10)
+NOISE_SECONDS = 0.005   # timing differences below this are never reported
+
+# Synthetic school sizes, from a unit test sized run to a large board's term
+SCALES = {
+    'tiny': dict(boards=1, classes=4, students_per_class=10, teachers=4, venues=3,
+                 exams=12, booked=8, questions=10, days=15),
+    'small': dict(boards=2, classes=20, students_per_class=40, teachers=20, venues=10,
+                  exams=100, booked=60, questions=50, days=30),
+    'medium': dict(boards=4, classes=60, students_per_class=40, teachers=60, venues=30,
+                   exams=400, booked=300, questions=100, days=60),
+    'large': dict(boards=8, classes=150, students_per_class=50, teachers=150, venues=60,
+                  exams=1000, booked=1000, questions=200, days=90),
+}
+
+
+class SyntheticTerm:
+    """
+    A throwaway school generated at one of the SCALES: boards, classes, students,
+    teachers with availability for every day of the term, venues, an already booked
+    timetable, a question bank and the smart-schedule payload for the new exams.
+    """
+
+    def __init__(self, scale='small', seed=42):
+        if scale not in SCALES:
+            raise ValidationError(f"Unknown scale '{scale}', expected one of {sorted(SCALES)}")
+        self.scale = scale
+        self.size = SCALES[scale]
+        self.rng = random.Random(seed)
+        self.user = User(username='benchmark', is_staff=True)
+        self.generate()
+
+    def generate(self):
+        size, rng = self.size, self.rng
+        boards = [Board.objects.create(name=f'Synthetic board {i}') for i in range(size['boards'])]
+        self.classes = Class.objects.bulk_create(
+            [Class(name=f'Class {i}', board=boards[i % len(boards)]) for i in range(size['classes'])])
+        subjects_per_class = -(-size['exams'] // size['classes'])
+        self.subjects = Subject.objects.bulk_create(
+            [Subject(name=f'Subject {i}', code=f'SYN-{board.id}-{i}', board=board)
+             for board in boards for i in range(subjects_per_class)])
+        self.teachers = Teacher.objects.bulk_create([Teacher(name=f'Teacher {i}') for i in range(size['teachers'])])
+        self.venues = Venue.objects.bulk_create(
+            [Venue(name=f'Room {i}', capacity=size['students_per_class'] * 2) for i in range(size['venues'])])
+        self.exam_type = ExamType.objects.create(name=f'Synthetic {self.scale}')
+        self.exam_pattern = ExamPattern.objects.create(name='Synthetic', board=boards[0])
+
+        TeacherAvailability.objects.bulk_create((
+            TeacherAvailability(teacher=teacher, date=TERM_START + timedelta(days=day),
+                                start_time=time(9), end_time=time(17))
+            for teacher in self.teachers for day in range(size['days'])
+        ), batch_size=BATCH_SIZE)
+
+        students = Student.objects.bulk_create((
+            Student(name=f'Student {i}', student_id=f'SYN{self.scale[:1]}{i}',
+                    enrolled_class=self.classes[i % len(self.classes)])
+            for i in range(size['classes'] * size['students_per_class'])
+        ), batch_size=BATCH_SIZE)
+        self.students_by_class = {}
+        for student in students:
+            self.students_by_class.setdefault(student.enrolled_class_id, []).append(student.id)
+
+        self.booked = ExamSchedule.objects.bulk_create([
+            self.exam_row(rng.choice(self.classes), rng.choice(self.subjects),
+                          TERM_START + timedelta(days=rng.randrange(size['days'])), time(rng.choice((9, 13))))
+            for _ in range(size['booked'])
+        ], batch_size=BATCH_SIZE)
+
+        self.exams = []
+        for i in range(size['exams']):
+            klass = self.classes[i % len(self.classes)]
+            subject = self.subjects[(i // len(self.classes)) % len(self.subjects)]
+            self.exams.append({
+                "duration": rng.choice((60, 90, 120)),
+                "students": self.students_by_class[klass.id],
+                "venue_id": rng.choice(self.venues).id,
+                "teacher_id": rng.choice(self.teachers).id,
+                "exam_type_id": self.exam_type.id,
+                "exam_pattern_id": self.exam_pattern.id,
+                "subject_id": subject.id,
+                "class_id": klass.id,
+                "total_marks": 100,
+                "passing_marks": 35
+            })
+
+        # A paper that is being written right now, for the evaluation benchmark
+        self.live_exam = ExamSchedule.objects.bulk_create([
+            self.exam_row(self.classes[0], self.subjects[0], date.today(), time(0, 0), duration=1439)])[0]
+        self.questions = Question.objects.bulk_create([
+            Question(subject=self.subjects[0], text=f'Question {i}', options={'A': '1', 'B': '2', 'C': '3', 'D': '4'},
+                     correct_option=rng.choice('ABCD'), marks=100 / size['questions'])
+            for i in range(size['questions'])
+        ])
+        invalidate_answer_keys(self.subjects[0].id)   # bulk_create sends no post_save
+        if not GradeScale.objects.exists():
+            GradeScale.objects.create(name='Synthetic', min_score=0, max_score=100)
+
+    def exam_row(self, klass, subject, day, start, duration=60):
+        # bulk_create skips save(), so end_time is filled in here
+        return ExamSchedule(exam_type=self.exam_type, exam_pattern=self.exam_pattern, subject=subject,
+                            class_assigned=klass, teacher=self.rng.choice(self.teachers), date=day,
+                            start_time=start, duration_minutes=duration,
+                            end_time=(datetime.combine(day, start) + timedelta(minutes=duration)).time(),
+                            venue=self.rng.choice(self.venues), total_marks=100, passing_marks=35)
+
+    def post(self, view, payload):
+        request = APIRequestFactory().post('/', payload, format='json')
+        force_authenticate(request, user=self.user)
+        response = view(request)
+        if response.status_code != 200:
+            raise ValidationError(f"{view.__name__} answered {response.status_code}: {response.content[:200]}")
+        return response
+
+    def smart_schedule(self, algorithm):
+        from .views import smart_schedule_view
+        return self.post(smart_schedule_view, {
+            'exams': self.exams,
+            'venues': {venue.id: venue.capacity for venue in self.venues},
+            'start_date': TERM_START.isoformat(),
+            'algorithm': algorithm
+        })
+
+    def evaluate_exam(self):
+        from .views import evaluate_exam
+        return self.post(evaluate_exam, {
+            'student_id': self.students_by_class[self.classes[0].id][0],
+            'exam_schedule_id': self.live_exam.id,
+            'answers': [{'question_id': q.id, 'selected_option': self.rng.choice('ABCD')} for q in self.questions]
+        })
+
+    def validators(self):
+        # Re-validate the booked timetable the way ExamSchedule.clean() does on every save
+        for exam in self.booked:
+            try:
+                validate_exam_schedule({'id': exam.id, 'class_assigned': exam.class_assigned_id, 'date': exam.date,
+                                        'start_time': exam.start_time, 'duration_minutes': exam.duration_minutes,
+                                        'venue': exam.venue_id})
+                validate_teacher_availability(exam.teacher_id, exam.date, exam.start_time, exam.duration_minutes)
+            except ValidationError:
+                pass
+
+    def cases(self):
+        return {
+            'smart_schedule_greedy': lambda: self.smart_schedule('greedy'),
+            'smart_schedule_dsatur': lambda: self.smart_schedule('dsatur'),
+            'evaluate_exam': self.evaluate_exam,
+            'validators': self.validators,
+        }
+
+    def cleanup(self):
+        # The rows are rolled back, make sure cached answer keys built from them go too
+        for subject in self.subjects:
+            invalidate_answer_keys(subject.id)
+
+
+def measure(fn, repeat=3):
+    """
+    Best wall time, query count and peak traced memory of fn().
+
+    Every run happens in a savepoint that is rolled back, so repeated runs see the same
+    data. Memory is traced in a run of its own since tracemalloc slows everything down.
+    """
+    timings = []
+    for _ in range(repeat):
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as ctx:
+                started = perf_counter()
+                fn()
+                timings.append(perf_counter() - started)
+            transaction.set_rollback(True)
+
+    with transaction.atomic():
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        transaction.set_rollback(True)
+
+    return {
+        'seconds': round(min(timings), 4),
+        'queries': len(ctx.captured_queries),
+        'peak_memory_kb': round(peak / 1024, 1)
+    }
+
+
+def run_benchmarks(scale='small', repeat=3, seed=42, only=None):
+    """Generate a synthetic term, measure every case and roll all of it back"""
+    with transaction.atomic():
+        started = perf_counter()
+        term = SyntheticTerm(scale, seed)
+        seeded_seconds = perf_counter() - started
+        try:
+            results = {
+                name: measure(case, repeat)
+                for name, case in term.cases().items()
+                if only is None or name in only
+            }
+        finally:
+            term.cleanup()
+            transaction.set_rollback(True)
+
+    return {
+        'scale': scale,
+        'parameters': SCALES[scale],
+        'seed': seed,
+        'seed_seconds': round(seeded_seconds, 2),
+        'results': results
+    }
+
+
+def compare(baseline, current, tolerance=0.5):
+    """
+    Regressions of `current` against a stored baseline of the same scale.
+
+    Any extra query is a regression, since query counts are deterministic. Time and
+    memory only count once they exceed the baseline by more than `tolerance`.
+    """
+    if baseline.get('scale') != current['scale']:
+        raise ValidationError(f"Baseline was recorded at scale '{baseline.get('scale')}', not '{current['scale']}'")
+
+    regressions = []
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        if result['queries'] > before['queries']:
+            regressions.append(f"{name}: {before['queries']} -> {result['queries']} queries")
+        if result['seconds'] > max(before['seconds'] * (1 + tolerance), before['seconds'] + NOISE_SECONDS):
+            regressions.append(f"{name}: {before['seconds']}s -> {result['seconds']}s")
+        if result['peak_memory_kb'] > before['peak_memory_kb'] * (1 + tolerance):
+            regressions.append(f"{name}: peak memory {before['peak_memory_kb']} -> {result['peak_memory_kb']} KB")
+    return regressions
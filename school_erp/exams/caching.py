@@ -0,0 +1,84 @@
+import hashlib
+import threading
+from collections import Counter
+from time import time_ns
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+
+MASTER_DATA_CACHE = getattr(settings, 'MASTER_DATA_CACHE', 'master_data')
+VERSION_CACHE = getattr(settings, 'VERSION_CACHE', 'versions')   # must be shared by every worker
+
+
+def get_version(cache, version_key):
+    # Seeded from the clock so an evicted counter never revives an older cached entry
+    cache.add(version_key, time_ns(), timeout=None)
+    return cache.get(version_key)
+
+
+def bump_version(cache, version_key):
+    # A fresh clock value instead of incr(): the file and database backends increment with
+    # a separate read and write, so two concurrent bumps could land on the same number
+    cache.set(version_key, time_ns(), timeout=None)
+
+
+class CacheStats:
+    """Hit/miss counters per cached model, for monitoring"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def record(self, name, hit):
+        with self._lock:
+            self._counts[(name, 'hits' if hit else 'misses')] += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self._counts)
+        names = sorted({name for name, _ in counts})
+        return {
+            name: {
+                'hits': counts.get((name, 'hits'), 0),
+                'misses': counts.get((name, 'misses'), 0),
+            }
+            for name in names
+        }
+
+
+cache_stats = CacheStats()
+
+
+def model_version_key(model):
+    return f'model-version:{model._meta.label_lower}'
+
+
+def bump_model_version(sender, **kwargs):
+    """post_save/post_delete receiver retiring every cached list of the sender model"""
+    bump_version(caches[MASTER_DATA_CACHE], model_version_key(sender))
+
+
+class CachedListMixin:
+    """
+    Serves list responses of read-mostly viewsets from the master data cache.
+
+    Entries are keyed by the model's version counter and the full request URL, so any
+    save or delete of the model makes every cached page unreachable at once.
+    """
+
+    def list(self, request, *args, **kwargs):
+        cache = caches[MASTER_DATA_CACHE]
+        model = self.get_queryset().model
+        version = get_version(cache, model_version_key(model))
+        url = hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+        key = f'list:{model._meta.label_lower}:v{version}:{url}'
+
+        data = cache.get(key)
+        cache_stats.record(model._meta.label_lower, hit=data is not None)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        cache.set(key, response.data)
+        return response
@@ -0,0 +1,55 @@
+import csv
+import json
+from .models import ExamResult
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+RESULT_COLUMNS = [
+    ('student_id', 'student__student_id'),
+    ('student_name', 'student__name'),
+    ('board', 'exam_schedule__class_assigned__board__name'),
+    ('class', 'exam_schedule__class_assigned__name'),
+    ('subject_code', 'exam_schedule__subject__code'),
+    ('subject', 'exam_schedule__subject__name'),
+    ('exam_type', 'exam_schedule__exam_type__name'),
+    ('exam_date', 'exam_schedule__date'),
+    ('marks_obtained', 'marks_obtained'),
+    ('total_marks', 'exam_schedule__total_marks'),
+    ('grade', 'graded_scale__name'),
+    ('is_manual', 'is_manual'),
+]
+
+
+def result_rows(exam_type_id=None, class_id=None, board_id=None):
+    """Yield joined result tuples straight from the cursor, a chunk at a time"""
+    results = ExamResult.objects.all()
+    if exam_type_id:
+        results = results.filter(exam_schedule__exam_type_id=exam_type_id)
+    if class_id:
+        results = results.filter(exam_schedule__class_assigned_id=class_id)
+    if board_id:
+        results = results.filter(exam_schedule__class_assigned__board_id=board_id)
+    return results.order_by('id').values_list(
+        *[lookup for _, lookup in RESULT_COLUMNS]
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the csv writer"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows, names=None):
+    writer = csv.writer(Echo())
+    yield writer.writerow(names or [name for name, _ in RESULT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_jsonl(rows, names=None):
+    names = names or [name for name, _ in RESULT_COLUMNS]
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), default=str) + '\n'
@@ -0,0 +1,209 @@
+import threading
+from bisect import bisect_right
+from itertools import groupby
+from datetime import datetime, timedelta
+from time import perf_counter
+from django.core.cache import cache, caches
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from .analytics import mark_stale, refresh_summaries
+from .caching import VERSION_CACHE, get_version, bump_version
+from .models import Question, PaperQuestion, ExamSchedule, StudentAnswer, ExamResult, GradeScale
+from .validators import calculate_grace_marks, validate_result_calculation
+
+
+RESULT_BATCH_SIZE = 1000
+GRADE_BAND_TOLERANCE = 0.01   # largest allowed step between one band's max and the next min
+ANSWER_KEY_GRACE_SECONDS = 300   # keep answer keys around for late submits after an exam ends
+
+
+def load_answer_key(questions):
+    """Fetch the answer key in one query: question id -> (correct_option, marks, options)"""
+    return {
+        question_id: (correct_option, marks, options)
+        for question_id, correct_option, marks, options in questions.values_list(
+            'id', 'correct_option', 'marks', 'options')
+    }
+
+
+def answer_key_version(subject_id):
+    return get_version(caches[VERSION_CACHE], f'answer-key-version:{subject_id}')
+
+
+def invalidate_answer_keys(subject_id):
+    """Retire every cached answer key built from this subject's questions"""
+    bump_version(caches[VERSION_CACHE], f'answer-key-version:{subject_id}')
+
+
+def paper_version(exam_schedule_id):
+    return get_version(caches[VERSION_CACHE], f'question-papers-version:{exam_schedule_id}')
+
+
+def invalidate_exam_answer_key(exam_schedule_id):
+    """Retire the cached answer key of one exam, e.g. after its papers were regenerated"""
+    bump_version(caches[VERSION_CACHE], f'question-papers-version:{exam_schedule_id}')
+
+
+def get_exam_answer_key(exam):
+    """
+    Answer key for an exam, served from the cache while the exam is running.
+
+    It covers the questions of the exam's generated papers, or the whole subject bank
+    when none were generated, matching what students are shown. Each process keeps its
+    own copy in the default cache, keyed by the subject's question-set version and the
+    exam's paper version from VERSION_CACHE, so editing a question or regenerating the
+    papers switches every worker sharing that cache to a fresh key. Entries expire
+    shortly after the exam ends.
+    """
+    key = f'answer-key:{exam.id}:v{answer_key_version(exam.subject_id)}:p{paper_version(exam.id)}'
+    answer_key = cache.get(key)
+    if answer_key is None:
+        answer_key = (load_answer_key(Question.objects.filter(id__in=PaperQuestion.objects.filter(
+                          paper__exam_schedule=exam).values('question_id')))
+                      or load_answer_key(Question.objects.filter(subject_id=exam.subject_id)))
+        exam_end = datetime.combine(exam.date, exam.start_time) + timedelta(minutes=exam.duration_minutes)
+        remaining = (exam_end - datetime.now()).total_seconds()
+        cache.set(key, answer_key, timeout=max(remaining, 0) + ANSWER_KEY_GRACE_SECONDS)
+    return answer_key
+
+
+def invalidate_question_answer_keys(sender, instance, **kwargs):
+    invalidate_answer_keys(instance.subject_id)
+
+
+def score_answers(answers, answer_key):
+    """Sum the marks of correctly answered questions using a preloaded answer key"""
+    total_score = 0.0
+    for answer in answers:
+        correct_option, marks, _ = answer_key[int(answer['question_id'])]
+        if answer['selected_option'] == correct_option:
+            total_score += marks
+    return total_score
+
+
+class GradeBands:
+    """
+    GradeScale rows sorted by min_score, looked up with bisect.
+
+    Each band covers [min_score, next band's min_score), the top band is closed at its
+    max_score. Overlapping or gapped bands are rejected when the structure is built.
+    """
+
+    def __init__(self, scales):
+        self.scales = sorted(scales, key=lambda scale: scale.min_score)
+        for lower, upper in zip(self.scales, self.scales[1:]):
+            if upper.min_score <= lower.max_score:
+                raise ValidationError(f"Grade bands {lower.name} and {upper.name} overlap")
+            if round(upper.min_score - lower.max_score, 6) > GRADE_BAND_TOLERANCE:
+                raise ValidationError(f"Gap between grade bands {lower.name} and {upper.name}")
+        self.boundaries = [scale.min_score for scale in self.scales]
+
+    def lookup(self, score):
+        position = bisect_right(self.boundaries, score) - 1
+        if position < 0 or score > self.scales[-1].max_score:
+            return None
+        return self.scales[position]
+
+
+_grade_bands = None
+_grade_bands_lock = threading.Lock()
+GRADE_BANDS_VERSION_KEY = 'grade-bands-version'
+
+
+def get_grade_bands():
+    """
+    Per-process GradeBands, rebuilt whenever the grade scale version moves.
+
+    The version is kept in the VERSION_CACHE alias, so a GradeScale edit retires the
+    bands of every worker only when that alias is a backend the workers share (the
+    file backend by default). Pointed at locmem it would only reach the process that
+    saved the edit.
+    """
+    global _grade_bands
+    version = get_version(caches[VERSION_CACHE], GRADE_BANDS_VERSION_KEY)
+    with _grade_bands_lock:
+        cached = _grade_bands
+    if cached and cached[0] == version:
+        return cached[1]
+    bands = GradeBands(GradeScale.objects.all())
+    with _grade_bands_lock:
+        _grade_bands = (version, bands)
+    return bands
+
+
+def clear_grade_bands(**kwargs):
+    bump_version(caches[VERSION_CACHE], GRADE_BANDS_VERSION_KEY)
+
+
+def grade_exam(exam_schedule_id, chunk_size=2000):
+    """
+    Grade every submitted answer sheet of an exam in one pass.
+
+    Answers are streamed ordered by student so only one student's sheet is held at a
+    time, the answer key and grade scales are read once, and results are upserted in
+    batches with bulk_create(update_conflicts=True).
+    """
+    started = perf_counter()
+    exam = ExamSchedule.objects.get(id=exam_schedule_id)
+    answers = StudentAnswer.objects.filter(exam_schedule_id=exam_schedule_id)
+    answer_key = load_answer_key(Question.objects.filter(id__in=answers.values('question_id')))
+    grade_bands = get_grade_bands()
+
+    graded = 0
+    ungraded = []
+    invalid = []
+    batch = []
+    rows = answers.order_by('student_id').values_list(
+        'student_id', 'question_id', 'selected_option').iterator(chunk_size=chunk_size)
+
+    with transaction.atomic():
+        for student_id, sheet in groupby(rows, key=lambda row: row[0]):
+            total_score = 0.0
+            for _, question_id, selected_option in sheet:
+                correct_option, marks, _ = answer_key[question_id]
+                if selected_option == correct_option:
+                    total_score += marks
+
+            grace_marks = calculate_grace_marks(student_id, exam_schedule_id, total_score, exam)
+            final_score = total_score + grace_marks
+            try:
+                validate_result_calculation(student_id, exam_schedule_id, final_score, grace_marks, exam)
+            except ValidationError as e:
+                # One bad sheet is reported, it does not hold back the rest of the exam
+                invalid.append({'student_id': student_id, 'error': ' '.join(e.messages)})
+                continue
+
+            grade = grade_bands.lookup(final_score)
+            if grade is None:
+                ungraded.append(student_id)
+                continue
+
+            batch.append(ExamResult(student_id=student_id, exam_schedule_id=exam_schedule_id,
+                                    marks_obtained=final_score, graded_scale=grade, is_manual=False))
+            if len(batch) >= RESULT_BATCH_SIZE:
+                graded += save_results(batch)
+                batch = []
+        graded += save_results(batch)
+        # Dashboards usually follow a bulk grading run, so have the summary ready
+        refresh_summaries([exam_schedule_id])
+
+    elapsed = perf_counter() - started
+    return {
+        'exam_schedule_id': exam_schedule_id,
+        'students_graded': graded,
+        'ungraded_students': ungraded,
+        'invalid_students': invalid,
+        'seconds': round(elapsed, 4),
+        'students_per_second': round(graded / elapsed, 1) if elapsed else None
+    }
+
+
+def save_results(results):
+    ExamResult.objects.bulk_create(
+        results,
+        update_conflicts=True,
+        unique_fields=['student', 'exam_schedule'],
+        update_fields=['marks_obtained', 'graded_scale', 'is_manual', 'from_rubric']
+    )
+    mark_stale({result.exam_schedule_id for result in results})
+    return len(results)
@@ -0,0 +1,225 @@
+import csv
+import json
+from abc import ABC, abstractmethod
+from itertools import islice
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from .grading import invalidate_answer_keys
+from .models import Class, Subject, Student, Question, Teacher, TeacherAvailability
+
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def read_rows(stream, fmt):
+    """
+    Lazily read a text stream of CSV or JSON lines as (row number, row) pairs.
+
+    CSV rows are numbered from the first data row, JSON lines by their line in the file.
+    JSON lines are yielded as text and parsed by import_rows, so a broken line is
+    reported like any other bad row instead of ending the import.
+    """
+    if fmt == 'csv':
+        yield from enumerate(csv.DictReader(stream), start=1)
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if line.strip():
+                yield line_number, line
+    else:
+        raise ValidationError(f"Unsupported import format '{fmt}', expected 'csv' or 'jsonl'")
+
+
+def parse_row(row, reference_fields=()):
+    if isinstance(row, str):
+        try:
+            row = json.loads(row)
+        except ValueError:
+            raise ValidationError("Line is not valid JSON")
+    if not isinstance(row, dict):
+        raise ValidationError("Each line must be a JSON object")
+    # Reference fields become lookup keys for the whole chunk, so a list or object in
+    # one of them is rejected here as this row's error
+    for field in reference_fields:
+        value = row.get(field)
+        if isinstance(value, bool) or not isinstance(value, (str, int, float, type(None))):
+            raise ValidationError(f"{field} must be a single value")
+    return row
+
+
+def clean_instance(instance, exclude):
+    # Field level checks only, uniqueness is resolved per chunk with one query
+    instance.full_clean(exclude=exclude, validate_unique=False, validate_constraints=False)
+    return instance
+
+
+class RowImporter(ABC):
+    """Builds model instances for a chunk of rows, resolving foreign keys with one lookup per chunk"""
+    model = None
+    reference_fields = ()   # looked up per chunk, so each must hold a single value
+
+    def lookups(self, rows):
+        return {}
+
+    @abstractmethod
+    def build(self, row, lookups):
+        """Return an unsaved, validated instance for one row or raise ValidationError"""
+
+    def after_chunk(self, instances):
+        pass
+
+
+class StudentImporter(RowImporter):
+    """Columns: name, student_id, board, class"""
+    model = Student
+    reference_fields = ('student_id', 'board', 'class')
+
+    def lookups(self, rows):
+        class_names = {row.get('class') for row in rows}
+        board_names = {row.get('board') for row in rows}
+        classes = {
+            (board, name): class_id
+            for board, name, class_id in Class.objects.filter(
+                name__in=class_names, board__name__in=board_names
+            ).values_list('board__name', 'name', 'id')
+        }
+        existing = set(Student.objects.filter(
+            student_id__in=[row.get('student_id') for row in rows]
+        ).values_list('student_id', flat=True))
+        return {'classes': classes, 'existing': existing}
+
+    def build(self, row, lookups):
+        class_id = lookups['classes'].get((row.get('board'), row.get('class')))
+        if class_id is None:
+            raise ValidationError(f"Unknown class '{row.get('class')}' for board '{row.get('board')}'")
+        if row.get('student_id') in lookups['existing']:
+            raise ValidationError(f"Student {row.get('student_id')} already exists")
+        lookups['existing'].add(row.get('student_id'))
+        return clean_instance(Student(name=row.get('name'), student_id=row.get('student_id'),
+                                      enrolled_class_id=class_id), exclude=['enrolled_class'])
+
+
+class QuestionImporter(RowImporter):
+    """Columns: subject_code, text, options (JSON object), correct_option, marks"""
+    model = Question
+    reference_fields = ('subject_code', 'correct_option')
+
+    def lookups(self, rows):
+        return {'subjects': dict(Subject.objects.filter(
+            code__in={row.get('subject_code') for row in rows}
+        ).values_list('code', 'id'))}
+
+    def build(self, row, lookups):
+        subject_id = lookups['subjects'].get(row.get('subject_code'))
+        if subject_id is None:
+            raise ValidationError(f"Unknown subject code '{row.get('subject_code')}'")
+        options = row.get('options')
+        if isinstance(options, str):
+            try:
+                options = json.loads(options)
+            except ValueError:
+                raise ValidationError("options must be a JSON object")
+        if not isinstance(options, dict) or row.get('correct_option') not in options:
+            raise ValidationError("correct_option must be one of the option keys")
+        return clean_instance(Question(subject_id=subject_id, text=row.get('text'), options=options,
+                                       correct_option=row.get('correct_option'),
+                                       marks=row.get('marks') or 1.0), exclude=['subject'])
+
+    def after_chunk(self, instances):
+        # bulk_create sends no post_save, so retire cached answer keys here
+        for subject_id in {question.subject_id for question in instances}:
+            invalidate_answer_keys(subject_id)
+
+
+class AvailabilityImporter(RowImporter):
+    """Columns: teacher_id, date, start_time, end_time"""
+    model = TeacherAvailability
+    reference_fields = ('teacher_id',)
+
+    def lookups(self, rows):
+        teacher_ids = {str(row.get('teacher_id')) for row in rows}
+        return {'teachers': {str(teacher_id) for teacher_id in Teacher.objects.filter(
+            id__in=[teacher_id for teacher_id in teacher_ids if teacher_id.isdigit()]
+        ).values_list('id', flat=True)}}
+
+    def build(self, row, lookups):
+        if str(row.get('teacher_id')) not in lookups['teachers']:
+            raise ValidationError(f"Unknown teacher {row.get('teacher_id')}")
+        slot = clean_instance(TeacherAvailability(teacher_id=int(row.get('teacher_id')), date=row.get('date'),
+                                                  start_time=row.get('start_time'), end_time=row.get('end_time')),
+                              exclude=['teacher'])
+        if slot.end_time <= slot.start_time:
+            raise ValidationError("end_time must be after start_time")
+        return slot
+
+
+IMPORTERS = {
+    'students': StudentImporter,
+    'questions': QuestionImporter,
+    'availability': AvailabilityImporter,
+}
+
+
+def import_rows(kind, rows, chunk_size=DEFAULT_CHUNK_SIZE, on_error=None):
+    """
+    Validate and insert (row number, row) pairs chunk by chunk, so memory stays flat
+    for any file size.
+
+    Bad rows are reported through on_error(row_number, message) and skipped, the rest
+    of the chunk is still written. Returns created and failed counts.
+    """
+    if kind not in IMPORTERS:
+        raise ValidationError(f"Unknown import '{kind}', expected one of {sorted(IMPORTERS)}")
+    importer = IMPORTERS[kind]()
+    report = on_error or (lambda row_number, message: None)
+    created = failed = 0
+    rows = iter(rows)
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+
+        parsed = []
+        for row_number, row in chunk:
+            try:
+                parsed.append((row_number, parse_row(row, importer.reference_fields)))
+            except ValidationError as e:
+                failed += 1
+                report(row_number, '; '.join(e.messages))
+        lookups = importer.lookups([row for _, row in parsed])
+
+        numbered = []
+        for row_number, row in parsed:
+            try:
+                numbered.append((row_number, importer.build(row, lookups)))
+            except (ValidationError, ValueError, TypeError) as e:
+                failed += 1
+                report(row_number, '; '.join(e.messages) if isinstance(e, ValidationError) else str(e))
+
+        saved = write_chunk(importer.model, numbered, report)
+        importer.after_chunk(saved)
+        created += len(saved)
+        failed += len(numbered) - len(saved)
+
+    return {'created': created, 'failed': failed}
+
+
+def write_chunk(model, numbered, report):
+    instances = [instance for _, instance in numbered]
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create(instances)
+        return instances
+    except IntegrityError:
+        pass
+
+    # Something collided at insert time, fall back to row by row to find out which
+    saved = []
+    for row_number, instance in numbered:
+        try:
+            with transaction.atomic():
+                instance.save()
+            saved.append(instance)
+        except IntegrityError as e:
+            report(row_number, str(e))
+    return saved
@@ -0,0 +1,90 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from .models import ScheduleJob, JobStatus
+from .scheduling import plan_schedule
+
+
+IN_FLIGHT = (JobStatus.PENDING, JobStatus.RUNNING)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Local worker pool shared by the process, no external broker needed"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            # Two first requests may race here, only one of them builds the pool
+            if _executor is None:
+                # Whatever a previous process left queued died with its pool
+                fail_orphaned_jobs()
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'SCHEDULE_JOB_WORKERS', 2),
+                    thread_name_prefix='schedule-job'
+                )
+    return _executor
+
+
+def orphaned_before():
+    return timezone.now() - timedelta(seconds=getattr(settings, 'SCHEDULE_JOB_TIMEOUT', 3600))
+
+
+def is_orphaned(job):
+    return job.status in IN_FLIGHT and job.updated_at < orphaned_before()
+
+
+def fail_orphaned_jobs(job_ids=None):
+    """
+    Mark in-flight jobs that have not moved for SCHEDULE_JOB_TIMEOUT seconds as failed.
+
+    The pool lives inside the web process, so a restart drops every job it held. Other
+    processes may still be running their own jobs, hence the timeout instead of failing
+    everything in flight.
+    """
+    jobs = ScheduleJob.objects.filter(status__in=IN_FLIGHT, updated_at__lt=orphaned_before())
+    if job_ids is not None:
+        jobs = jobs.filter(id__in=job_ids)
+    return jobs.update(status=JobStatus.FAILED, updated_at=timezone.now(),
+                       error="The worker running this job stopped before it finished")
+
+
+def submit_schedule_job(data):
+    """Queue a smart-schedule payload and return its job row straight away"""
+    job = ScheduleJob.objects.create(payload=data)
+    # A worker thread must never look for a row that is not committed yet
+    transaction.on_commit(lambda: get_executor().submit(run_schedule_job, job.id))
+    return job
+
+
+def update_job(job_id, **fields):
+    # queryset.update() skips auto_now, so keep updated_at honest by hand
+    ScheduleJob.objects.filter(id=job_id).update(updated_at=timezone.now(), **fields)
+
+
+def run_schedule_job(job_id):
+    close_old_connections()
+    try:
+        job = ScheduleJob.objects.get(id=job_id)
+        update_job(job_id, status=JobStatus.RUNNING)
+        last_reported = [0]
+
+        def on_progress(done, total):
+            # Only touch the row when the percentage actually moves
+            percent = min(99, int(done * 100 / total))
+            if percent > last_reported[0]:
+                last_reported[0] = percent
+                update_job(job_id, progress=percent)
+
+        try:
+            result = plan_schedule(job.payload, on_progress)
+        except Exception as e:
+            update_job(job_id, status=JobStatus.FAILED, error=str(e))
+        else:
+            update_job(job_id, status=JobStatus.SUCCEEDED, progress=100, result=result)
+    finally:
+        close_old_connections()
@@ -0,0 +1,122 @@
+import random
+from datetime import date, time, timedelta
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from exams.models import (Board, Class, Subject, Teacher, TeacherAvailability, Venue, ExamType, ExamPattern,
+                          ExamSchedule, Student, GradeScale, ExamResult)
+
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = ("Seed a throwaway dataset inside a transaction and compare query plans and timings of the "
+            "scheduling and result lookups with and without their composite indexes")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--results', type=int, default=1_000_000, help="ExamResult rows to seed")
+        parser.add_argument('--students', type=int, default=10_000)
+        parser.add_argument('--schedules', type=int, default=50_000, help="ExamSchedule rows to seed")
+        parser.add_argument('--teachers', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=200, help="Executions timed per query")
+
+    def handle(self, *args, **options):
+        # Everything, including the dropped indexes, is rolled back at the end
+        with transaction.atomic():
+            probes = self.seed(options)
+            self.stdout.write(self.style.MIGRATE_HEADING("With indexes"))
+            self.run_queries(probes, options['repeat'], 'indexed')
+
+            self.drop_indexes()
+            self.stdout.write(self.style.MIGRATE_HEADING("Without indexes"))
+            self.run_queries(probes, options['repeat'], 'unindexed')
+            transaction.set_rollback(True)
+
+    def seed(self, options):
+        started = perf_counter()
+        rng = random.Random(42)
+        board = Board.objects.create(name='Benchmark board')
+        classes = Class.objects.bulk_create([Class(name=f'Class {i}', board=board) for i in range(50)])
+        subjects = Subject.objects.bulk_create(
+            [Subject(name=f'Subject {i}', code=f'BENCH{i}', board=board) for i in range(20)])
+        teachers = Teacher.objects.bulk_create([Teacher(name=f'Teacher {i}') for i in range(options['teachers'])])
+        venues = Venue.objects.bulk_create([Venue(name=f'Room {i}', capacity=60) for i in range(30)])
+        exam_type = ExamType.objects.create(name='Benchmark')
+        exam_pattern = ExamPattern.objects.create(name='Benchmark', board=board)
+        grade = GradeScale.objects.create(name='Any', min_score=0, max_score=100)
+        first_day = date(2025, 1, 1)
+
+        TeacherAvailability.objects.bulk_create((
+            TeacherAvailability(teacher=teacher, date=first_day + timedelta(days=day),
+                                start_time=time(9), end_time=time(17))
+            for teacher in teachers for day in range(365)
+        ), batch_size=BATCH_SIZE)
+
+        slots = [(klass, subject, day, hour) for klass in classes for subject in subjects
+                 for day in range(365) for hour in (9, 13)]
+        schedules = ExamSchedule.objects.bulk_create((
+            ExamSchedule(exam_type=exam_type, exam_pattern=exam_pattern, subject=subject, class_assigned=klass,
+                         teacher=rng.choice(teachers), date=first_day + timedelta(days=day), start_time=time(hour),
+                         duration_minutes=120, end_time=time(hour + 2), venue=rng.choice(venues), total_marks=100, passing_marks=35)
+            for klass, subject, day, hour in rng.sample(slots, min(options['schedules'], len(slots)))
+        ), batch_size=BATCH_SIZE)
+
+        students = Student.objects.bulk_create((
+            Student(name=f'Student {i}', student_id=f'BENCH{i}', enrolled_class=rng.choice(classes))
+            for i in range(options['students'])
+        ), batch_size=BATCH_SIZE)
+
+        per_student = max(1, options['results'] // len(students))
+        ExamResult.objects.bulk_create((
+            ExamResult(student=student, exam_schedule=schedule, marks_obtained=rng.uniform(0, 100),
+                       graded_scale=grade, is_manual=False)
+            for student in students for schedule in rng.sample(schedules, per_student)
+        ), batch_size=BATCH_SIZE)
+
+        self.stdout.write(f"Seeded {ExamResult.objects.count()} results and {len(schedules)} schedules "
+                          f"in {perf_counter() - started:.1f}s")
+        sample = ExamResult.objects.select_related('exam_schedule').first()
+        return [
+            ("ExamSchedule by (class_assigned, date)", ExamSchedule.objects.filter(
+                class_assigned_id=sample.exam_schedule.class_assigned_id, date=sample.exam_schedule.date)),
+            ("ExamSchedule by (teacher, date)", ExamSchedule.objects.filter(
+                teacher_id=sample.exam_schedule.teacher_id, date=sample.exam_schedule.date)),
+            ("TeacherAvailability by (teacher, date)", TeacherAvailability.objects.filter(
+                teacher_id=sample.exam_schedule.teacher_id, date=sample.exam_schedule.date)),
+            ("ExamResult by (student, exam_schedule)", ExamResult.objects.filter(
+                student_id=sample.student_id, exam_schedule_id=sample.exam_schedule_id)),
+        ]
+
+    def drop_indexes(self):
+        # Raw DDL, since the SQLite schema editor refuses to run inside atomic()
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            for model in (ExamSchedule, TeacherAvailability):
+                for index in model._meta.indexes:
+                    suffix = f" ON {quote(model._meta.db_table)}" if connection.vendor == 'mysql' else ""
+                    cursor.execute(f"DROP INDEX {quote(index.name)}{suffix}")
+            if connection.vendor == 'sqlite':
+                self.stdout.write("  (SQLite cannot drop the unique ExamResult autoindex, it stays in place)")
+            else:
+                for constraint in ExamResult._meta.constraints:
+                    cursor.execute(f"ALTER TABLE {quote(ExamResult._meta.db_table)} "
+                                   f"DROP CONSTRAINT {quote(constraint.name)}")
+
+    def run_queries(self, probes, repeat, phase):
+        # The phase comment keeps SQLite from reusing a statement prepared against the old schema
+        prefix = connection.ops.explain_query_prefix()
+        with connection.cursor() as cursor:
+            for label, queryset in probes:
+                sql, params = queryset.query.sql_with_params()
+                sql = f"/* {phase} */ {sql}"
+                started = perf_counter()
+                for _ in range(repeat):
+                    cursor.execute(sql, params)
+                    cursor.fetchall()
+                per_query = (perf_counter() - started) / repeat * 1000
+                self.stdout.write(f"  {label}: {per_query:.3f} ms")
+
+                cursor.execute(f"{prefix} {sql}", params)
+                for row in cursor.fetchall():
+                    self.stdout.write(f"      {' '.join(str(column) for column in row)}")
@@ -0,0 +1,46 @@
+import json
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from exams.benchmarks import SCALES, run_benchmarks, compare
+
+
+class Command(BaseCommand):
+    help = ("Generate a synthetic term inside a transaction, time smart scheduling, exam evaluation and "
+            "the validators, and record wall time, query counts and peak memory as a JSON baseline")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+        parser.add_argument('--repeat', type=int, default=3, help="Timed runs per case, the best one is kept")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--case', action='append', dest='cases', help="Only run this case (repeatable)")
+        parser.add_argument('--output', help="Write the results to this JSON file")
+        parser.add_argument('--compare', help="Fail when the results regress against this JSON baseline")
+        parser.add_argument('--tolerance', type=float, default=0.5,
+                            help="Allowed relative increase of time and memory before it counts as a regression")
+
+    def handle(self, *args, **options):
+        try:
+            report = run_benchmarks(options['scale'], options['repeat'], options['seed'], options['cases'])
+        except ValidationError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"Seeded the {report['scale']} term in {report['seed_seconds']}s")
+        for name, result in report['results'].items():
+            self.stdout.write(f"  {name}: {result['seconds'] * 1000:.1f} ms, {result['queries']} queries, "
+                              f"peak {result['peak_memory_kb']} KB")
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+            try:
+                regressions = compare(baseline, report, options['tolerance'])
+            except ValidationError as e:
+                raise CommandError(str(e))
+            if regressions:
+                raise CommandError("Regressions against the baseline:\n  " + "\n  ".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
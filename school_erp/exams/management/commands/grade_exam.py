@@ -0,0 +1,31 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from exams.grading import grade_exam
+from exams.models import ExamSchedule
+
+
+class Command(BaseCommand):
+    help = "Grade every submitted answer of an exam schedule and upsert the results"
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_schedule_id', type=int)
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help="Rows fetched per round trip while streaming answers")
+
+    def handle(self, *args, **options):
+        try:
+            report = grade_exam(options['exam_schedule_id'], options['chunk_size'])
+        except ExamSchedule.DoesNotExist:
+            raise CommandError(f"Exam schedule {options['exam_schedule_id']} not found")
+        except ValidationError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Graded {report['students_graded']} students in {report['seconds']}s "
+            f"({report['students_per_second']} students/s)"))
+        if report['ungraded_students']:
+            self.stdout.write(self.style.WARNING(
+                f"No grade band matched {len(report['ungraded_students'])} students: "
+                f"{report['ungraded_students']}"))
+        for invalid in report['invalid_students']:
+            self.stdout.write(self.style.WARNING(f"Student {invalid['student_id']} not graded: {invalid['error']}"))
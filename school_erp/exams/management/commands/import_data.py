@@ -0,0 +1,43 @@
+import csv
+from pathlib import Path
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from exams.importers import IMPORTERS, DEFAULT_CHUNK_SIZE, import_rows, read_rows
+
+
+class Command(BaseCommand):
+    help = "Stream a CSV or JSONL file of students, questions or teacher availability into the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS))
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help="Defaults to the file extension")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--errors', help="Write a row-level error report (CSV) to this path")
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        fmt = options['format'] or path.suffix.lstrip('.').lower()
+        error_file = open(options['errors'], 'w', newline='') if options['errors'] else None
+        error_writer = csv.writer(error_file) if error_file else None
+        if error_writer:
+            error_writer.writerow(['row', 'error'])
+
+        def on_error(row_number, message):
+            if error_writer:
+                error_writer.writerow([row_number, message])
+            else:
+                self.stderr.write(f"row {row_number}: {message}")
+
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as stream:
+                report = import_rows(options['kind'], read_rows(stream, fmt), options['chunk_size'], on_error)
+        except ValidationError as e:
+            raise CommandError('; '.join(e.messages))
+        finally:
+            if error_file:
+                error_file.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['created']} {options['kind']}, {report['failed']} rows rejected"))
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from exams.profiling import load_snapshots, summarize
+
+
+class Command(BaseCommand):
+    help = "Print p50/p95/p99 latency and query counts per route from the query profile snapshots"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=getattr(settings, 'QUERY_PROFILE_DIR', None),
+                            help="Snapshot directory, defaults to QUERY_PROFILE_DIR")
+        parser.add_argument('--duplicates', action='store_true', help="Also list duplicated queries")
+
+    def handle(self, *args, **options):
+        if not options['dir']:
+            raise CommandError("No snapshot directory, set QUERY_PROFILE_DIR or pass --dir")
+
+        summary = summarize(load_snapshots(options['dir']))
+        if not summary:
+            self.stdout.write("No profiled requests recorded yet")
+            return
+
+        self.stdout.write(f"{'route':45} {'reqs':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'q p95':>6} {'q max':>6}")
+        for row in summary:
+            self.stdout.write(
+                f"{row['route'][:45]:45} {row['requests']:>6} {row['latency_ms']['p50']:>9} "
+                f"{row['latency_ms']['p95']:>9} {row['latency_ms']['p99']:>9} "
+                f"{row['queries']['p95']:>6} {row['queries']['max']:>6}")
+            if options['duplicates']:
+                for duplicate in row['top_duplicates']:
+                    self.stdout.write(f"    x{duplicate['count']} {duplicate['sql'][:100]}")
@@ -0,0 +1,16 @@
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from exams.analytics import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = "Recompute every per-exam result summary from ExamResult, e.g. after a backfill or bulk import"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Exams refreshed per round of queries")
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        exams = rebuild_summaries(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt summaries of {exams} exams in {perf_counter() - started:.2f}s"))
@@ -0,0 +1,30 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from exams.assessment import compute_totals
+from exams.models import ParameterScore
+
+
+class Command(BaseCommand):
+    help = "Recompute every rubric-based ExamResult from its per-parameter scores, e.g. after editing weightages in the admin"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam-schedule', type=int, help="Only recompute this exam")
+
+    def handle(self, *args, **options):
+        scores = ParameterScore.objects.all()
+        if options['exam_schedule']:
+            scores = scores.filter(exam_schedule_id=options['exam_schedule'])
+        try:
+            report = compute_totals(scores)
+        except ValidationError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f"Recomputed {report['students_graded']} results in {report['seconds']}s"))
+        if report['incomplete']:
+            self.stdout.write(self.style.WARNING(f"{len(report['incomplete'])} students are missing parameter scores"))
+        for invalid in report['invalid_students']:
+            self.stdout.write(self.style.WARNING(
+                f"Student {invalid['student_id']} of exam {invalid['exam_schedule_id']} not graded: {invalid['error']}"))
+        if report['ungraded_students']:
+            self.stdout.write(self.style.WARNING(
+                f"No grade band matched {len(report['ungraded_students'])} students: {report['ungraded_students']}"))
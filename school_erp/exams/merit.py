@@ -0,0 +1,142 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Count, F, Sum, Window
+from django.db.models.functions import DenseRank, Rank, Round
+from .models import ExamResult
+
+try:
+    import numpy as np
+except ImportError:  # optional, the pure Python ranking gives the same answers
+    np = None
+
+
+MERIT_CHUNK_SIZE = 5000
+
+MERIT_COLUMNS = ['rank', 'dense_rank', 'percentile', 'class_rank', 'class_dense_rank', 'class_percentile',
+                 'student_id', 'student_name', 'class', 'score']
+
+STUDENT_FIELDS = ['student__student_id', 'student__name', 'student__enrolled_class__name']
+
+
+def merit_results(board_id, exam_type_id, subject_id=None):
+    results = ExamResult.objects.filter(
+        exam_schedule__class_assigned__board_id=board_id,
+        exam_schedule__exam_type_id=exam_type_id
+    )
+    if subject_id is not None:
+        results = results.filter(exam_schedule__subject_id=subject_id)
+    return results
+
+
+def merit_scores(results):
+    """One row per student: the total of their marks in these results"""
+    # Rounded so float sums added up in a different order still tie
+    return results.values('student_id', 'student__enrolled_class_id', *STUDENT_FIELDS).annotate(
+        score=Round(Sum('marks_obtained'), 2)).order_by()
+
+
+def rank_scores(scores):
+    """
+    Competition rank, dense rank and percentile (share of students scoring at or below)
+    of every score, from one sort of the whole list.
+    """
+    if not scores:
+        return [], [], []
+    if np is not None:
+        values = np.frombuffer(scores, dtype=float) if isinstance(scores, array) else np.asarray(scores, dtype=float)
+        ascending = np.sort(values)
+        distinct = np.unique(ascending)
+        at_or_below = np.searchsorted(ascending, values, side='right')
+        ranks = len(values) - at_or_below + 1
+        dense_ranks = len(distinct) - np.searchsorted(distinct, values, side='left')
+        percentiles = np.round(at_or_below / len(values) * 100, 2)
+        return ranks.tolist(), dense_ranks.tolist(), percentiles.tolist()
+
+    ascending = sorted(scores)
+    distinct = sorted(set(scores))
+    count = len(ascending)
+    ranks, dense_ranks, percentiles = [], [], []
+    for score in scores:
+        at_or_below = bisect_right(ascending, score)
+        ranks.append(count - at_or_below + 1)
+        dense_ranks.append(len(distinct) - bisect_left(distinct, score))
+        percentiles.append(round(at_or_below / count * 100, 2))
+    return ranks, dense_ranks, percentiles
+
+
+def ranked_in_sql(results, class_id=None):
+    """Let the database rank with window functions and stream the rows in merit order"""
+    scores = merit_scores(results)
+    by_score = F('score').desc()
+    per_class = F('student__enrolled_class_id')
+    ranked = scores.annotate(
+        rank=Window(Rank(), order_by=by_score),
+        dense_rank=Window(DenseRank(), order_by=by_score),
+        class_rank=Window(Rank(), partition_by=per_class, order_by=by_score),
+        class_dense_rank=Window(DenseRank(), partition_by=per_class, order_by=by_score),
+    ).order_by('rank', 'student__student_id').values_list(
+        'rank', 'dense_rank', 'class_rank', 'class_dense_rank', *STUDENT_FIELDS, 'score', 'student__enrolled_class_id')
+
+    # Students at or below a score are everyone minus those ranked above it, so the
+    # percentiles come from group sizes instead of two more window sorts
+    class_sizes = dict(results.values_list('student__enrolled_class_id').annotate(
+        Count('student_id', distinct=True)).order_by())
+    total = sum(class_sizes.values())
+
+    for rank, dense_rank, class_rank, class_dense_rank, *student, score, klass in ranked.iterator(
+            chunk_size=MERIT_CHUNK_SIZE):
+        # Windows are computed before any WHERE on them, so a class view keeps board-wide ranks
+        if class_id is not None and klass != class_id:
+            continue
+        yield (rank, dense_rank, round((total - rank + 1) / total * 100, 2),
+               class_rank, class_dense_rank, round((class_sizes[klass] - class_rank + 1) / class_sizes[klass] * 100, 2),
+               *student, score)
+
+
+def ranked_in_python(results, class_id=None):
+    """Pull the scores into flat arrays and rank them with sorts, for backends without window functions"""
+    scores = merit_scores(results)
+    class_ids = array('q')
+    values = array('d')
+    students = []
+    for row in scores.values_list('student__enrolled_class_id', 'score', *STUDENT_FIELDS).iterator(
+            chunk_size=MERIT_CHUNK_SIZE):
+        class_ids.append(row[0])
+        values.append(row[1])
+        students.append(row[2:])
+
+    ranks, dense_ranks, percentiles = rank_scores(values)
+    class_ranks, class_dense_ranks, class_percentiles = [None] * len(values), [None] * len(values), [None] * len(values)
+    members = defaultdict(list)
+    for position, klass in enumerate(class_ids):
+        members[klass].append(position)
+    for klass, positions in members.items():
+        for position, rank, dense_rank, percentile in zip(positions, *rank_scores([values[p] for p in positions])):
+            class_ranks[position], class_dense_ranks[position], class_percentiles[position] = rank, dense_rank, percentile
+
+    # Ties keep one rank and are listed by student id
+    for position in sorted(range(len(values)), key=lambda p: (ranks[p], students[p][0])):
+        if class_id is not None and class_ids[position] != class_id:
+            continue
+        yield (ranks[position], dense_ranks[position], percentiles[position], class_ranks[position],
+               class_dense_ranks[position], class_percentiles[position], *students[position], values[position])
+
+
+def merit_list(board_id, exam_type_id, subject_id=None, class_id=None, method='auto'):
+    """
+    Yield the board's merit list as tuples in MERIT_COLUMNS order, best first.
+
+    Ranks and percentiles are always board-wide and class-wide, `class_id` only narrows
+    the rows returned. 'auto' ranks in SQL when the backend has window functions.
+    """
+    if method == 'auto':
+        method = 'sql' if connection.features.supports_over_clause else 'arrays'
+    results = merit_results(board_id, exam_type_id, subject_id)
+    if method == 'sql':
+        return ranked_in_sql(results, class_id)
+    if method == 'arrays':
+        return ranked_in_python(results, class_id)
+    raise ValidationError(f"Unknown ranking method '{method}', expected 'auto', 'sql' or 'arrays'")
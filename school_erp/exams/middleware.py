@@ -0,0 +1,39 @@
+import random
+from time import perf_counter
+from django.conf import settings
+from django.db import connection
+from .profiling import QueryRecorder, profile_buffer
+
+
+class QueryProfileMiddleware:
+    """
+    Samples requests and records query count, DB time, duplicate queries and latency.
+
+    Queries are observed through connection.execute_wrapper, so it works with DEBUG off.
+    Only QUERY_PROFILE_SAMPLE_RATE of requests pay for the wrapper.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'QUERY_PROFILE_SAMPLE_RATE', 0.1)
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        recorder = QueryRecorder(perf_counter)
+        started = perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        latency = perf_counter() - started
+
+        match = request.resolver_match
+        profile_buffer.add({
+            'route': f"{request.method} {match.view_name if match else request.path}",
+            'status': response.status_code,
+            'latency_ms': round(latency * 1000, 2),
+            'queries': recorder.count,
+            'db_ms': round(recorder.db_seconds * 1000, 2),
+            'duplicates': recorder.duplicates()[:5]
+        })
+        return response
@@ -0,0 +1,108 @@
+# Generated by Django 5.2.6 on 2026-10-17 06:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0003_teacher_examschedule_teacher_teacheravailability'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssessmentParameter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('weightage', models.FloatField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GradeScale',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('min_score', models.FloatField()),
+                ('max_score', models.FloatField()),
+                ('description', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ScheduleJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Running', 'Running'), ('Succeeded', 'Succeeded'), ('Failed', 'Failed')], default='Pending', max_length=10)),
+                ('progress', models.PositiveSmallIntegerField(default=0)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='examschedule',
+            name='is_result_published',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='examschedule',
+            name='mode',
+            field=models.CharField(choices=[('Online', 'Online'), ('Offline', 'Offline')], default='Offline', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='examschedule',
+            name='passing_marks',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=5),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='examschedule',
+            name='total_marks',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=5),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='Question',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField()),
+                ('options', models.JSONField()),
+                ('correct_option', models.CharField(max_length=1)),
+                ('marks', models.FloatField(default=1.0)),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exams.subject')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Student',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('student_id', models.CharField(max_length=20, unique=True)),
+                ('enrolled_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exams.class')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ExamResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('marks_obtained', models.FloatField()),
+                ('is_manual', models.BooleanField(default=True)),
+                ('exam_schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exams.examschedule')),
+                ('graded_scale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exams.gradescale')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exams.student')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StudentAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('selected_option', models.CharField(max_length=1)),
+                ('exam_schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exams.examschedule')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exams.question')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exams.student')),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-17 06:24
+
+from django.db import migrations, models
+
+
+def drop_duplicate_results(apps, schema_editor):
+    # Keep the most recent result per (student, exam_schedule) before enforcing uniqueness
+    ExamResult = apps.get_model('exams', 'ExamResult')
+    duplicated = ExamResult.objects.values('student', 'exam_schedule').annotate(
+        keep=models.Max('id'), rows=models.Count('id')).filter(rows__gt=1)
+    for row in duplicated:
+        ExamResult.objects.filter(student=row['student'], exam_schedule=row['exam_schedule']).exclude(
+            id=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0004_examschedule_marks_results_questions_schedulejob'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_results, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='examresult',
+            constraint=models.UniqueConstraint(fields=('student', 'exam_schedule'), name='unique_result_per_student_exam'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-17 06:26
+
+from django.db import migrations, models
+
+
+def drop_duplicate_answers(apps, schema_editor):
+    # Keep the last saved answer per question before enforcing uniqueness
+    StudentAnswer = apps.get_model('exams', 'StudentAnswer')
+    duplicated = StudentAnswer.objects.values('student', 'exam_schedule', 'question').annotate(
+        keep=models.Max('id'), rows=models.Count('id')).filter(rows__gt=1)
+    for row in duplicated:
+        StudentAnswer.objects.filter(student=row['student'], exam_schedule=row['exam_schedule'],
+                                     question=row['question']).exclude(id=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0005_examresult_unique_student_exam'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_answers, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='studentanswer',
+            constraint=models.UniqueConstraint(fields=('student', 'exam_schedule', 'question'), name='unique_answer_per_question'),
+        ),
+    ]
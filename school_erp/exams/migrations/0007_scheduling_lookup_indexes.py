@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-17 06:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0006_studentanswer_unique_question'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='examschedule',
+            index=models.Index(fields=['class_assigned', 'date'], name='exam_class_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examschedule',
+            index=models.Index(fields=['teacher', 'date'], name='exam_teacher_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examschedule',
+            index=models.Index(fields=['venue', 'date'], name='exam_venue_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teacheravailability',
+            index=models.Index(fields=['teacher', 'date'], name='availability_teacher_date_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-17 06:30
+
+from datetime import datetime, timedelta
+from django.db import migrations, models
+
+
+def fill_end_times(apps, schema_editor):
+    ExamSchedule = apps.get_model('exams', 'ExamSchedule')
+    exams = list(ExamSchedule.objects.only('date', 'start_time', 'duration_minutes'))
+    for exam in exams:
+        exam.end_time = (datetime.combine(exam.date, exam.start_time) +
+                         timedelta(minutes=exam.duration_minutes)).time()
+    ExamSchedule.objects.bulk_update(exams, ['end_time'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0007_scheduling_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examschedule',
+            name='end_time',
+            field=models.TimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_end_times, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='examschedule',
+            name='end_time',
+            field=models.TimeField(editable=False),
+        ),
+    ]
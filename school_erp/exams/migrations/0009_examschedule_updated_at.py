@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-17 06:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0008_examschedule_end_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examschedule',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-17 06:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0009_examschedule_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeatAssignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seat_number', models.PositiveIntegerField()),
+                ('exam_schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seat_assignments', to='exams.examschedule')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exams.student')),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exams.venue')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('exam_schedule', 'student'), name='unique_seat_per_student_exam'), models.UniqueConstraint(fields=('exam_schedule', 'venue', 'seat_number'), name='unique_seat_per_exam_venue')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-17 06:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0010_seatassignment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('students', models.PositiveIntegerField(default=0)),
+                ('passed', models.PositiveIntegerField(default=0)),
+                ('average', models.FloatField(null=True)),
+                ('highest', models.FloatField(null=True)),
+                ('lowest', models.FloatField(null=True)),
+                ('grade_distribution', models.JSONField(default=dict)),
+                ('percentiles', models.JSONField(default=dict)),
+                ('toppers', models.JSONField(default=list)),
+                ('stale', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('class_assigned', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exams.class')),
+                ('exam_schedule', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='result_summary', to='exams.examschedule')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exams.subject')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['class_assigned', 'subject'], name='summary_class_subject_idx')],
+            },
+        ),
+    ]
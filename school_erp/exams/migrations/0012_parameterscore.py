@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-17 06:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0011_resultsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParameterScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('exam_schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exams.examschedule')),
+                ('parameter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exams.assessmentparameter')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exams.student')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('student', 'exam_schedule', 'parameter'), name='unique_score_per_parameter')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-17 06:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0012_parameterscore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaperQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exams.question')),
+            ],
+            options={
+                'ordering': ['paper', 'position'],
+            },
+        ),
+        migrations.CreateModel(
+            name='QuestionPaper',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('variant', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('exam_schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_papers', to='exams.examschedule')),
+                ('questions', models.ManyToManyField(through='exams.PaperQuestion', to='exams.question')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='paperquestion',
+            name='paper',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exams.questionpaper'),
+        ),
+        migrations.AddConstraint(
+            model_name='questionpaper',
+            constraint=models.UniqueConstraint(fields=('exam_schedule', 'variant'), name='unique_paper_variant'),
+        ),
+        migrations.AddConstraint(
+            model_name='paperquestion',
+            constraint=models.UniqueConstraint(fields=('paper', 'question'), name='unique_question_per_paper'),
+        ),
+    ]
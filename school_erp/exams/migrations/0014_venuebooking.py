@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-17 07:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def book_seated_rooms(apps, schema_editor):
+    # Exams already seated outside their own venue keep holding those rooms
+    ExamSchedule = apps.get_model('exams', 'ExamSchedule')
+    SeatAssignment = apps.get_model('exams', 'SeatAssignment')
+    VenueBooking = apps.get_model('exams', 'VenueBooking')
+    own_venue = dict(ExamSchedule.objects.values_list('id', 'venue_id'))
+
+    rooms = {}
+    for row in SeatAssignment.objects.values('exam_schedule_id', 'venue_id').annotate(seats=Count('id')):
+        rooms.setdefault(row['exam_schedule_id'], []).append((row['venue_id'], row['seats']))
+    VenueBooking.objects.bulk_create([
+        VenueBooking(exam_schedule_id=exam_id, venue_id=venue_id, seats=seats)
+        for exam_id, exam_rooms in rooms.items()
+        if len(exam_rooms) > 1 or exam_rooms[0][0] != own_venue[exam_id]
+        for venue_id, seats in exam_rooms
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0013_questionpaper'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VenueBooking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seats', models.PositiveIntegerField()),
+                ('exam_schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='venue_bookings', to='exams.examschedule')),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exams.venue')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('exam_schedule', 'venue'), name='unique_booking_per_exam_venue')],
+            },
+        ),
+        migrations.RunPython(book_seated_rooms, migrations.RunPython.noop),
+    ]
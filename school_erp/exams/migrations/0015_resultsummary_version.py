@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 07:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0014_venuebooking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resultsummary',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-17 07:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0015_resultsummary_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('submitted_at', models.DateTimeField(auto_now_add=True)),
+                ('exam_schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exams.examschedule')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exams.student')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('student', 'exam_schedule'), name='unique_submission_per_exam')],
+            },
+        ),
+    ]
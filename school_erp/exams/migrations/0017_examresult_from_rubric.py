@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-17 07:20
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def mark_rubric_results(apps, schema_editor):
+    # Manual results of students with rubric scores for the exam were written by compute_totals
+    ExamResult = apps.get_model('exams', 'ExamResult')
+    ParameterScore = apps.get_model('exams', 'ParameterScore')
+    ExamResult.objects.filter(is_manual=True).filter(Exists(ParameterScore.objects.filter(
+        student_id=OuterRef('student_id'), exam_schedule_id=OuterRef('exam_schedule_id')
+    ))).update(from_rubric=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0016_answersubmission'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examresult',
+            name='from_rubric',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_rubric_results, migrations.RunPython.noop),
+    ]
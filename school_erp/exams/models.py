@@ -1,3 +1,4 @@
+from datetime import datetime, timedelta
 from django.db import models
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
@@ -32,6 +33,11 @@ class TeacherAvailability(models.Model):
     start_time = models.TimeField()
     end_time = models.TimeField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['teacher', 'date'], name='availability_teacher_date_idx'),
+        ]
+
 
 class Venue(models.Model):
     name = models.CharField(max_length=100)
@@ -53,7 +59,7 @@ class ExamPattern(models.Model):
 
 
 
-class ExamMode(models.Model):
+class ExamMode(models.TextChoices):
     ONLINE = 'Online', 'Online'
     OFFLINE = 'Offline', 'Offline'
 
@@ -68,17 +74,25 @@ class ExamSchedule(models.Model):
     date = models.DateField()
     start_time = models.TimeField()
     duration_minutes = models.PositiveIntegerField()
+    end_time = models.TimeField(editable=False)  #start_time + duration, stored for overlap queries
     venue = models.ForeignKey(Venue, on_delete=models.CASCADE)
     total_marks = models.DecimalField(max_digits=5, decimal_places=2)
     passing_marks = models.DecimalField(max_digits=5, decimal_places=2)
     is_result_published = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('class_assigned', 'subject', 'date', 'start_time')
+        indexes = [
+            models.Index(fields=['class_assigned', 'date'], name='exam_class_date_idx'),
+            models.Index(fields=['teacher', 'date'], name='exam_teacher_date_idx'),
+            models.Index(fields=['venue', 'date'], name='exam_venue_date_idx'),
+        ]
 
     def clean(self):
         from .validators import validate_exam_schedule, validate_teacher_availability
         validate_exam_schedule({
+            'id': self.pk,
             'class_assigned': self.class_assigned_id,
             'date': self.date,
             'start_time': self.start_time,
@@ -92,7 +106,12 @@ class ExamSchedule(models.Model):
             self.duration_minutes
         )
 
+    def get_end_time(self):
+        return (datetime.combine(self.date, self.start_time) + timedelta(minutes=self.duration_minutes)).time()
+
     def save(self, *args, **kwargs):
+        if self.date and self.start_time and self.duration_minutes is not None:
+            self.end_time = self.get_end_time()
         self.full_clean()
         super().save(*args, **kwargs)
 
@@ -101,6 +120,24 @@ class ExamSchedule(models.Model):
     
 
 
+class JobStatus(models.TextChoices):
+    PENDING = 'Pending', 'Pending'
+    RUNNING = 'Running', 'Running'
+    SUCCEEDED = 'Succeeded', 'Succeeded'
+    FAILED = 'Failed', 'Failed'
+
+
+class ScheduleJob(models.Model):
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=JobStatus.choices, default=JobStatus.PENDING)
+    progress = models.PositiveSmallIntegerField(default=0)  #percentage of exams placed
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+
 class GradeScale(models.Model):
     name = models.CharField(max_length=50) # e.g: A+, B+, fail
     min_score = models.FloatField()
@@ -114,6 +151,12 @@ class ExamResult(models.Model):
     marks_obtained = models.FloatField()
     graded_scale = models.ForeignKey(GradeScale, on_delete= models.CASCADE)
     is_manual = models.BooleanField(default=True) #True if manually marked
+    from_rubric = models.BooleanField(default=False) #True if computed from ParameterScores
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'exam_schedule'], name='unique_result_per_student_exam')
+        ]
 
 
 class AssessmentParameter(models.Model):
@@ -135,5 +178,106 @@ class StudentAnswer(models.Model):
     selected_option = models.CharField(max_length=1)
     exam_schedule = models.ForeignKey(ExamSchedule, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'exam_schedule', 'question'], name='unique_answer_per_question')
+        ]
+
+
+
+
+
+class AnswerSubmission(models.Model):
+    """A final submit, after which autosaved answers no longer reach the sheet"""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    exam_schedule = models.ForeignKey(ExamSchedule, on_delete=models.CASCADE)
+    submitted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'exam_schedule'], name='unique_submission_per_exam')
+        ]
+
+
+class SeatAssignment(models.Model):
+    exam_schedule = models.ForeignKey(ExamSchedule, on_delete=models.CASCADE, related_name='seat_assignments')
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    venue = models.ForeignKey(Venue, on_delete=models.CASCADE)
+    seat_number = models.PositiveIntegerField()  #1..venue capacity
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['exam_schedule', 'student'], name='unique_seat_per_student_exam'),
+            models.UniqueConstraint(fields=['exam_schedule', 'venue', 'seat_number'], name='unique_seat_per_exam_venue')
+        ]
+
+
+class VenueBooking(models.Model):
+    """Seats an exam holds in one room. Exams without bookings sit in their own venue."""
+    exam_schedule = models.ForeignKey(ExamSchedule, on_delete=models.CASCADE, related_name='venue_bookings')
+    venue = models.ForeignKey(Venue, on_delete=models.CASCADE)
+    seats = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['exam_schedule', 'venue'], name='unique_booking_per_exam_venue')
+        ]
+
+
+class ResultSummary(models.Model):
+    """Precomputed result statistics of one exam, kept current by exams.analytics"""
+    exam_schedule = models.OneToOneField(ExamSchedule, on_delete=models.CASCADE, related_name='result_summary')
+    class_assigned = models.ForeignKey(Class, on_delete=models.CASCADE)
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
+    students = models.PositiveIntegerField(default=0)
+    passed = models.PositiveIntegerField(default=0)
+    average = models.FloatField(null=True)
+    highest = models.FloatField(null=True)
+    lowest = models.FloatField(null=True)
+    grade_distribution = models.JSONField(default=dict)  #e.g: {"A": 12, "B": 30}
+    percentiles = models.JSONField(default=dict)  #e.g: {"p25": 41.0, "p50": 58.5, ...}
+    toppers = models.JSONField(default=list)
+    stale = models.BooleanField(default=True)  #results changed since the last refresh
+    version = models.PositiveIntegerField(default=0)  #bumped on every invalidation, a refresh only lands on the version it read
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['class_assigned', 'subject'], name='summary_class_subject_idx'),
+        ]
+
+
+class ParameterScore(models.Model):
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    exam_schedule = models.ForeignKey(ExamSchedule, on_delete=models.CASCADE)
+    parameter = models.ForeignKey(AssessmentParameter, on_delete=models.CASCADE)
+    score = models.FloatField()  #marked out of the exam's total_marks
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'exam_schedule', 'parameter'], name='unique_score_per_parameter')
+        ]
+
 
+class QuestionPaper(models.Model):
+    exam_schedule = models.ForeignKey(ExamSchedule, on_delete=models.CASCADE, related_name='question_papers')
+    variant = models.PositiveIntegerField()  #set number printed on the paper, from 1
+    questions = models.ManyToManyField(Question, through='PaperQuestion')
+    created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['exam_schedule', 'variant'], name='unique_paper_variant')
+        ]
+
+
+class PaperQuestion(models.Model):
+    paper = models.ForeignKey(QuestionPaper, on_delete=models.CASCADE)
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    position = models.PositiveIntegerField()  #order on the printed paper, from 1
+
+    class Meta:
+        ordering = ['paper', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['paper', 'question'], name='unique_question_per_paper')
+        ]
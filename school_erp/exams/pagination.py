@@ -0,0 +1,89 @@
+import json
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset pagination on the primary key, constant cost however deep the page"""
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class KeysetCursorPagination(IdCursorPagination):
+    """
+    Cursor pagination whose position is the whole ordering tuple, ending in id.
+
+    DRF's cursor only keeps the first ordering field and counts ties with an offset, so
+    on a column like date the pages fall back to offsets and rows inserted ahead of the
+    cursor shift them. Here every page is filtered on all ordering values instead.
+    """
+
+    def _get_position_from_instance(self, instance, ordering):
+        names = [field.lstrip('-') for field in ordering]
+        if isinstance(instance, dict):
+            return json.dumps([str(instance[name]) for name in names])
+        return json.dumps([str(getattr(instance, name)) for name in names])
+
+    def after_position(self, position, reverse):
+        """Rows strictly after `position` in the (possibly reversed) ordering"""
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        after = None
+        for field, value in reversed(list(zip(self.ordering, values))):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+            beyond = Q(**{f'{name}__{lookup}': value})
+            after = beyond if after is None else beyond | (Q(**{name: value}) & after)
+        return after
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor or (0, False, None)
+
+        ordering = [self._reverse(field) for field in self.ordering] if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self.after_position(current_position, reverse))
+
+        # One extra row tells whether another page follows
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        following = self._get_position_from_instance(results[-1], self.ordering) \
+            if len(results) > len(self.page) else None
+
+        has_position = current_position is not None or offset > 0
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = has_position, following is not None
+            self.next_position, self.previous_position = current_position, following
+        else:
+            self.has_next, self.has_previous = following is not None, has_position
+            self.next_position, self.previous_position = following, current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    @staticmethod
+    def _reverse(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+
+class ExamScheduleCursorPagination(KeysetCursorPagination):
+    # Timetable order, id keeps the cursor position unique
+    ordering = ('date', 'start_time', 'id')
@@ -0,0 +1,174 @@
+import random
+import sys
+import threading
+from collections import defaultdict
+from math import comb, gcd
+from time import perf_counter
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from .grading import answer_key_version, invalidate_exam_answer_key
+from .models import ExamSchedule, Question, QuestionPaper, PaperQuestion
+
+
+MARK_PRECISION = 100   # marks are matched to the hundredth
+
+
+def nth_combination(ids, taken, index):
+    """The index-th way, in lexicographic order, of taking `taken` ids from `ids`"""
+    picked = []
+    start = 0
+    for remaining in range(taken, 0, -1):
+        for position in range(start, len(ids)):
+            block = comb(len(ids) - position - 1, remaining - 1)
+            if index < block:
+                picked.append(ids[position])
+                start = position + 1
+                break
+            index -= block
+    return picked
+
+
+class QuestionBank:
+    """
+    A subject's questions bucketed by marks, in integer units so subset sums are exact.
+
+    For a target question count and total it counts, from the last bucket back, how many
+    distinct sets complete each (questions, marks) state. That gives the number of
+    possible papers up front, and numbers every set so distinct papers are drawn by
+    sampling indexes without replacement instead of redrawing until they differ.
+    """
+
+    def __init__(self, questions):
+        buckets = defaultdict(list)
+        for question_id, marks in questions:
+            buckets[round(marks * MARK_PRECISION)].append(question_id)
+        self.unit = 0
+        for marks in buckets:
+            self.unit = gcd(self.unit, marks)
+        self.unit = self.unit or 1
+        self.buckets = sorted((marks // self.unit, ids) for marks, ids in buckets.items())
+        self._plans = {}
+
+    def __len__(self):
+        return sum(len(ids) for _, ids in self.buckets)
+
+    def plan(self, count, total):
+        """ways[i][(questions, marks)] = distinct sets from buckets i.. filling that state exactly"""
+        key = (count, total)
+        if key not in self._plans:
+            ways = [defaultdict(int) for _ in self.buckets] + [{(0, 0): 1}]
+            for i in range(len(self.buckets) - 1, -1, -1):
+                marks, ids = self.buckets[i]
+                for (questions, points), following in ways[i + 1].items():
+                    for taken in range(min(len(ids), count - questions) + 1):
+                        if points + taken * marks > total:
+                            break
+                        ways[i][(questions + taken, points + taken * marks)] += comb(len(ids), taken) * following
+            self._plans[key] = ways
+        return self._plans[key]
+
+    def units(self, total_marks):
+        """total_marks in bank units, or None when no set of questions can add up to it"""
+        total = round(total_marks * MARK_PRECISION)
+        return None if total % self.unit else total // self.unit
+
+    def combinations(self, count, total_marks):
+        """How many distinct sets of `count` questions are worth exactly `total_marks`"""
+        total = self.units(total_marks)
+        if total is None:
+            return 0
+        return self.plan(count, total)[0].get((count, total), 0)
+
+    def nth(self, count, total, index):
+        """The index-th of those sets, taking counts bucket by bucket, then ids within each bucket"""
+        ways = self.plan(count, total)
+        picked = []
+        questions, points = count, total
+        for i, (marks, ids) in enumerate(self.buckets):
+            for taken in range(min(len(ids), questions) + 1):
+                following = ways[i + 1].get((questions - taken, points - taken * marks), 0)
+                if index < comb(len(ids), taken) * following:
+                    break
+                index -= comb(len(ids), taken) * following
+            chosen, index = divmod(index, following)
+            picked.extend(nth_combination(ids, taken, chosen))
+            questions -= taken
+            points -= taken * marks
+        return picked
+
+    def sample(self, count, total_marks, papers, rng):
+        """`papers` distinct sets of question ids, drawn uniformly without replacement"""
+        available = self.combinations(count, total_marks)
+        if not available:
+            raise ValidationError(f"No set of {count} questions adds up to {total_marks} marks")
+        if papers > available:
+            raise ValidationError(
+                f"Only {available} distinct papers of {count} questions add up to {total_marks} marks, "
+                f"{papers} were requested")
+
+        if available <= sys.maxsize:
+            indexes = rng.sample(range(available), papers)
+        else:
+            # range() cannot be sampled past sys.maxsize, and a repeat is all but impossible there
+            indexes = {}   # used as an ordered set, so a seed always yields the same papers
+            while len(indexes) < papers:
+                indexes.setdefault(rng.randrange(available))
+        total = self.units(total_marks)
+        return [self.nth(count, total, index) for index in indexes]
+
+
+_banks = {}
+_banks_lock = threading.Lock()
+
+
+def get_question_bank(subject_id):
+    """In-process question bank, rebuilt whenever the subject's question set version moves"""
+    version = answer_key_version(subject_id)
+    with _banks_lock:
+        cached = _banks.get(subject_id)
+    if cached and cached[0] == version:
+        return cached[1]
+    bank = QuestionBank(Question.objects.filter(subject_id=subject_id).values_list('id', 'marks'))
+    with _banks_lock:
+        _banks[subject_id] = (version, bank)
+    return bank
+
+
+def generate_papers(exam_schedule_id, papers, questions, total_marks=None, seed=None):
+    """
+    Draw `papers` distinct question sets for an exam, each with `questions` questions worth
+    `total_marks` (the exam's total by default), and store them as numbered variants.
+    Regenerating replaces the exam's previous papers.
+    """
+    started = perf_counter()
+    exam = ExamSchedule.objects.get(id=exam_schedule_id)
+    total_marks = exam.total_marks if total_marks is None else total_marks
+    if papers < 1 or questions < 1:
+        raise ValidationError("papers and questions must both be at least 1")
+
+    bank = get_question_bank(exam.subject_id)
+    if len(bank) < questions:
+        raise ValidationError(f"The question bank has only {len(bank)} questions for this subject")
+
+    rng = random.Random(seed)
+    drawn = bank.sample(questions, total_marks, papers, rng)
+    for picked in drawn:
+        rng.shuffle(picked)
+
+    with transaction.atomic():
+        QuestionPaper.objects.filter(exam_schedule=exam).delete()
+        stored = QuestionPaper.objects.bulk_create(
+            [QuestionPaper(exam_schedule=exam, variant=variant) for variant in range(1, len(drawn) + 1)])
+        PaperQuestion.objects.bulk_create([
+            PaperQuestion(paper=paper, question_id=question_id, position=position)
+            for paper, picked in zip(stored, drawn)
+            for position, question_id in enumerate(picked, start=1)
+        ])
+    # Answers are now checked against the new papers' questions only
+    invalidate_exam_answer_key(exam.id)
+
+    return {
+        'exam_schedule_id': exam.id,
+        'papers': [{'variant': paper.variant, 'question_ids': picked} for paper, picked in zip(stored, drawn)],
+        'seconds': round(perf_counter() - started, 4)
+    }
@@ -0,0 +1,112 @@
+import json
+import os
+import threading
+from collections import Counter, defaultdict, deque
+from pathlib import Path
+from django.conf import settings
+from .stats import percentile
+
+
+RING_SIZE = getattr(settings, 'QUERY_PROFILE_RING_SIZE', 2000)
+SNAPSHOT_EVERY = 50   # records between per-process snapshots on disk
+FINGERPRINT_LENGTH = 300
+
+
+class QueryRecorder:
+    """execute_wrapper that counts, times and fingerprints the queries of one request"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.count = 0
+        self.db_seconds = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = self.clock()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += self.clock() - started
+            self.count += 1
+            # params are passed separately, so the SQL text already is the query shape
+            self.fingerprints[sql[:FINGERPRINT_LENGTH]] += 1
+
+    def duplicates(self):
+        return [{'sql': sql, 'count': count} for sql, count in self.fingerprints.most_common() if count > 1]
+
+
+class ProfileBuffer:
+    """In-process ring buffer of request profiles, snapshotted to disk for manage.py"""
+
+    def __init__(self, size=RING_SIZE, snapshot_dir=None):
+        self._records = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._since_snapshot = 0
+        self.snapshot_dir = snapshot_dir
+
+    def add(self, record):
+        with self._lock:
+            self._records.append(record)
+            self._since_snapshot += 1
+            due = self.snapshot_dir and self._since_snapshot >= SNAPSHOT_EVERY
+            if due:
+                self._since_snapshot = 0
+                records = list(self._records)
+        if due:
+            self.snapshot(records)
+
+    def records(self):
+        with self._lock:
+            return list(self._records)
+
+    def snapshot(self, records):
+        directory = Path(self.snapshot_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'{os.getpid()}.json'
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(records))
+        tmp.replace(path)
+
+
+def load_snapshots(snapshot_dir):
+    records = []
+    for path in sorted(Path(snapshot_dir).glob('*.json')):
+        records.extend(json.loads(path.read_text()))
+    return records
+
+
+def summarize(records):
+    """Per-route p50/p95/p99 of latency plus query counts and the worst duplicate queries"""
+    routes = defaultdict(list)
+    for record in records:
+        routes[record['route']].append(record)
+
+    summary = []
+    for route, entries in routes.items():
+        latencies = sorted(entry['latency_ms'] for entry in entries)
+        queries = sorted(entry['queries'] for entry in entries)
+        duplicates = Counter()
+        for entry in entries:
+            for duplicate in entry['duplicates']:
+                duplicates[duplicate['sql']] += duplicate['count']
+        summary.append({
+            'route': route,
+            'requests': len(entries),
+            'latency_ms': {
+                'p50': percentile(latencies, 0.50),
+                'p95': percentile(latencies, 0.95),
+                'p99': percentile(latencies, 0.99)
+            },
+            'queries': {
+                'p50': percentile(queries, 0.50),
+                'p95': percentile(queries, 0.95),
+                'max': queries[-1]
+            },
+            'db_ms_avg': round(sum(entry['db_ms'] for entry in entries) / len(entries), 2),
+            'top_duplicates': [{'sql': sql, 'count': count} for sql, count in duplicates.most_common(5)]
+        })
+    summary.sort(key=lambda row: row['latency_ms']['p95'], reverse=True)
+    return summary
+
+
+profile_buffer = ProfileBuffer(snapshot_dir=getattr(settings, 'QUERY_PROFILE_DIR', None))
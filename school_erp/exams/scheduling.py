@@ -0,0 +1,607 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from time import perf_counter
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from .models import ExamSchedule, TeacherAvailability, Student, Venue, SeatAssignment, VenueBooking
+from .seating import pack_rooms, booked_rooms, book_rooms
+
+
+DAY_START = datetime.strptime("09:00", "%H:%M").time()
+SLOT_GAP_MINUTES = 30
+SLOT_STEP_MINUTES = 30   # grid of candidate start times used by the graph scheduler
+PRELOAD_DAYS = 30   # size of each bulk availability/schedule window
+MAX_HORIZON_DAYS = 365   # give up instead of walking forever
+
+
+class IntervalIndex:
+    """Half-open [start, end) intervals per key, answering overlap counts with bisect"""
+
+    def __init__(self):
+        self._starts = defaultdict(list)
+        self._ends = defaultdict(list)
+
+    def add(self, key, start, end):
+        insort(self._starts[key], start)
+        insort(self._ends[key], end)
+
+    def remove(self, key, start, end):
+        starts, ends = self._starts[key], self._ends[key]
+        del starts[bisect_left(starts, start)]
+        del ends[bisect_left(ends, end)]
+
+    def count_overlaps(self, key, start, end):
+        # intervals starting before `end` minus those already finished by `start`
+        if key not in self._starts:
+            return 0
+        return bisect_left(self._starts[key], end) - bisect_right(self._ends[key], start)
+
+    def overlaps(self, key, start, end):
+        return self.count_overlaps(key, start, end) > 0
+
+
+class SeatIndex:
+    """Seats booked per venue and day, checked against every overlapping booking"""
+
+    def __init__(self):
+        self._bookings = defaultdict(list)
+
+    def add(self, venue_id, start, end, seats):
+        insort(self._bookings[(venue_id, start.date())], (start, end, seats))
+
+    def remove(self, venue_id, start, end, seats):
+        self._bookings[(venue_id, start.date())].remove((start, end, seats))
+
+    def seats_in_use(self, venue_id, start, end):
+        bookings = self._bookings.get((venue_id, start.date()), [])
+        stop = bisect_left(bookings, (end,))
+        return sum(seats for s, e, seats in bookings[:stop] if e > start)
+
+
+def build_cohorts(exams):
+    """
+    Group students who sit exactly the same set of papers.
+
+    Returns one list of cohort ids per exam, so a student clash check only has to look
+    at each cohort once instead of at every student in the paper.
+    """
+    papers_by_student = defaultdict(set)
+    for position, exam in enumerate(exams):
+        for student in exam["students"]:
+            papers_by_student[student].add(position)
+
+    cohort_ids = {}
+    exam_cohorts = [set() for _ in exams]
+    for papers in papers_by_student.values():
+        cohort = cohort_ids.setdefault(frozenset(papers), len(cohort_ids))
+        for position in papers:
+            exam_cohorts[position].add(cohort)
+    return [sorted(cohorts) for cohorts in exam_cohorts]
+
+
+class Placement:
+    def __init__(self, position, exam, start, rooms=None):
+        self.position = position
+        self.exam = exam
+        self.start = start
+        self.end = start + timedelta(minutes=exam["duration"])
+        self.rooms = rooms or [(exam["venue_id"], len(exam["students"]))]
+
+    def as_dict(self):
+        return {
+            "class_id": self.exam["class_id"],
+            "subject_id": self.exam["subject_id"],
+            "teacher_id": self.exam["teacher_id"],
+            "date": self.start.date().isoformat(),
+            "start_time": self.start.time().isoformat(timespec='minutes'),
+            "duration": self.exam["duration"],
+            "venue_id": self.rooms[0][0],
+            "rooms": [{"venue_id": venue_id, "seats": seats} for venue_id, seats in self.rooms]
+        }
+
+    def to_model(self):
+        return ExamSchedule(
+            exam_type_id=self.exam["exam_type_id"],
+            exam_pattern_id=self.exam["exam_pattern_id"],
+            subject_id=self.exam["subject_id"],
+            class_assigned_id=self.exam["class_id"],
+            teacher_id=self.exam["teacher_id"],
+            date=self.start.date(),
+            start_time=self.start.time(),
+            duration_minutes=self.exam["duration"],
+            end_time=self.end.time(),
+            venue_id=self.rooms[0][0],
+            total_marks=self.exam["total_marks"],
+            passing_marks=self.exam["passing_marks"]
+        )
+
+    def bookings(self, exam_id):
+        """Rooms to store for the saved exam, none when it sits in its own venue alone"""
+        if len(self.rooms) == 1:
+            return []
+        return [VenueBooking(exam_schedule_id=exam_id, venue_id=venue_id, seats=seats)
+                for venue_id, seats in self.rooms]
+
+
+class SchedulingEngine:
+    """
+    Places exams using state preloaded in bulk instead of querying per candidate slot.
+
+    Teacher availability, already booked exams and venue capacities are loaded for a
+    date window in a handful of queries and kept in interval indexes per teacher,
+    class and venue. Every clash check is answered in memory and the final plan is
+    written with a single bulk_create.
+    """
+
+    REQUIRED_FIELDS = ['duration', 'students', 'venue_id', 'teacher_id', 'exam_type_id',
+                       'exam_pattern_id', 'subject_id', 'class_id', 'total_marks', 'passing_marks']
+
+    def __init__(self, exams, venues, start_date, on_progress=None, exclude_ids=(), split_rooms=False):
+        for exam in exams:
+            if not all(field in exam for field in self.REQUIRED_FIELDS):
+                raise ValidationError(f"Missing required fields in exam data: {self.REQUIRED_FIELDS}")
+
+        self.exams = exams
+        self.start_date = start_date
+        self.placements = []
+
+        self.teacher_ids = {exam["teacher_id"] for exam in exams}
+        self.class_ids = {exam["class_id"] for exam in exams}
+        self.venue_ids = {exam["venue_id"] for exam in exams}
+
+        self.availability = defaultdict(list)
+        self.class_busy = IntervalIndex()
+        self.teacher_busy = IntervalIndex()
+        self.venue_seats = SeatIndex()
+        self.cohort_busy = IntervalIndex()
+        self.exam_cohorts = build_cohorts(exams)
+
+        # Capacities sent with the request win over the stored Venue.capacity
+        self.capacity = dict(Venue.objects.filter(id__in=self.venue_ids).values_list('id', 'capacity'))
+        for venue_id, capacity in venues.items():
+            self.capacity[int(venue_id)] = capacity
+
+        # Papers too big for their venue may spill into any other known room, every
+        # stored venue when the request names none
+        self.split_rooms = split_rooms
+        if split_rooms:
+            if not venues:
+                self.capacity = dict(Venue.objects.values_list('id', 'capacity'))
+            self.venue_ids = set(self.capacity)
+
+        # Stored exams that are being moved, so they do not block their own new slot
+        self.exclude_ids = set(exclude_ids)
+        self.on_progress = on_progress
+        self.solver_seconds = 0.0
+        self.class_sizes = None
+        self.loaded_until = start_date - timedelta(days=1)
+
+    def preload(self, until):
+        """Bulk load availability and booked exams for every day up to `until`"""
+        if until <= self.loaded_until:
+            return
+        window_start = self.loaded_until + timedelta(days=1)
+        window_end = max(until, window_start + timedelta(days=PRELOAD_DAYS - 1))
+
+        for slot in TeacherAvailability.objects.filter(
+                teacher_id__in=self.teacher_ids,
+                date__range=(window_start, window_end)):
+            self.availability[(slot.teacher_id, slot.date)].append((slot.start_time, slot.end_time))
+
+        booked = list(ExamSchedule.objects.filter(
+            date__range=(window_start, window_end)
+        ).filter(
+            Q(class_assigned_id__in=self.class_ids) |
+            Q(teacher_id__in=self.teacher_ids) |
+            Q(venue_id__in=self.venue_ids) |
+            Q(id__in=VenueBooking.objects.filter(venue_id__in=self.venue_ids).values('exam_schedule_id'))
+        ).exclude(id__in=self.exclude_ids).values('id', 'class_assigned_id', 'teacher_id', 'venue_id', 'date',
+                                                  'start_time', 'duration_minutes'))
+
+        if booked and self.class_sizes is None:
+            self.class_sizes = dict(Student.objects.values_list('enrolled_class_id').annotate(Count('id')))
+
+        # Exams with bookings occupy the rooms they were split over, the rest their own venue
+        bookings = booked_rooms([row['id'] for row in booked])
+
+        for row in booked:
+            start = datetime.combine(row['date'], row['start_time'])
+            end = start + timedelta(minutes=row['duration_minutes'])
+            self.class_busy.add(row['class_assigned_id'], start, end)
+            self.teacher_busy.add(row['teacher_id'], start, end)
+            rooms = bookings.get(row['id']) or [(row['venue_id'], self.class_sizes.get(row['class_assigned_id'], 0))]
+            for venue_id, seats in rooms:
+                self.venue_seats.add(venue_id, start, end, seats)
+
+        self.loaded_until = window_end
+
+    def block_venue(self, venue_id, day):
+        """Take a venue out of use for a whole day"""
+        start = datetime.combine(day, time.min)
+        self.venue_seats.add(venue_id, start, start + timedelta(days=1), float('inf'))
+
+    def is_teacher_available(self, teacher_id, start, end):
+        if start.date() != end.date():
+            return False
+        for slot_start, slot_end in self.availability.get((teacher_id, start.date()), []):
+            if slot_start <= start.time() and slot_end >= end.time():
+                return True
+        return False
+
+    def rooms_for(self, position, start, end):
+        """Rooms seating the exam over [start, end) as [(venue_id, seats)], or None when it does not fit"""
+        exam = self.exams[position]
+        needed = len(exam["students"])
+        if not self.split_rooms:
+            free = self.capacity.get(exam["venue_id"], 0) - self.venue_seats.seats_in_use(exam["venue_id"], start, end)
+            return [(exam["venue_id"], needed)] if needed <= free else None
+        free = {
+            venue_id: capacity - self.venue_seats.seats_in_use(venue_id, start, end)
+            for venue_id, capacity in self.capacity.items()
+        }
+        return pack_rooms(needed, free, preferred=exam["venue_id"])
+
+    def has_clash(self, position, start, end):
+        exam = self.exams[position]
+        # Validate venue capacity
+        if self.rooms_for(position, start, end) is None:
+            return True
+
+        # Validate teacher availability
+        if not self.is_teacher_available(exam["teacher_id"], start, end):
+            return True
+        if self.teacher_busy.overlaps(exam["teacher_id"], start, end):
+            return True
+
+        # Check class and student schedule clashes
+        if self.class_busy.overlaps(exam["class_id"], start, end):
+            return True
+        for cohort in self.exam_cohorts[position]:
+            if self.cohort_busy.overlaps(cohort, start, end):
+                return True
+        return False
+
+    def report_progress(self):
+        if self.on_progress:
+            self.on_progress(len(self.placements), len(self.exams))
+
+    def place(self, position, start):
+        exam = self.exams[position]
+        end = start + timedelta(minutes=exam["duration"])
+        placement = Placement(position, exam, start, self.rooms_for(position, start, end))
+        self.class_busy.add(exam["class_id"], placement.start, placement.end)
+        self.teacher_busy.add(exam["teacher_id"], placement.start, placement.end)
+        for venue_id, seats in placement.rooms:
+            self.venue_seats.add(venue_id, placement.start, placement.end, seats)
+        for cohort in self.exam_cohorts[position]:
+            self.cohort_busy.add(cohort, placement.start, placement.end)
+        self.placements.append(placement)
+        return placement
+
+    def unplace(self, placement):
+        exam = placement.exam
+        self.class_busy.remove(exam["class_id"], placement.start, placement.end)
+        self.teacher_busy.remove(exam["teacher_id"], placement.start, placement.end)
+        for venue_id, seats in placement.rooms:
+            self.venue_seats.remove(venue_id, placement.start, placement.end, seats)
+        for cohort in self.exam_cohorts[placement.position]:
+            self.cohort_busy.remove(cohort, placement.start, placement.end)
+        self.placements.remove(placement)
+
+    @property
+    def days_used(self):
+        return len({p.start.date() for p in self.placements})
+
+    def run(self, algorithm='greedy', time_budget=0):
+        started = perf_counter()
+        if algorithm == 'greedy':
+            self.schedule_greedy()
+        elif algorithm == 'dsatur':
+            self.schedule_dsatur(time_budget)
+        else:
+            raise ValidationError(f"Unknown scheduling algorithm '{algorithm}', expected 'greedy' or 'dsatur'")
+        self.solver_seconds = perf_counter() - started
+        return self.placements
+
+    def schedule_greedy(self):
+        """First-fit in input order, walking one shared cursor forward on every clash"""
+        current_time = datetime.combine(self.start_date, DAY_START)
+        horizon = self.start_date + timedelta(days=MAX_HORIZON_DAYS)
+
+        for position, exam in enumerate(self.exams):
+            duration = exam["duration"]
+            while True:
+                if current_time.date() > horizon:
+                    raise ValidationError(
+                        f"Could not find a free slot for subject {exam['subject_id']} "
+                        f"of class {exam['class_id']} within {MAX_HORIZON_DAYS} days")
+                self.preload(current_time.date())
+
+                end = current_time + timedelta(minutes=duration)
+                if not self.has_clash(position, current_time, end):
+                    self.place(position, current_time)
+                    self.report_progress()
+                    break
+                current_time += timedelta(minutes=duration + SLOT_GAP_MINUTES)
+
+        return self.placements
+
+    def conflict_graph(self):
+        """Exams are nodes; sharing a class, teacher, venue or student cohort is an edge"""
+        groups = defaultdict(list)
+        for position, exam in enumerate(self.exams):
+            groups[('class', exam["class_id"])].append(position)
+            groups[('teacher', exam["teacher_id"])].append(position)
+            groups[('venue', exam["venue_id"])].append(position)
+            for cohort in self.exam_cohorts[position]:
+                groups[('cohort', cohort)].append(position)
+
+        neighbours = [set() for _ in self.exams]
+        for members in groups.values():
+            for position in members:
+                neighbours[position].update(members)
+        for position, adjacent in enumerate(neighbours):
+            adjacent.discard(position)
+        return neighbours
+
+    def earliest_start(self, position, before=None):
+        """First clash-free start on the slot grid inside the teacher's availability"""
+        exam = self.exams[position]
+        duration = timedelta(minutes=exam["duration"])
+        step = timedelta(minutes=SLOT_STEP_MINUTES)
+        day = self.start_date
+        horizon = self.start_date + timedelta(days=MAX_HORIZON_DAYS)
+
+        while day <= horizon:
+            self.preload(day)
+            for slot_start, slot_end in sorted(self.availability.get((exam["teacher_id"], day), [])):
+                candidate = datetime.combine(day, slot_start)
+                latest = datetime.combine(day, slot_end) - duration
+                while candidate <= latest:
+                    if before is not None and candidate >= before:
+                        return None
+                    if not self.has_clash(position, candidate, candidate + duration):
+                        return candidate
+                    candidate += step
+            day += timedelta(days=1)
+
+        if before is not None:
+            return None
+        raise ValidationError(
+            f"Could not find a free slot for subject {exam['subject_id']} "
+            f"of class {exam['class_id']} within {MAX_HORIZON_DAYS} days")
+
+    def schedule_dsatur(self, time_budget=0):
+        """
+        Colour the conflict graph with DSATUR, where colours are start times.
+
+        The next exam placed is the one whose placed neighbours already block the most
+        distinct start times, ties broken by degree. Each exam takes the earliest free
+        slot, so the timetable packs into as few days as the constraints allow. With a
+        time budget, a compaction pass then keeps pulling the latest exams earlier.
+        """
+        neighbours = self.conflict_graph()
+        saturation = [set() for _ in self.exams]
+        pending = set(range(len(self.exams)))
+
+        while pending:
+            position = max(pending, key=lambda p: (len(saturation[p]), len(neighbours[p]), -p))
+            pending.remove(position)
+            placement = self.place(position, self.earliest_start(position))
+            self.report_progress()
+            for neighbour in neighbours[position] & pending:
+                saturation[neighbour].add(placement.start)
+
+        if time_budget:
+            self.improve(time_budget)
+        self.placements.sort(key=lambda p: (p.start, p.position))
+        return self.placements
+
+    def improve(self, time_budget):
+        """Local search: move exams into earlier free slots until nothing moves or time runs out"""
+        deadline = perf_counter() + time_budget
+        moved = True
+        while moved and perf_counter() < deadline:
+            moved = False
+            for placement in sorted(self.placements, key=lambda p: p.start, reverse=True):
+                if perf_counter() >= deadline:
+                    break
+                self.unplace(placement)
+                start = self.earliest_start(placement.position, before=placement.start)
+                self.place(placement.position, start or placement.start)
+                moved = moved or start is not None
+
+    def save(self):
+        """Persist the whole plan and its room bookings in one transaction"""
+        return save_placements(self.placements)
+
+
+def save_placements(placements):
+    with transaction.atomic():
+        created = ExamSchedule.objects.bulk_create([p.to_model() for p in placements])
+        VenueBooking.objects.bulk_create([
+            booking for placement, exam in zip(placements, created) for booking in placement.bookings(exam.id)
+        ])
+    return created
+
+
+
+def payload_date(data, name, default=''):
+    try:
+        return datetime.strptime(str(data.get(name, default)), "%Y-%m-%d").date()
+    except ValueError:
+        raise ValidationError(f"{name} must be given as YYYY-MM-DD")
+
+
+def payload_seconds(data, name):
+    """A non-negative number of seconds, 0 when absent"""
+    value = data.get(name) or 0
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        raise ValidationError(f"{name} must be a number of seconds, got '{value}'")
+    if not 0 <= seconds < float('inf'):
+        raise ValidationError(f"{name} must be a finite number of seconds, not negative")
+    return seconds
+
+
+def plan_schedule(data, on_progress=None):
+    """Run the smart scheduler for a request payload and save the result"""
+    exams = data.get('exams', [])
+    venues = data.get('venues', {})
+    start_date = payload_date(data, 'start_date', '2025-09-10')
+    algorithm = data.get('algorithm', 'greedy')
+    time_budget = payload_seconds(data, 'time_budget_seconds')
+
+    # Validate input data
+    if not exams:
+        raise ValidationError("No exams provided for scheduling")
+    if not venues:
+        raise ValidationError("No venues provided for scheduling")
+
+    engine = SchedulingEngine(exams, venues, start_date, on_progress, split_rooms=bool(data.get('split_rooms')))
+    placements = engine.run(algorithm, time_budget)
+    engine.save()
+
+    return {
+        'scheduled_exams': [p.as_dict() for p in placements],
+        'algorithm': algorithm,
+        'days_used': engine.days_used,
+        'solver_seconds': round(engine.solver_seconds, 4)
+    }
+
+
+def exam_from_row(row, students):
+    """Engine input for an exam that is already stored"""
+    return {
+        "id": row.id,
+        "duration": row.duration_minutes,
+        "students": students,
+        "venue_id": row.venue_id,
+        "teacher_id": row.teacher_id,
+        "exam_type_id": row.exam_type_id,
+        "exam_pattern_id": row.exam_pattern_id,
+        "subject_id": row.subject_id,
+        "class_id": row.class_assigned_id,
+        "total_marks": row.total_marks,
+        "passing_marks": row.passing_marks
+    }
+
+
+def affected_by_change(data):
+    """
+    Apply the change described by the payload and return the start date, the stored
+    exams it breaks, the venue days to keep free and the new exam to place (if any).
+    """
+    change = data.get('change')
+
+    if change == 'availability_removed':
+        try:
+            slot = TeacherAvailability.objects.get(id=data.get('availability_id'))
+        except TeacherAvailability.DoesNotExist:
+            raise ValidationError(f"Teacher availability {data.get('availability_id')} not found")
+        slot.delete()
+        remaining = list(TeacherAvailability.objects.filter(
+            teacher_id=slot.teacher_id, date=slot.date).values_list('start_time', 'end_time'))
+        # Only exams that no remaining slot still covers have to move
+        rows = [
+            row for row in ExamSchedule.objects.filter(
+                teacher_id=slot.teacher_id, date=slot.date,
+                start_time__lt=slot.end_time, end_time__gt=slot.start_time)
+            if not any(start <= row.start_time and end >= row.end_time for start, end in remaining)
+        ]
+        return slot.date, rows, [], None
+
+    if change == 'venue_unavailable':
+        day = payload_date(data, 'date')
+        venue_id = data.get('venue_id')
+        if not Venue.objects.filter(id=venue_id).exists():
+            raise ValidationError(f"Venue {venue_id} not found")
+        # Exams seated in the venue, whether it is their own or one they were split into
+        rows = list(ExamSchedule.objects.filter(date=day).filter(
+            Q(venue_id=venue_id, venue_bookings__isnull=True) | Q(venue_bookings__venue_id=venue_id)
+        ).distinct())
+        return day, rows, [(venue_id, day)], None
+
+    if change == 'exam_added':
+        day = payload_date(data, 'start_date')
+        return day, [], [], data.get('exam') or {}
+
+    raise ValidationError(
+        f"Unknown change '{change}', expected 'availability_removed', 'venue_unavailable' or 'exam_added'")
+
+
+def repair_schedule(data):
+    """
+    Apply one change to the stored timetable and move only the exams it breaks.
+
+    Every other exam stays where it is and is loaded as a fixed obstacle. Broken exams
+    are re-placed at the earliest free slot from their original day onwards, so they
+    move as little as possible. Returns the moved and added exams as a diff.
+    """
+    with transaction.atomic():
+        start_date, rows, blocked_days, added = affected_by_change(data)
+
+        students = defaultdict(list)
+        for class_id, student_id in Student.objects.filter(
+                enrolled_class_id__in={row.class_assigned_id for row in rows}
+        ).values_list('enrolled_class_id', 'id'):
+            students[class_id].append(student_id)
+
+        exams = [exam_from_row(row, students[row.class_assigned_id]) for row in rows]
+        if added is not None:
+            exams.append(added)
+
+        engine = SchedulingEngine(exams, data.get('venues', {}), start_date,
+                                  exclude_ids=[row.id for row in rows], split_rooms=bool(data.get('split_rooms')))
+        for venue_id, day in blocked_days:
+            engine.block_venue(venue_id, day)
+
+        started = perf_counter()
+        for position in range(len(exams)):
+            engine.place(position, engine.earliest_start(position))
+        engine.solver_seconds = perf_counter() - started
+
+        bookings = booked_rooms([row.id for row in rows])
+        moved = []
+        now = timezone.now()
+        for row, placement in zip(rows, engine.placements):
+            rooms = bookings.get(row.id) or [(row.venue_id, len(placement.exam["students"]))]
+            if (row.date, row.start_time, sorted(room for room, _ in rooms)) == (
+                    placement.start.date(), placement.start.time(), sorted(room for room, _ in placement.rooms)):
+                continue
+            diff = {
+                "id": row.id,
+                "from": {"date": row.date.isoformat(), "start_time": row.start_time.isoformat(timespec='minutes'),
+                         "venue_id": row.venue_id,
+                         "rooms": [{"venue_id": venue_id, "seats": seats} for venue_id, seats in rooms]},
+                "to": {"date": placement.start.date().isoformat(),
+                       "start_time": placement.start.time().isoformat(timespec='minutes'),
+                       "venue_id": placement.rooms[0][0],
+                       "rooms": [{"venue_id": venue_id, "seats": seats} for venue_id, seats in placement.rooms]}
+            }
+            row.date = placement.start.date()
+            row.start_time = placement.start.time()
+            row.end_time = placement.end.time()
+            row.venue_id = placement.rooms[0][0]
+            row.updated_at = now   # bulk_update skips auto_now, the timetable ETag relies on it
+            moved.append((row, diff, placement))
+        ExamSchedule.objects.bulk_update([row for row, _, _ in moved],
+                                         ['date', 'start_time', 'end_time', 'venue', 'updated_at'])
+
+        # Moved exams hold their new rooms, and their old seat numbers no longer apply
+        for row, _, placement in moved:
+            book_rooms(row.id, row.venue_id, placement.rooms)
+        SeatAssignment.objects.filter(exam_schedule_id__in=[row.id for row, _, _ in moved]).delete()
+
+        created = save_placements(engine.placements[len(rows):])
+
+    return {
+        'moved': [diff for _, diff, _ in moved],
+        'added': [dict(p.as_dict(), id=exam.id) for p, exam in zip(engine.placements[len(rows):], created)],
+        'unchanged': len(rows) - len(moved),
+        'solver_seconds': round(engine.solver_seconds, 4)
+    }
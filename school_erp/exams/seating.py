@@ -0,0 +1,135 @@
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from time import perf_counter
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Q
+from .models import ExamSchedule, Student, Venue, SeatAssignment, VenueBooking
+
+
+def pack_rooms(needed, free, preferred=None):
+    """
+    Split `needed` seats over rooms with `free` seats each, using as few rooms as possible.
+
+    The preferred room is used alone whenever it fits, then the smallest single room that
+    fits. Otherwise the largest rooms are filled first and the remainder goes to the
+    smallest room that holds it. Returns [(venue_id, seats)] or None if nothing fits.
+    """
+    if preferred is not None and free.get(preferred, 0) >= needed:
+        return [(preferred, needed)]
+    rooms = sorted((seats, venue_id) for venue_id, seats in free.items() if seats > 0)
+    if sum(seats for seats, _ in rooms) < needed:
+        return None
+
+    plan = []
+    while True:
+        best_fit = bisect_left(rooms, (needed,))
+        if best_fit < len(rooms):
+            plan.append((rooms[best_fit][1], needed))
+            return plan
+        seats, venue_id = rooms.pop()
+        plan.append((venue_id, seats))
+        needed -= seats
+
+
+def booked_rooms(exam_ids):
+    """Rooms held by each exam that has bookings, as {exam_id: [(venue_id, seats)]}"""
+    rooms = defaultdict(list)
+    for exam_id, venue_id, seats in VenueBooking.objects.filter(
+            exam_schedule_id__in=exam_ids
+    ).order_by('id').values_list('exam_schedule_id', 'venue_id', 'seats'):
+        rooms[exam_id].append((venue_id, seats))
+    return rooms
+
+
+def book_rooms(exam_id, venue_id, rooms):
+    """
+    Replace the bookings of an exam with `rooms`. Nothing is stored when the exam
+    fits in its own venue, which is where an exam without bookings sits.
+    """
+    VenueBooking.objects.filter(exam_schedule_id=exam_id).delete()
+    if len(rooms) > 1 or rooms[0][0] != venue_id:
+        VenueBooking.objects.bulk_create([
+            VenueBooking(exam_schedule_id=exam_id, venue_id=room, seats=seats) for room, seats in rooms
+        ])
+
+
+def free_seat_numbers(exam, venue_ids):
+    """
+    Seat numbers still free in each venue while `exam` is being written.
+
+    Seats held by overlapping exams that already have assignments are skipped. Overlapping
+    exams without assignments hold their booked seats, or their class size in their own
+    venue, taken from the lowest free numbers, which is where their own assignment will
+    put them later.
+    """
+    overlapping = ExamSchedule.objects.filter(
+        date=exam.date, start_time__lt=exam.end_time, end_time__gt=exam.start_time
+    ).exclude(id=exam.id)
+
+    taken = defaultdict(set)
+    seated = set()
+    for exam_id, venue_id, seat_number in SeatAssignment.objects.filter(
+            exam_schedule__in=overlapping, venue_id__in=venue_ids
+    ).values_list('exam_schedule_id', 'venue_id', 'seat_number'):
+        taken[venue_id].add(seat_number)
+        seated.add(exam_id)
+
+    unseated = list(overlapping.filter(
+        Q(venue_id__in=venue_ids) | Q(venue_bookings__venue_id__in=venue_ids)
+    ).exclude(id__in=seated).distinct().values_list('id', 'venue_id', 'class_assigned_id'))
+    bookings = booked_rooms([exam_id for exam_id, _, _ in unseated])
+    class_sizes = dict(Student.objects.filter(
+        enrolled_class_id__in={class_id for exam_id, _, class_id in unseated if exam_id not in bookings}
+    ).values_list('enrolled_class_id').annotate(Count('id')))
+    reserved = Counter()
+    for exam_id, venue_id, class_id in unseated:
+        for room, seats in bookings.get(exam_id) or [(venue_id, class_sizes.get(class_id, 0))]:
+            reserved[room] += seats
+
+    return {
+        venue_id: [n for n in range(1, capacity + 1) if n not in taken[venue_id]][reserved[venue_id]:]
+        for venue_id, capacity in Venue.objects.filter(id__in=venue_ids).values_list('id', 'capacity')
+    }
+
+
+def assign_seats(exam_schedule_id, venue_ids=None, batch_size=2000):
+    """
+    Seat every student of the exam's class, splitting the paper over several rooms when
+    its own venue is too small. Rerunning replaces the exam's previous assignments and
+    bookings.
+    """
+    started = perf_counter()
+    exam = ExamSchedule.objects.get(id=exam_schedule_id)
+
+    if venue_ids is None:
+        venue_ids = list(Venue.objects.values_list('id', flat=True))
+    venue_ids = set(venue_ids) | {exam.venue_id}
+    student_ids = list(Student.objects.filter(enrolled_class_id=exam.class_assigned_id)
+                       .order_by('student_id').values_list('id', flat=True))
+
+    with transaction.atomic():
+        SeatAssignment.objects.filter(exam_schedule=exam).delete()
+        free = free_seat_numbers(exam, venue_ids)
+        rooms = pack_rooms(len(student_ids), {venue_id: len(seats) for venue_id, seats in free.items()},
+                           preferred=exam.venue_id)
+        if rooms is None:
+            raise ValidationError(
+                f"{len(student_ids)} students do not fit in the free seats of venues {sorted(venue_ids)}")
+
+        assignments = []
+        offset = 0
+        for venue_id, seats in rooms:
+            for student_id, seat_number in zip(student_ids[offset:offset + seats], free[venue_id]):
+                assignments.append(SeatAssignment(exam_schedule=exam, student_id=student_id,
+                                                  venue_id=venue_id, seat_number=seat_number))
+            offset += seats
+        SeatAssignment.objects.bulk_create(assignments, batch_size=batch_size)
+        book_rooms(exam.id, exam.venue_id, rooms)
+
+    return {
+        'exam_schedule_id': exam.id,
+        'students_assigned': len(assignments),
+        'rooms': [{'venue_id': venue_id, 'seats': seats} for venue_id, seats in rooms],
+        'seconds': round(perf_counter() - started, 4)
+    }
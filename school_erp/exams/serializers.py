@@ -1,46 +1,112 @@
 from rest_framework import serializers
-from .models import Board, Class, Subject, ExamPattern, ExamType, Venue, ExamSchedule, Question, StudentAnswer, ExamResult
+from .models import Board, Class, Subject, Teacher, ExamPattern, ExamType, Venue, ExamSchedule, Question, StudentAnswer, ExamResult
 
 
-class BoardSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """Keeps only the fields named in ?fields=a,b,c on read requests, unknown names are a 400"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        requested = request.query_params.get('fields')
+        if requested:
+            keep = {name.strip() for name in requested.split(',')}
+            unknown = keep - set(self.fields)
+            if unknown:
+                raise serializers.ValidationError({'fields': f"Unknown fields: {', '.join(sorted(unknown))}"})
+            for name in set(self.fields) - keep:
+                self.fields.pop(name)
+
+
+class BoardSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Board
         fields = '__all__'
 
 
-class ClassSerializer(serializers.ModelSerializer):
+class ClassSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Class
         fields = '__all__'
 
-class SubjectSerializer(serializers.ModelSerializer):
+class SubjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Subject
         fields = '__all__'
 
 
-class ExamTypeSerializer(serializers.ModelSerializer):
+class ExamTypeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ExamType
         fields = '__all__'
 
 
-class ExamPatternSerializer(serializers.ModelSerializer):
+class ExamPatternSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ExamPattern
         fields = '__all__'
 
-class VenueSerializer(serializers.ModelSerializer):
+class VenueSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Venue
         fields = '__all__'
 
 
-class ExamScheduleSerialzer(serializers.ModelSerializer):
+class ExamScheduleSerialzer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ExamSchedule
         fields = '__all__'
 
+class TimetableSubjectSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Subject
+        fields = ['id', 'name', 'code']
+
+
+class TimetableClassSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Class
+        fields = ['id', 'name']
+
+
+class TimetableTeacherSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Teacher
+        fields = ['id', 'name']
+
+
+class TimetableVenueSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Venue
+        fields = ['id', 'name']
+
+
+class TimetableExamTypeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ExamType
+        fields = ['id', 'name']
+
+
+class TimetableEntrySerializer(serializers.ModelSerializer):
+    """Read-only, denormalized timetable row; expects select_related on every relation"""
+    subject = TimetableSubjectSerializer()
+    class_assigned = TimetableClassSerializer()
+    teacher = TimetableTeacherSerializer()
+    venue = TimetableVenueSerializer()
+    exam_type = TimetableExamTypeSerializer()
+
+    class Meta:
+        model = ExamSchedule
+        fields = ['id', 'date', 'start_time', 'end_time', 'duration_minutes', 'mode',
+                  'subject', 'class_assigned', 'teacher', 'venue', 'exam_type']
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['class'] = data.pop('class_assigned')
+        return data
+
 class QuestionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Question
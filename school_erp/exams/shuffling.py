@@ -0,0 +1,72 @@
+import hashlib
+import hmac
+import random
+from django.conf import settings
+from .models import ExamMode, Question, PaperQuestion
+
+
+def student_seed(student_id, exam_schedule_id, *parts):
+    """
+    Stable seed for one student's view of an exam.
+
+    Keyed with SECRET_KEY, so the same (student, exam) always gets the same shuffle in
+    every process while students cannot work out each other's orderings.
+    """
+    message = ':'.join(str(part) for part in (exam_schedule_id, student_id, *parts)).encode()
+    digest = hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+def is_shuffled(exam):
+    return exam.mode == ExamMode.ONLINE
+
+
+def option_mapping(option_keys, student_id, exam_schedule_id, question_id):
+    """displayed label -> canonical Question.options key, for one student and question"""
+    labels = sorted(option_keys)
+    canonical = labels[:]
+    random.Random(student_seed(student_id, exam_schedule_id, question_id)).shuffle(canonical)
+    return dict(zip(labels, canonical))
+
+
+def canonical_option(answer_key, question_id, selected_option, student_id, exam):
+    """Map a displayed option back to its canonical key, None when the label is not on the paper"""
+    options = answer_key[question_id][2]
+    if not is_shuffled(exam):
+        return selected_option if selected_option in options else None
+    return option_mapping(options, student_id, exam.id, question_id).get(selected_option)
+
+
+def question_order(question_ids, student_id, exam):
+    ordered = list(question_ids)
+    if is_shuffled(exam):
+        random.Random(student_seed(student_id, exam.id)).shuffle(ordered)
+    return ordered
+
+
+def student_paper(exam, student_id):
+    """
+    The paper as one student sees it: their variant if question papers were generated,
+    questions in their own order and options relabelled. Nothing is stored per student.
+    """
+    variant = None
+    positions = list(PaperQuestion.objects.filter(paper__exam_schedule=exam).values_list(
+        'paper__variant', 'question_id').order_by('paper__variant', 'position'))
+    if positions:
+        variants = sorted({number for number, _ in positions})
+        variant = variants[student_seed(student_id, exam.id, 'variant') % len(variants)]
+        question_ids = [question_id for number, question_id in positions if number == variant]
+    else:
+        question_ids = list(Question.objects.filter(subject_id=exam.subject_id).order_by('id').values_list('id', flat=True))
+
+    questions = Question.objects.in_bulk(question_ids)
+    paper = []
+    for question_id in question_order(question_ids, student_id, exam):
+        question = questions[question_id]
+        options = question.options
+        if is_shuffled(exam):
+            mapping = option_mapping(options, student_id, exam.id, question_id)
+            options = {label: options[mapping[label]] for label in sorted(mapping)}
+        paper.append({'question_id': question_id, 'text': question.text, 'marks': question.marks,
+                      'options': options})
+    return {'exam_schedule_id': exam.id, 'student_id': student_id, 'variant': variant, 'questions': paper}
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save, post_delete
+from .analytics import mark_result_stale
+from .caching import bump_model_version
+from .grading import clear_grade_bands, invalidate_question_answer_keys
+from .models import Board, Class, Subject, Teacher, ExamType, ExamPattern, Venue, GradeScale, Question, ExamResult
+
+
+post_save.connect(clear_grade_bands, sender=GradeScale, dispatch_uid='clear_grade_bands_on_save')
+post_delete.connect(clear_grade_bands, sender=GradeScale, dispatch_uid='clear_grade_bands_on_delete')
+post_save.connect(invalidate_question_answer_keys, sender=Question, dispatch_uid='invalidate_answer_keys_on_save')
+post_delete.connect(invalidate_question_answer_keys, sender=Question, dispatch_uid='invalidate_answer_keys_on_delete')
+post_save.connect(mark_result_stale, sender=ExamResult, dispatch_uid='mark_result_stale_on_save')
+post_delete.connect(mark_result_stale, sender=ExamResult, dispatch_uid='mark_result_stale_on_delete')
+
+# Teacher has no cached list, its version only feeds the timetable ETag
+for model in (Board, Class, Subject, Teacher, ExamType, ExamPattern, Venue):
+    post_save.connect(bump_model_version, sender=model, dispatch_uid=f'bump_version_{model.__name__}_save')
+    post_delete.connect(bump_model_version, sender=model, dispatch_uid=f'bump_version_{model.__name__}_delete')
@@ -0,0 +1,13 @@
+import math
+
+
+def percentile(sorted_values, fraction):
+    """
+    Nearest-rank percentile of an ascending, non-empty list, `fraction` in [0, 1].
+
+    The rank is the smallest one covering `fraction` of the values. The product is
+    rounded before taking the ceiling, so float noise such as 0.07 * 100 == 7.000000000000001
+    still ranks 7th rather than 8th.
+    """
+    rank = math.ceil(round(fraction * len(sorted_values), 9))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
@@ -1,3 +1,1045 @@
+from datetime import date, datetime, time, timedelta
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from .autosave import answer_buffer
+from .models import (Board, Class, Subject, Teacher, TeacherAvailability, Venue, ExamType, ExamPattern,
+                     ExamSchedule, Student, Question, GradeScale, ExamResult)
 
-# Create your tests here.
+
+class ExamFixtureMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.board = Board.objects.create(name='CBSE')
+        cls.klass = Class.objects.create(name='10-A', board=cls.board)
+        cls.subject = Subject.objects.create(name='Maths', code='MATH10', board=cls.board)
+        cls.teacher = Teacher.objects.create(name='Ravi')
+        cls.venue = Venue.objects.create(name='Main Hall', capacity=200)
+        cls.exam_type = ExamType.objects.create(name='Final')
+        cls.exam_pattern = ExamPattern.objects.create(name='Objective', board=cls.board)
+        TeacherAvailability.objects.create(teacher=cls.teacher, date=date.today(),
+                                           start_time=time(0, 0), end_time=time(23, 59))
+        # Spans the whole day so the "exam is ongoing" check always passes
+        cls.exam = ExamSchedule.objects.create(
+            exam_type=cls.exam_type, exam_pattern=cls.exam_pattern, subject=cls.subject,
+            class_assigned=cls.klass, teacher=cls.teacher, date=date.today(), start_time=time(0, 0),
+            duration_minutes=1439, venue=cls.venue, total_marks=100, passing_marks=35)
+        cls.student = Student.objects.create(name='Asha', student_id='S001', enrolled_class=cls.klass)
+        GradeScale.objects.create(name='A', min_score=50, max_score=100)
+        GradeScale.objects.create(name='B', min_score=0, max_score=49.99)
+        cls.user = User.objects.create_user('coordinator', password='secret')
+
+    def setUp(self):
+        from .caching import MASTER_DATA_CACHE, VERSION_CACHE
+        # Test data is rolled back, cached answer keys, grade bands and lists would outlive it
+        for alias in ('default', MASTER_DATA_CACHE, VERSION_CACHE):
+            caches[alias].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def make_questions(self, count, marks=1.0):
+        from .grading import invalidate_answer_keys
+        questions = Question.objects.bulk_create([
+            Question(subject=self.subject, text=f'Q{i}', options={'A': '1', 'B': '2'},
+                     correct_option='A', marks=marks)
+            for i in range(count)
+        ])
+        invalidate_answer_keys(self.subject.id)   # bulk_create sends no post_save
+        return questions
+
+    def exam_payload(self, students=(), **overrides):
+        return dict({
+            "duration": 60,
+            "students": list(students),
+            "venue_id": self.venue.id,
+            "teacher_id": self.teacher.id,
+            "exam_type_id": self.exam_type.id,
+            "exam_pattern_id": self.exam_pattern.id,
+            "subject_id": self.subject.id,
+            "class_id": self.klass.id,
+            "total_marks": 100,
+            "passing_marks": 35
+        }, **overrides)
+
+
+class SchedulingEngineTests(ExamFixtureMixin, TestCase):
+    def at(self, hour, minute=0, day=None):
+        return datetime.combine(day or date.today(), time(hour, minute))
+
+    def test_interval_index_treats_touching_intervals_as_free(self):
+        from .scheduling import IntervalIndex
+        index = IntervalIndex()
+        index.add('room', self.at(9), self.at(10))
+        self.assertFalse(index.overlaps('room', self.at(10), self.at(11)))
+        self.assertFalse(index.overlaps('room', self.at(8), self.at(9)))
+        self.assertTrue(index.overlaps('room', self.at(9, 59), self.at(11)))
+        self.assertTrue(index.overlaps('room', self.at(8), self.at(12)))
+        self.assertFalse(index.overlaps('other', self.at(9), self.at(10)))
+        index.remove('room', self.at(9), self.at(10))
+        self.assertFalse(index.overlaps('room', self.at(9), self.at(10)))
+
+    def test_seat_index_counts_only_overlapping_bookings(self):
+        from .scheduling import SeatIndex
+        seats = SeatIndex()
+        seats.add(1, self.at(9), self.at(10), 30)
+        seats.add(1, self.at(9, 30), self.at(11), 20)
+        self.assertEqual(seats.seats_in_use(1, self.at(9, 45), self.at(10, 15)), 50)
+        self.assertEqual(seats.seats_in_use(1, self.at(10), self.at(12)), 20)
+        self.assertEqual(seats.seats_in_use(1, self.at(11), self.at(12)), 0)
+        self.assertEqual(seats.seats_in_use(2, self.at(9), self.at(10)), 0)
+
+    def test_preloaded_exam_blocks_its_teacher_class_and_venue(self):
+        from .scheduling import SchedulingEngine
+        other_class = Class.objects.create(name='10-B', board=self.board)
+        other_teacher = Teacher.objects.create(name='Lata')
+        TeacherAvailability.objects.create(teacher=other_teacher, date=date.today(),
+                                           start_time=time(0, 0), end_time=time(23, 59))
+        small = Venue.objects.create(name='Lab', capacity=1)
+        exams = [
+            self.exam_payload(class_id=other_class.id, venue_id=small.id),   # same teacher as self.exam
+            self.exam_payload(teacher_id=other_teacher.id, venue_id=small.id),   # same class as self.exam
+            self.exam_payload([1, 2], class_id=other_class.id, teacher_id=other_teacher.id, venue_id=small.id),
+            self.exam_payload([1], class_id=other_class.id, teacher_id=other_teacher.id, venue_id=small.id),
+        ]
+        engine = SchedulingEngine(exams, {}, date.today())
+        engine.preload(date.today())
+        start, end = self.at(10), self.at(11)
+        self.assertTrue(engine.has_clash(0, start, end))
+        self.assertTrue(engine.has_clash(1, start, end))
+        self.assertTrue(engine.has_clash(2, start, end))   # two students, one seat
+        self.assertFalse(engine.has_clash(3, start, end))
+
+        engine.place(3, start)
+        self.assertTrue(engine.has_clash(3, self.at(10, 30), self.at(11, 30)))
+        self.assertFalse(engine.has_clash(3, end, self.at(12)))
+
+    def test_exam_outside_teacher_availability_clashes(self):
+        from .scheduling import SchedulingEngine
+        tomorrow = date.today() + timedelta(days=1)
+        TeacherAvailability.objects.create(teacher=self.teacher, date=tomorrow,
+                                           start_time=time(9), end_time=time(12))
+        engine = SchedulingEngine([self.exam_payload()], {}, tomorrow)
+        engine.preload(tomorrow)
+        self.assertFalse(engine.has_clash(0, self.at(11, day=tomorrow), self.at(12, day=tomorrow)))
+        self.assertTrue(engine.has_clash(0, self.at(11, 30, day=tomorrow), self.at(12, 30, day=tomorrow)))
+
+
+class CohortTests(ExamFixtureMixin, TestCase):
+    def test_shared_students_and_classes_never_overlap(self):
+        from .scheduling import SchedulingEngine, build_cohorts
+        tomorrow = date.today() + timedelta(days=1)
+        teachers = Teacher.objects.bulk_create([Teacher(name=f'T{i}') for i in range(3)])
+        TeacherAvailability.objects.bulk_create([
+            TeacherAvailability(teacher=teacher, date=tomorrow, start_time=time(9), end_time=time(17))
+            for teacher in teachers])
+        class_b = Class.objects.create(name='10-B', board=self.board)
+        class_c = Class.objects.create(name='10-C', board=self.board)
+        exams = [
+            self.exam_payload([1, 2], class_id=class_b.id, teacher_id=teachers[0].id),
+            self.exam_payload([2, 3], class_id=class_c.id, teacher_id=teachers[1].id),   # shares student 2
+            self.exam_payload([1], class_id=class_b.id, teacher_id=teachers[2].id),   # same class as the first
+        ]
+        cohorts = build_cohorts(exams)
+        self.assertEqual(len(set(cohorts[0]) & set(cohorts[1])), 1)
+        self.assertEqual(len(set(cohorts[0]) & set(cohorts[2])), 1)
+
+        placements = SchedulingEngine(exams, {}, tomorrow).run('dsatur')
+        spans = {p.position: (p.start, p.end) for p in placements}
+        for other in (1, 2):
+            (start, end), (other_start, other_end) = spans[0], spans[other]
+            self.assertTrue(end <= other_start or other_end <= start, (spans[0], spans[other]))
+        self.assertEqual(spans[1], spans[2])   # no shared student or class, so they run together
+
+
+class DsaturTests(ExamFixtureMixin, TestCase):
+    def test_dsatur_needs_no_more_slots_than_greedy(self):
+        from .scheduling import SchedulingEngine
+        tomorrow = date.today() + timedelta(days=1)
+        teachers = Teacher.objects.bulk_create([Teacher(name=f'T{i}') for i in range(6)])
+        TeacherAvailability.objects.bulk_create([
+            TeacherAvailability(teacher=teacher, date=tomorrow + timedelta(days=day),
+                                start_time=time(9), end_time=time(17))
+            for teacher in teachers for day in range(3)])
+        classes = Class.objects.bulk_create([Class(name=f'11-{i}', board=self.board) for i in range(2)])
+        # Greedy never walks back, so the second class waits behind the first one's clashes
+        exams = [self.exam_payload([n // 3], class_id=classes[n // 3].id, teacher_id=teacher.id)
+                 for n, teacher in enumerate(teachers)]
+
+        slots = {}
+        for algorithm in ('greedy', 'dsatur'):
+            placements = SchedulingEngine(exams, {}, tomorrow).run(algorithm, time_budget=0.5)
+            self.assertEqual(len(placements), len(exams))
+            slots[algorithm] = len({p.start for p in placements})
+        self.assertLessEqual(slots['dsatur'], slots['greedy'])
+        self.assertEqual(slots['dsatur'], 3)
+
+    def test_bad_time_budget_is_rejected(self):
+        for budget in ('soon', -1, [1]):
+            response = self.client.post('/api/smart-schedule/', {
+                'exams': [self.exam_payload()], 'venues': {self.venue.id: 200},
+                'algorithm': 'dsatur', 'time_budget_seconds': budget
+            }, format='json')
+            self.assertEqual(response.status_code, 400, budget)
+            self.assertIn('time_budget_seconds', response.json()['error'])
+
+
+class ScheduleJobTests(ExamFixtureMixin, TestCase):
+    def test_job_is_queued_after_commit_and_reports_its_status(self):
+        from .jobs import run_schedule_job
+        tomorrow = date.today() + timedelta(days=1)
+        TeacherAvailability.objects.create(teacher=self.teacher, date=tomorrow,
+                                           start_time=time(9), end_time=time(17))
+        with mock.patch('exams.jobs.get_executor') as executor:
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = self.client.post('/api/smart-schedule/', {
+                    'async': True, 'exams': [self.exam_payload([self.student.id])],
+                    'venues': {self.venue.id: 200}, 'start_date': tomorrow.isoformat()
+                }, format='json')
+                self.assertEqual(response.status_code, 202, response.content)
+                executor.return_value.submit.assert_not_called()
+            for callback in callbacks:
+                callback()
+        job_id = response.json()['job_id']
+        executor.return_value.submit.assert_called_once_with(run_schedule_job, job_id)
+        self.assertEqual(self.client.get(f'/api/schedule-jobs/{job_id}/').json()['status'], 'Pending')
+
+        run_schedule_job(job_id)
+        status = self.client.get(f'/api/schedule-jobs/{job_id}/').json()
+        self.assertEqual((status['status'], status['progress']), ('Succeeded', 100))
+        self.assertEqual(status['result']['scheduled_exams'][0]['date'], tomorrow.isoformat())
+
+    def test_job_left_in_flight_by_a_dead_worker_is_failed(self):
+        from django.utils import timezone
+        from .models import ScheduleJob
+        job = ScheduleJob.objects.create(payload={})
+        ScheduleJob.objects.filter(id=job.id).update(updated_at=timezone.now() - timedelta(days=1))
+        status = self.client.get(f'/api/schedule-jobs/{job.id}/').json()
+        self.assertEqual(status['status'], 'Failed')
+        self.assertEqual(self.client.get('/api/schedule-jobs/0/').status_code, 404)
+
+    def test_concurrent_first_requests_build_one_pool(self):
+        import threading
+        from . import jobs
+        start = threading.Barrier(8)
+
+        def first_request():
+            start.wait()
+            jobs.get_executor()
+
+        with mock.patch.object(jobs, '_executor', None), \
+                mock.patch.object(jobs, 'fail_orphaned_jobs') as fail_orphaned, \
+                mock.patch.object(jobs, 'ThreadPoolExecutor') as pool:
+            threads = [threading.Thread(target=first_request) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual((pool.call_count, fail_orphaned.call_count), (1, 1))
+
+
+class EvaluateExamTests(ExamFixtureMixin, TestCase):
+    def evaluate(self, questions, student=None):
+        answers = [{'question_id': q.id, 'selected_option': 'A'} for q in questions]
+        return self.client.post('/api/evaluate-exam/', {
+            'student_id': (student or self.student).id,
+            'exam_schedule_id': self.exam.id,
+            'answers': answers
+        }, format='json')
+
+    def test_query_count_does_not_grow_with_paper_length(self):
+        from .analytics import mark_stale
+        from .grading import get_grade_bands
+        mark_stale([self.exam.id])   # the exam's first result also creates its summary row
+        # Versions left by earlier tests must not decide which evaluation reloads the bands
+        cache.clear()
+        get_grade_bands()
+        counts = []
+        for length in (5, 100):
+            questions = self.make_questions(length, marks=100 / length)
+            student = Student.objects.create(name=f'Student {length}', student_id=f'S{length}',
+                                             enrolled_class=self.klass)
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.evaluate(questions, student)
+            self.assertEqual(response.status_code, 200, response.content)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_answer_key_is_served_from_cache_until_a_question_changes(self):
+        questions = self.make_questions(5)
+        self.evaluate(questions)
+        with CaptureQueriesContext(connection) as ctx:
+            self.evaluate(questions)
+        self.assertFalse([q for q in ctx.captured_queries if 'exams_question' in q['sql']])
+
+        questions[0].correct_option = 'B'
+        questions[0].save()
+        response = self.evaluate(questions)
+        self.assertEqual(response.json()['total_score'], 4)
+
+    def test_answer_key_narrows_to_the_generated_papers(self):
+        questions = self.make_questions(5)
+        self.assertEqual(self.evaluate(questions).status_code, 200)
+        papers = self.client.post('/api/question-papers/generate/', {
+            'exam_schedule_id': self.exam.id, 'questions': 2, 'total_marks': 2, 'seed': 1
+        }, format='json').json()['papers']
+        on_paper = {question_id for paper in papers for question_id in paper['question_ids']}
+
+        response = self.evaluate([q for q in questions if q.id in on_paper])
+        self.assertEqual((response.status_code, response.json()['total_score']), (200, 2))
+        off_paper = next(q for q in questions if q.id not in on_paper)
+        self.assertEqual(self.evaluate([off_paper]).json()['error'], f"['Invalid question {off_paper.id}']")
+
+    def test_grace_marks_lift_score_to_passing(self):
+        questions = self.make_questions(32)
+        response = self.evaluate(questions)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['grace_marks'], 3)
+        result = ExamResult.objects.get(student=self.student, exam_schedule=self.exam)
+        self.assertEqual(result.marks_obtained, 35)
+
+    def test_score_outside_every_band_is_ungraded_and_not_stored(self):
+        top = GradeScale.objects.get(name='A')
+        top.max_score = 90
+        top.save()
+        questions = self.make_questions(1, marks=95)   # above the top band
+        response = self.evaluate(questions)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual((response.json()['final_score'], response.json()['grade']), (95, 'Ungraded'))
+        self.assertFalse(ExamResult.objects.filter(student=self.student, exam_schedule=self.exam).exists())
+
+
+class BulkGradingTests(ExamFixtureMixin, TestCase):
+    def test_grades_every_student_and_upserts(self):
+        from .models import StudentAnswer
+        questions = self.make_questions(10, marks=10)
+        students = [Student.objects.create(name=f'S{i}', student_id=f'B{i}', enrolled_class=self.klass)
+                    for i in range(3)]
+        StudentAnswer.objects.bulk_create([
+            StudentAnswer(student=student, question=q, exam_schedule=self.exam,
+                          selected_option='A' if n < 3 + 3 * i else 'B')
+            for i, student in enumerate(students) for n, q in enumerate(questions)
+        ])
+        ExamResult.objects.create(student=students[0], exam_schedule=self.exam, marks_obtained=0,
+                                  graded_scale=GradeScale.objects.get(name='B'))
+
+        response = self.client.post('/api/evaluate-exam/bulk/', {'exam_schedule_id': self.exam.id}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['students_graded'], 3)
+        marks = dict(ExamResult.objects.values_list('student_id', 'marks_obtained'))
+        # 30 + 5 grace, 60, 90
+        self.assertEqual([marks[s.id] for s in students], [35, 60, 90])
+
+    def test_invalid_sheet_is_reported_and_the_rest_graded(self):
+        from .models import StudentAnswer
+        questions = self.make_questions(11, marks=10)   # 110 marks on a 100 mark paper
+        other = Student.objects.create(name='Bala', student_id='S002', enrolled_class=self.klass)
+        StudentAnswer.objects.bulk_create([
+            StudentAnswer(student=student, question=q, exam_schedule=self.exam,
+                          selected_option='A' if student == self.student or n < 6 else 'B')
+            for student in (self.student, other) for n, q in enumerate(questions)
+        ])
+
+        response = self.client.post('/api/evaluate-exam/bulk/', {'exam_schedule_id': self.exam.id}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['students_graded'], 1)
+        self.assertEqual([s['student_id'] for s in response.json()['invalid_students']], [self.student.id])
+        self.assertEqual(ExamResult.objects.get().student, other)
+
+
+class GradeBandTests(TestCase):
+    def test_lookup_and_invalidation(self):
+        from .grading import get_grade_bands
+        GradeScale.objects.create(name='C', min_score=0, max_score=39.99)
+        GradeScale.objects.create(name='B', min_score=40, max_score=74.99)
+        self.assertEqual(get_grade_bands().lookup(39.995).name, 'C')
+        self.assertEqual(get_grade_bands().lookup(74.99).name, 'B')
+        self.assertIsNone(get_grade_bands().lookup(80))
+
+        GradeScale.objects.create(name='A', min_score=75, max_score=100)
+        self.assertEqual(get_grade_bands().lookup(80).name, 'A')
+
+    def test_edit_in_another_worker_retires_local_bands(self):
+        from django.core.cache import caches
+        from .caching import VERSION_CACHE, bump_version
+        from .grading import GRADE_BANDS_VERSION_KEY, get_grade_bands
+        GradeScale.objects.create(name='B', min_score=0, max_score=100)
+        self.assertEqual(get_grade_bands().lookup(80).name, 'B')
+
+        # A queryset update sends no signal, as if the edit happened in another process
+        GradeScale.objects.update(name='Pass')
+        self.assertEqual(get_grade_bands().lookup(80).name, 'B')
+        bump_version(caches[VERSION_CACHE], GRADE_BANDS_VERSION_KEY)
+        self.assertEqual(get_grade_bands().lookup(80).name, 'Pass')
+        # A per-process cache would keep the edit from ever reaching the other workers
+        from django.core.cache.backends.locmem import LocMemCache
+        self.assertNotIsInstance(caches[VERSION_CACHE], LocMemCache)
+
+    def test_rejects_overlapping_and_gapped_bands(self):
+        from django.core.exceptions import ValidationError
+        from .grading import GradeBands
+        with self.assertRaises(ValidationError):
+            GradeBands([GradeScale(name='B', min_score=0, max_score=50), GradeScale(name='A', min_score=50, max_score=100)])
+        with self.assertRaises(ValidationError):
+            GradeBands([GradeScale(name='B', min_score=0, max_score=40), GradeScale(name='A', min_score=50, max_score=100)])
+
+
+class AutosaveTests(ExamFixtureMixin, TestCase):
+    @mock.patch.object(answer_buffer, 'flush_seconds', 3600)
+    def test_keeps_last_write_per_question_until_final_submit(self):
+        from .models import StudentAnswer
+        questions = self.make_questions(3)
+
+        def save(option, final=False):
+            return self.client.post('/api/answers/autosave/', {
+                'student_id': self.student.id,
+                'exam_schedule_id': self.exam.id,
+                'answers': [{'question_id': q.id, 'selected_option': option} for q in questions],
+                'final': final
+            }, format='json')
+
+        self.assertEqual(save('A').json()['flushed'], 0)
+        self.assertFalse(StudentAnswer.objects.exists())
+
+        response = save('B', final=True)
+        self.assertEqual(response.json()['flushed'], 3)
+        self.assertEqual(set(StudentAnswer.objects.values_list('selected_option', flat=True)), {'B'})
+
+    def test_sheet_buffered_by_another_worker_never_overwrites_a_final_submit(self):
+        from .autosave import AnswerBuffer
+        from .models import AnswerSubmission, StudentAnswer
+        questions = self.make_questions(2)
+        other_worker = AnswerBuffer(flush_seconds=3600)
+        with mock.patch.object(other_worker, 'start'):   # flushed by hand below
+            other_worker.add(self.student.id, self.exam.id,
+                             [{'question_id': questions[0].id, 'selected_option': 'A'}])
+
+        response = self.client.post('/api/answers/autosave/', {
+            'student_id': self.student.id,
+            'exam_schedule_id': self.exam.id,
+            'answers': [{'question_id': q.id, 'selected_option': 'B'} for q in questions],
+            'final': True
+        }, format='json')
+        self.assertEqual(response.json()['flushed'], 2)
+        self.assertEqual(other_worker.flush(), 0)
+        self.assertEqual(set(StudentAnswer.objects.values_list('selected_option', flat=True)), {'B'})
+        self.assertTrue(AnswerSubmission.objects.filter(student=self.student, exam_schedule=self.exam).exists())
+
+    def test_failed_timer_flush_is_logged_and_retried(self):
+        from .autosave import AnswerBuffer
+
+        class Stop(BaseException):
+            pass
+
+        buffer = AnswerBuffer(flush_seconds=0)
+        buffer._pending = {(self.student.id, self.exam.id): {1: 'A'}}
+        with mock.patch('exams.autosave.sleep', side_effect=[None, Stop]), \
+                mock.patch.object(buffer, 'flush', side_effect=RuntimeError('database is locked')), \
+                self.assertLogs('exams.autosave', 'ERROR') as logs:
+            with self.assertRaises(Stop):
+                buffer._run()
+        self.assertIn('database is locked', logs.output[0])
+
+
+class QueryProfilingTests(ExamFixtureMixin, TestCase):
+    def test_percentile_uses_nearest_rank(self):
+        from .stats import percentile
+        hundred = list(range(1, 101))
+        self.assertEqual([percentile(hundred, f) for f in (0.07, 0.5, 0.95, 0.99, 1.0)], [7, 50, 95, 99, 100])
+        self.assertEqual([percentile([1, 2, 3, 4], f) for f in (0, 0.25, 0.5, 0.75)], [1, 1, 2, 3])
+        self.assertEqual(percentile([5], 0.99), 5)
+
+    def test_buffer_keeps_the_latest_records_and_snapshots_them(self):
+        import tempfile
+        from .profiling import SNAPSHOT_EVERY, ProfileBuffer, load_snapshots
+        with tempfile.TemporaryDirectory() as snapshot_dir:
+            buffer = ProfileBuffer(size=10, snapshot_dir=snapshot_dir)
+            for i in range(SNAPSHOT_EVERY):
+                buffer.add({'n': i})
+            self.assertEqual([record['n'] for record in buffer.records()],
+                             list(range(SNAPSHOT_EVERY - 10, SNAPSHOT_EVERY)))
+            self.assertEqual(load_snapshots(snapshot_dir), buffer.records())
+
+    def test_middleware_records_queries_and_query_report_prints_them(self):
+        import io
+        import tempfile
+        from django.core.management import call_command
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from .middleware import QueryProfileMiddleware
+        from .profiling import ProfileBuffer
+
+        def view(request):
+            for _ in range(3):
+                list(Board.objects.filter(id=self.board.id))
+            return HttpResponse()
+
+        with tempfile.TemporaryDirectory() as snapshot_dir:
+            buffer = ProfileBuffer(snapshot_dir=snapshot_dir)
+            with mock.patch('exams.middleware.profile_buffer', buffer):
+                middleware = QueryProfileMiddleware(view)
+                middleware.sample_rate = 1
+                middleware(RequestFactory().get('/api/boards/'))
+            record, = buffer.records()
+            self.assertEqual((record['route'], record['queries']), ('GET /api/boards/', 3))
+            self.assertEqual(record['duplicates'][0]['count'], 3)
+
+            buffer.snapshot(buffer.records())
+            out = io.StringIO()
+            call_command('query_report', dir=snapshot_dir, duplicates=True, stdout=out)
+            self.assertIn('GET /api/boards/', out.getvalue())
+            self.assertIn('x3 SELECT', out.getvalue())
+
+
+class IndexBenchmarkTests(TestCase):
+    def test_small_run_uses_the_indexes_and_puts_them_back(self):
+        import io
+        from django.core.management import call_command
+        out = io.StringIO()
+        call_command('benchmark_indexes', results=40, students=20, schedules=30, teachers=3, repeat=1, stdout=out)
+        self.assertIn('Without indexes', out.getvalue())
+        self.assertIn('exam_class_date_idx', out.getvalue())   # named in the indexed query plan
+        self.assertFalse(ExamSchedule.objects.exists())   # the seeded rows are rolled back
+
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, ExamSchedule._meta.db_table)
+        self.assertTrue({'exam_class_date_idx', 'exam_teacher_date_idx', 'exam_venue_date_idx'} <= set(constraints))
+
+
+class OverlapValidationTests(ExamFixtureMixin, TestCase):
+    def make_exam(self, start, duration, klass=None):
+        return ExamSchedule.objects.create(
+            exam_type=self.exam_type, exam_pattern=self.exam_pattern, subject=self.subject,
+            class_assigned=klass or self.klass, teacher=self.teacher, date=date.today() + timedelta(days=1),
+            start_time=start, duration_minutes=duration, venue=self.venue, total_marks=100, passing_marks=35)
+
+    def test_overlaps_are_found_in_sql_and_midnight_is_a_hard_stop(self):
+        from django.core.exceptions import ValidationError
+        TeacherAvailability.objects.create(teacher=self.teacher, date=date.today() + timedelta(days=1),
+                                           start_time=time(0, 0), end_time=time(23, 59))
+        self.make_exam(time(9), 120)
+        self.make_exam(time(11), 60)   # starts as the first one ends
+        with self.assertRaisesMessage(ValidationError, 'Exam clash detected'):
+            self.make_exam(time(10, 30), 60)
+        with self.assertRaisesMessage(ValidationError, 'must finish before midnight'):
+            self.make_exam(time(23), 120, Class.objects.create(name='10-B', board=self.board))
+
+    def test_split_exam_counts_only_its_booked_seats_in_the_venue(self):
+        from django.core.exceptions import ValidationError
+        from .models import VenueBooking
+        TeacherAvailability.objects.create(teacher=self.teacher, date=date.today() + timedelta(days=1),
+                                           start_time=time(0, 0), end_time=time(23, 59))
+        Venue.objects.filter(id=self.venue.id).update(capacity=3)
+        lab = Venue.objects.create(name='Lab', capacity=3)
+        big = Class.objects.create(name='10-B', board=self.board)
+        Student.objects.bulk_create([Student(name=f'S{i}', student_id=f'X{i}', enrolled_class=big) for i in range(5)])
+        with self.assertRaisesMessage(ValidationError, '5 seats needed, capacity 3'):
+            self.make_exam(time(9), 60, big)
+
+        split = ExamSchedule(exam_type=self.exam_type, exam_pattern=self.exam_pattern, subject=self.subject,
+                             class_assigned=big, teacher=self.teacher, date=date.today() + timedelta(days=1),
+                             start_time=time(9), duration_minutes=60, end_time=time(10), venue=self.venue,
+                             total_marks=100, passing_marks=35)
+        ExamSchedule.objects.bulk_create([split])
+        VenueBooking.objects.bulk_create([VenueBooking(exam_schedule=split, venue=self.venue, seats=2),
+                                          VenueBooking(exam_schedule=split, venue=lab, seats=3)])
+        self.make_exam(time(9), 60)   # one student next to the two booked seats
+        split.save()   # its full_clean counts 2 booked seats, not the 5 students
+        late = Class.objects.create(name='10-C', board=self.board)
+        Student.objects.create(name='C', student_id='C1', enrolled_class=late)
+        with self.assertRaisesMessage(ValidationError, '4 seats needed, capacity 3'):
+            self.make_exam(time(9, 30), 30, late)
+
+
+class ImportTests(ExamFixtureMixin, TestCase):
+    def test_students_import_reports_bad_rows_and_keeps_the_rest(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        self.user.is_staff = True
+        self.user.save()
+        body = ("name,student_id,board,class\n"
+                "Meera,S100,CBSE,10-A\n"
+                "Ghost,S101,CBSE,12-Z\n"
+                "Asha again,S001,CBSE,10-A\n"
+                "Kiran,S102,CBSE,10-A\n")
+        response = self.client.post('/api/imports/students/', {
+            'file': SimpleUploadedFile('students.csv', body.encode())
+        }, format='multipart')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['created'], 2)
+        self.assertEqual([e['row'] for e in response.json()['errors']], [2, 3])
+        self.assertTrue(Student.objects.filter(student_id='S102').exists())
+
+    def test_broken_json_lines_are_row_errors(self):
+        import io
+        from .importers import import_rows, read_rows
+        body = ('{"name": "Meera", "student_id": "S100", "board": "CBSE", "class": "10-A"}\n'
+                '{"name": "Ghost", \n'
+                '\n'
+                '[1, 2]\n'
+                '{"name": "Kiran", "student_id": "S102", "board": "CBSE", "class": "10-A"}\n')
+        errors = []
+        report = import_rows('students', read_rows(io.StringIO(body), 'jsonl'), chunk_size=2,
+                             on_error=lambda row, message: errors.append((row, message)))
+        self.assertEqual(report, {'created': 2, 'failed': 2})
+        self.assertEqual([row for row, _ in errors], [2, 4])
+
+    def test_list_in_a_reference_field_is_a_row_error(self):
+        import io
+        from .importers import RowImporter, import_rows, read_rows
+        body = ('{"name": "Meera", "student_id": "S100", "board": "CBSE", "class": "10-A"}\n'
+                '{"name": "Ghost", "student_id": "S101", "board": "CBSE", "class": ["10-A"]}\n'
+                '{"name": "Kiran", "student_id": "S102", "board": "CBSE", "class": "10-A"}\n')
+        errors = []
+        report = import_rows('students', read_rows(io.StringIO(body), 'jsonl'), chunk_size=2,
+                             on_error=lambda row, message: errors.append((row, message)))
+        self.assertEqual(report, {'created': 2, 'failed': 1})
+        self.assertEqual(errors, [(2, 'class must be a single value')])
+        with self.assertRaises(TypeError):
+            RowImporter()
+
+
+class ExportTests(ExamFixtureMixin, TestCase):
+    def test_results_stream_as_csv_and_jsonl(self):
+        import json
+        ExamResult.objects.create(student=self.student, exam_schedule=self.exam, marks_obtained=72,
+                                  graded_scale=GradeScale.objects.get(name='A'))
+
+        response = self.client.get('/api/results/export/', {'output': 'csv', 'board': self.board.id})
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:2], ['student_id', 'student_name'])
+        self.assertEqual(lines[1].split(',')[:4], ['S001', 'Asha', 'CBSE', '10-A'])
+
+        response = self.client.get('/api/results/export/', {'output': 'jsonl', 'class': self.klass.id + 1})
+        self.assertEqual(b''.join(response.streaming_content), b'')
+        response = self.client.get('/api/results/export/', {'output': 'jsonl'})
+        row = json.loads(b''.join(response.streaming_content))
+        self.assertEqual((row['marks_obtained'], row['grade']), (72, 'A'))
+
+    def test_malformed_filter_is_rejected_before_streaming(self):
+        response = self.client.get('/api/results/export/', {'exam_type': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('exam_type', response.json()['error'])
+
+
+class ListQueryTests(ExamFixtureMixin, TestCase):
+    def make_exams(self, count, day=None):
+        # Same day and time for every exam, so only the id keeps the cursor order unique
+        classes = Class.objects.bulk_create([Class(name=f'9-{i}', board=self.board) for i in range(count)])
+        return ExamSchedule.objects.bulk_create([
+            ExamSchedule(exam_type=self.exam_type, exam_pattern=self.exam_pattern, subject=self.subject,
+                         class_assigned=klass, teacher=self.teacher, date=day or date.today(), start_time=time(9),
+                         duration_minutes=60, end_time=time(10), venue=self.venue, total_marks=100,
+                         passing_marks=35)
+            for klass in classes])
+
+    def test_sparse_fields_and_filters(self):
+        response = self.client.get('/api/exam-schedules/', {'fields': 'date,subject', 'class': self.klass.id})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['results'], [{'date': date.today().isoformat(), 'subject': self.subject.id}])
+
+        response = self.client.get('/api/exam-schedules/', {'fields': 'date,colour'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('colour', str(response.json()))
+        self.assertEqual(self.client.get('/api/exam-schedules/', {'teacher': 'abc'}).status_code, 400)
+
+    def test_cursor_pages_survive_inserts_ahead_of_the_cursor(self):
+        expected = [self.exam.id] + [exam.id for exam in self.make_exams(5)]
+        first = self.client.get('/api/exam-schedules/', {'page_size': 3}).json()
+        # An offset paginator would now serve the third exam again on page two
+        self.make_exams(1, day=date.today() - timedelta(days=1))
+        second = self.client.get(first['next']).json()
+        self.assertEqual([exam['id'] for exam in first['results'] + second['results']], expected)
+        self.assertIsNone(second['next'])
+        back = self.client.get(second['previous']).json()
+        self.assertEqual([exam['id'] for exam in back['results']], expected[:3])
+
+
+class TimetableTests(ExamFixtureMixin, TestCase):
+    def test_etag_follows_exams_and_the_names_they_show(self):
+        first = self.client.get('/api/timetable/')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()['exams'][0]['subject']['name'], 'Maths')
+        etag = first['ETag']
+        self.assertEqual(self.client.get('/api/timetable/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.subject.name = 'Mathematics'
+        self.subject.save()
+        renamed = self.client.get('/api/timetable/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(renamed.status_code, 200)
+        self.assertEqual(renamed.json()['exams'][0]['subject']['name'], 'Mathematics')
+
+        self.teacher.name = 'Ravi K'
+        self.teacher.save()
+        self.assertEqual(self.client.get('/api/timetable/', HTTP_IF_NONE_MATCH=renamed['ETag']).status_code, 200)
+
+    def test_classes_with_the_same_name_are_separate_groups(self):
+        other_board = Board.objects.create(name='ICSE')
+        twin = Class.objects.create(name=self.klass.name, board=other_board)
+        ExamSchedule.objects.create(
+            exam_type=self.exam_type, exam_pattern=self.exam_pattern, subject=self.subject,
+            class_assigned=twin, teacher=self.teacher, date=date.today(), start_time=time(0, 0),
+            duration_minutes=60, venue=self.venue, total_marks=100, passing_marks=35)
+
+        groups = self.client.get('/api/timetable/', {'group_by': 'class'}).json()['groups']
+        self.assertEqual([(group['key'], group['label']) for group in groups],
+                         [(self.klass.id, '10-A'), (twin.id, '10-A')])
+        self.assertEqual(self.client.get('/api/timetable/', {'group_by': 'room'}).status_code, 400)
+
+
+class MasterDataCacheTests(ExamFixtureMixin, TestCase):
+    def test_list_is_cached_until_the_model_changes(self):
+        first = self.client.get('/api/boards/')
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get('/api/boards/')
+        self.assertEqual(first.json(), second.json())
+        self.assertFalse([q for q in ctx.captured_queries if 'exams_board' in q['sql']])
+
+        Board.objects.create(name='ICSE')
+        names = [board['name'] for board in self.client.get('/api/boards/').json()['results']]
+        self.assertIn('ICSE', names)
+
+
+class RepairScheduleTests(ExamFixtureMixin, TestCase):
+    def test_closed_venue_moves_only_its_exams(self):
+        tomorrow = date.today() + timedelta(days=1)
+        TeacherAvailability.objects.create(teacher=self.teacher, date=tomorrow,
+                                           start_time=time(0, 0), end_time=time(23, 59))
+        response = self.client.post('/api/smart-schedule/repair/', {
+            'change': 'venue_unavailable', 'venue_id': self.venue.id, 'date': date.today().isoformat()
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['moved'], [{
+            'id': self.exam.id,
+            'from': {'date': date.today().isoformat(), 'start_time': '00:00', 'venue_id': self.venue.id,
+                     'rooms': [{'venue_id': self.venue.id, 'seats': 1}]},
+            'to': {'date': tomorrow.isoformat(), 'start_time': '00:00', 'venue_id': self.venue.id,
+                   'rooms': [{'venue_id': self.venue.id, 'seats': 1}]},
+        }])
+        self.exam.refresh_from_db()
+        self.assertEqual(self.exam.date, tomorrow)
+
+    def test_split_repair_moves_the_exam_into_every_free_room(self):
+        from .models import SeatAssignment, VenueBooking
+        from .scheduling import SchedulingEngine
+        lab = Venue.objects.create(name='Lab', capacity=2)
+        annex = Venue.objects.create(name='Annex', capacity=2)
+        Student.objects.bulk_create([Student(name=f'S{i}', student_id=f'X{i}', enrolled_class=self.klass)
+                                     for i in range(2)])
+        SeatAssignment.objects.create(exam_schedule=self.exam, student=self.student, venue=self.venue, seat_number=1)
+
+        # No venues in the payload, so every stored room is a candidate
+        response = self.client.post('/api/smart-schedule/repair/', {
+            'change': 'venue_unavailable', 'venue_id': self.venue.id, 'date': date.today().isoformat(),
+            'split_rooms': True
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['moved'][0]['to'], {
+            'date': date.today().isoformat(), 'start_time': '00:00', 'venue_id': annex.id,
+            'rooms': [{'venue_id': annex.id, 'seats': 2}, {'venue_id': lab.id, 'seats': 1}]})
+        self.exam.refresh_from_db()
+        self.assertEqual(self.exam.venue_id, annex.id)
+        self.assertEqual(set(VenueBooking.objects.filter(exam_schedule=self.exam).values_list('venue_id', 'seats')),
+                         {(annex.id, 2), (lab.id, 1)})
+        self.assertFalse(SeatAssignment.objects.filter(exam_schedule=self.exam).exists())
+
+        # The seat booked in the second room is read back as taken
+        engine = SchedulingEngine([self.exam_payload([1, 2], venue_id=lab.id, class_id=Class.objects.create(
+            name='10-B', board=self.board).id, teacher_id=Teacher.objects.create(name='Lata').id)], {}, date.today())
+        engine.preload(date.today())
+        self.assertIsNone(engine.rooms_for(0, datetime.combine(date.today(), time(10)),
+                                           datetime.combine(date.today(), time(11))))
+
+    def test_split_plan_books_every_room(self):
+        from .models import VenueBooking
+        from .scheduling import SchedulingEngine
+        lab = Venue.objects.create(name='Lab', capacity=2)
+        start = datetime.combine(date.today() + timedelta(days=1), time(9))
+        engine = SchedulingEngine([self.exam_payload([1, 2, 3], venue_id=lab.id)],
+                                  {lab.id: 2, self.venue.id: 1}, start.date(), split_rooms=True)
+        engine.place(0, start)
+        [exam] = engine.save()
+        self.assertEqual(exam.venue_id, lab.id)
+        self.assertEqual(set(VenueBooking.objects.filter(exam_schedule=exam).values_list('venue_id', 'seats')),
+                         {(lab.id, 2), (self.venue.id, 1)})
+
+    def test_failed_repair_keeps_the_availability(self):
+        slot = TeacherAvailability.objects.get(teacher=self.teacher)
+        response = self.client.post('/api/smart-schedule/repair/', {
+            'change': 'availability_removed', 'availability_id': slot.id
+        }, format='json')
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertTrue(TeacherAvailability.objects.filter(id=slot.id).exists())
+
+
+class SeatingTests(ExamFixtureMixin, TestCase):
+    def test_pack_rooms_prefers_one_room_then_splits(self):
+        from .seating import pack_rooms
+        self.assertEqual(pack_rooms(30, {1: 20, 2: 40, 3: 100}), [(2, 30)])
+        self.assertEqual(pack_rooms(30, {1: 20, 2: 40}, preferred=1), [(2, 30)])
+        self.assertEqual(pack_rooms(130, {1: 20, 2: 40, 3: 100}), [(3, 100), (2, 30)])
+        self.assertIsNone(pack_rooms(200, {1: 20, 2: 40, 3: 100}))
+
+    def test_large_class_is_split_over_rooms(self):
+        from .models import SeatAssignment
+        small = Venue.objects.create(name='Lab', capacity=3)
+        self.venue.capacity = 2
+        self.venue.save()
+        Student.objects.bulk_create([Student(name=f'S{i}', student_id=f'X{i}', enrolled_class=self.klass)
+                                     for i in range(4)])
+        response = self.client.post('/api/seating/assign/', {'exam_schedule_id': self.exam.id}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['rooms'], [{'venue_id': small.id, 'seats': 3},
+                                                    {'venue_id': self.venue.id, 'seats': 2}])
+        self.assertEqual(SeatAssignment.objects.filter(exam_schedule=self.exam).count(), 5)
+
+
+class BenchmarkTests(TestCase):
+    def test_tiny_term_runs_every_case_and_flags_extra_queries(self):
+        from .benchmarks import run_benchmarks, compare
+        report = run_benchmarks('tiny', repeat=1)
+        self.assertEqual(set(report['results']),
+                         {'smart_schedule_greedy', 'smart_schedule_dsatur', 'evaluate_exam', 'validators'})
+        self.assertFalse(Student.objects.exists())   # the synthetic term is rolled back
+
+        baseline = {'scale': 'tiny', 'results': {name: dict(result, queries=result['queries'] - 1)
+                                                 for name, result in report['results'].items()}}
+        self.assertEqual(len(compare(baseline, report)), 4)
+
+
+class AnalyticsTests(ExamFixtureMixin, TestCase):
+    def test_summary_follows_result_writes(self):
+        grade_a, grade_b = GradeScale.objects.get(name='A'), GradeScale.objects.get(name='B')
+        other = Student.objects.create(name='Bala', student_id='S002', enrolled_class=self.klass)
+        ExamResult.objects.create(student=self.student, exam_schedule=self.exam, marks_obtained=80, graded_scale=grade_a)
+        result = ExamResult.objects.create(student=other, exam_schedule=self.exam, marks_obtained=20,
+                                           graded_scale=grade_b)
+
+        # The stored row is served as is and refreshed in the background
+        from .analytics import run_refresh
+        with mock.patch('exams.analytics.get_executor') as executor:
+            self.assertTrue(self.client.get(f'/api/analytics/exams/{self.exam.id}/').json()['stale'])
+        executor.return_value.submit.assert_called_once_with(run_refresh, [self.exam.id])
+        run_refresh([self.exam.id])
+
+        summary = self.client.get(f'/api/analytics/exams/{self.exam.id}/').json()
+        self.assertEqual((summary['students'], summary['passed'], summary['average']), (2, 1, 50))
+        self.assertEqual(summary['grade_distribution'], {'A': 1, 'B': 1})
+        self.assertEqual([t['student_id'] for t in summary['toppers']], ['S001', 'S002'])
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(f'/api/analytics/summaries/?class={self.klass.id}')
+        self.assertFalse([q for q in ctx.captured_queries if 'exams_examresult' in q['sql']])
+
+        result.marks_obtained, result.graded_scale = 90, grade_a
+        result.save()
+        with mock.patch('exams.analytics.get_executor') as executor:
+            summaries = self.client.get(f'/api/analytics/summaries/?class={self.klass.id}').json()['results']
+            self.client.get(f'/api/analytics/summaries/?class={self.klass.id}')
+        self.assertEqual((summaries[0]['passed'], summaries[0]['stale']), (1, True))
+        executor.return_value.submit.assert_called_once_with(run_refresh, [self.exam.id])
+
+        run_refresh([self.exam.id])
+        summaries = self.client.get(f'/api/analytics/summaries/?class={self.klass.id}').json()['results']
+        self.assertEqual((summaries[0]['passed'], summaries[0]['highest'], summaries[0]['stale']), (2, 90, False))
+
+    def test_refresh_never_clears_a_newer_invalidation(self):
+        from . import analytics
+        from .models import ResultSummary
+        grade = GradeScale.objects.get(name='A')
+        ExamResult.objects.create(student=self.student, exam_schedule=self.exam, marks_obtained=80, graded_scale=grade)
+        compute = analytics.compute_summaries
+
+        def result_written_meanwhile(exam_schedule_ids):
+            summaries = compute(exam_schedule_ids)
+            ExamResult.objects.filter(student=self.student).update(marks_obtained=60)
+            analytics.mark_stale(exam_schedule_ids)
+            return summaries
+
+        with mock.patch.object(analytics, 'compute_summaries', result_written_meanwhile):
+            analytics.refresh_summaries([self.exam.id])
+        summary = ResultSummary.objects.get(exam_schedule=self.exam)
+        self.assertTrue(summary.stale)
+
+        analytics.refresh_summaries([self.exam.id])
+        summary.refresh_from_db()
+        self.assertEqual((summary.highest, summary.stale), (60, False))
+
+
+class MeritListTests(ExamFixtureMixin, TestCase):
+    def test_ties_share_a_rank_in_sql_and_arrays(self):
+        import json
+        grade = GradeScale.objects.get(name='A')
+        for i, marks in enumerate([90, 75, 90, 60]):
+            student = Student.objects.create(name=f'M{i}', student_id=f'M{i}', enrolled_class=self.klass)
+            ExamResult.objects.create(student=student, exam_schedule=self.exam, marks_obtained=marks, graded_scale=grade)
+
+        for method in ('sql', 'arrays'):
+            response = self.client.get(f'/api/results/merit-list/?board={self.board.id}'
+                                       f'&exam_type={self.exam_type.id}&method={method}')
+            rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+            self.assertEqual([(r['student_id'], r['rank'], r['dense_rank'], r['percentile']) for r in rows],
+                             [('M0', 1, 1, 100.0), ('M2', 1, 1, 100.0), ('M1', 3, 2, 50.0), ('M3', 4, 3, 25.0)])
+
+    def test_bad_ids_are_rejected_before_streaming(self):
+        base = f'/api/results/merit-list/?board={self.board.id}&exam_type={self.exam_type.id}'
+        for url in (f'{base}&class=abc', f'{base}&subject=x', '/api/results/merit-list/?board=abc&exam_type=1',
+                    f'/api/results/merit-list/?board={self.board.id}'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn('error', response.json())
+        self.assertEqual(self.client.get(f'{base}&class={self.klass.id}').status_code, 200)
+
+
+class AssessmentTests(ExamFixtureMixin, TestCase):
+    def test_weighted_totals_follow_weightage_changes(self):
+        from .models import AssessmentParameter
+        knowledge = AssessmentParameter.objects.create(name='Knowledge', weightage=60)
+        presentation = AssessmentParameter.objects.create(name='Presentation', weightage=40)
+        other = Student.objects.create(name='Bala', student_id='S002', enrolled_class=self.klass)
+
+        response = self.client.post('/api/assessment/scores/', {'exam_schedule_id': self.exam.id, 'scores': [
+            {'student_id': self.student.id, 'parameter_id': knowledge.id, 'score': 80},
+            {'student_id': self.student.id, 'parameter_id': presentation.id, 'score': 50},
+            {'student_id': other.id, 'parameter_id': knowledge.id, 'score': 90},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['incomplete'], [{'exam_schedule_id': self.exam.id, 'student_id': other.id}])
+        result = ExamResult.objects.get(student=self.student, exam_schedule=self.exam)
+        self.assertEqual((result.marks_obtained, result.graded_scale.name), (68, 'A'))
+
+        self.user.is_staff = True
+        self.user.save()
+        bad = self.client.put('/api/assessment/weightages/', {'weightages': {knowledge.id: 50, presentation.id: 40}},
+                              format='json')
+        self.assertEqual(bad.status_code, 400)
+        self.client.put('/api/assessment/weightages/', {'weightages': {knowledge.id: 20, presentation.id: 80}},
+                        format='json')
+        result.refresh_from_db()
+        self.assertEqual(result.marks_obtained, 56)
+
+    def test_students_who_lose_a_total_lose_their_result(self):
+        from .assessment import compute_totals
+        from .models import AssessmentParameter, ParameterScore
+        knowledge = AssessmentParameter.objects.create(name='Knowledge', weightage=100)
+        other = Student.objects.create(name='Bala', student_id='S002', enrolled_class=self.klass)
+        # Ids sent as strings still match the stored students and parameters
+        response = self.client.post('/api/assessment/scores/', {'exam_schedule_id': self.exam.id, 'scores': [
+            {'student_id': str(student.id), 'parameter_id': str(knowledge.id), 'score': 70}
+            for student in (self.student, other)
+        ]}, format='json')
+        self.assertEqual(response.json()['students_graded'], 2, response.content)
+        bad = self.client.post('/api/assessment/scores/', {'exam_schedule_id': self.exam.id, 'scores': [
+            {'student_id': 'abc', 'parameter_id': knowledge.id, 'score': 70}]}, format='json')
+        self.assertEqual(bad.status_code, 400)
+        bad = self.client.post('/api/assessment/scores/', {'exam_schedule_id': self.exam.id, 'scores': [
+            {'student_id': self.student.id, 'parameter_id': knowledge.id, 'score': True}]}, format='json')
+        self.assertEqual(bad.status_code, 400)
+
+        # A new parameter leaves both rubrics incomplete, one bad total is reported on its own
+        AssessmentParameter.objects.filter(id=knowledge.id).update(weightage=50)
+        presentation = AssessmentParameter.objects.create(name='Presentation', weightage=50)
+        ParameterScore.objects.create(student=other, exam_schedule=self.exam, parameter=presentation, score=60)
+        from django.core.exceptions import ValidationError
+        with mock.patch('exams.assessment.validate_result_calculation',
+                        side_effect=ValidationError("Invalid grace marks applied")):
+            report = compute_totals(ParameterScore.objects.all())
+        self.assertEqual(report['incomplete'], [{'exam_schedule_id': self.exam.id, 'student_id': self.student.id}])
+        self.assertEqual(report['invalid_students'], [{'exam_schedule_id': self.exam.id, 'student_id': other.id,
+                                                       'error': 'Invalid grace marks applied'}])
+        self.assertFalse(ExamResult.objects.filter(exam_schedule=self.exam).exists())
+
+    def test_hand_entered_results_are_not_withdrawn(self):
+        from .assessment import compute_totals
+        from .models import AssessmentParameter, GradeScale, ParameterScore
+        AssessmentParameter.objects.create(name='Knowledge', weightage=60)
+        presentation = AssessmentParameter.objects.create(name='Presentation', weightage=40)
+        ExamResult.objects.create(student=self.student, exam_schedule=self.exam, marks_obtained=75,
+                                  graded_scale=GradeScale.objects.get(name='A'))
+        ParameterScore.objects.create(student=self.student, exam_schedule=self.exam, parameter=presentation, score=60)
+        report = compute_totals(ParameterScore.objects.all())
+        self.assertEqual(report['incomplete'], [{'exam_schedule_id': self.exam.id, 'student_id': self.student.id}])
+        self.assertEqual(ExamResult.objects.get(student=self.student, exam_schedule=self.exam).marks_obtained, 75)
+
+
+class QuestionPaperTests(ExamFixtureMixin, TestCase):
+    def test_distinct_papers_hit_the_targets(self):
+        from .models import PaperQuestion
+        self.make_questions(20, marks=1)
+        self.make_questions(10, marks=2.5)
+        marks = dict(Question.objects.values_list('id', 'marks'))
+
+        response = self.client.post('/api/question-papers/generate/', {
+            'exam_schedule_id': self.exam.id, 'papers': 5, 'questions': 12, 'total_marks': 18, 'seed': 7
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        papers = [paper['question_ids'] for paper in response.json()['papers']]
+        self.assertEqual(len({frozenset(paper) for paper in papers}), 5)
+        for paper in papers:
+            self.assertEqual((len(set(paper)), sum(marks[q] for q in paper)), (12, 18))
+        self.assertEqual(PaperQuestion.objects.count(), 60)
+
+        impossible = self.client.post('/api/question-papers/generate/', {
+            'exam_schedule_id': self.exam.id, 'questions': 3, 'total_marks': 2
+        }, format='json')
+        self.assertEqual(impossible.status_code, 400)
+
+    def test_every_possible_paper_can_be_drawn_and_no_more(self):
+        self.make_questions(4, marks=1)
+        self.make_questions(2, marks=2)
+        # Four marks from three questions: two 1-mark and one 2-mark, 6 * 2 = 12 ways
+        response = self.client.post('/api/question-papers/generate/', {
+            'exam_schedule_id': self.exam.id, 'papers': 12, 'questions': 3, 'total_marks': 4
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(len({frozenset(paper['question_ids']) for paper in response.json()['papers']}), 12)
+
+        too_many = self.client.post('/api/question-papers/generate/', {
+            'exam_schedule_id': self.exam.id, 'papers': 13, 'questions': 3, 'total_marks': 4
+        }, format='json')
+        self.assertEqual(too_many.status_code, 400)
+        self.assertIn('Only 12 distinct papers', too_many.json()['error'])
+
+        # Form posts carry total_marks as a string
+        form = self.client.post('/api/question-papers/generate/', {
+            'exam_schedule_id': self.exam.id, 'papers': '2', 'questions': '3', 'total_marks': '4'})
+        self.assertEqual(form.status_code, 200, form.content)
+        bad = self.client.post('/api/question-papers/generate/', {
+            'exam_schedule_id': self.exam.id, 'questions': '3', 'total_marks': 'four'})
+        self.assertEqual(bad.status_code, 400)
+
+
+class ShufflingTests(ExamFixtureMixin, TestCase):
+    def test_displayed_options_are_graded_against_canonical_keys(self):
+        from .grading import invalidate_answer_keys
+        from .models import ExamMode
+        self.exam.mode = ExamMode.ONLINE
+        self.exam.save()
+        Question.objects.bulk_create([
+            Question(subject=self.subject, text=f'Q{i}', options={'A': 'right', 'B': 'w1', 'C': 'w2', 'D': 'w3'},
+                     correct_option='A', marks=5)
+            for i in range(20)
+        ])
+        invalidate_answer_keys(self.subject.id)   # bulk_create sends no post_save
+        other = Student.objects.create(name='Bala', student_id='S002', enrolled_class=self.klass)
+
+        def paper(student):
+            return self.client.get(f'/api/question-papers/{self.exam.id}/student/?student_id={student.id}').json()
+
+        mine = paper(self.student)
+        self.assertEqual(mine, paper(self.student))
+        self.assertNotEqual([q['question_id'] for q in mine['questions']],
+                            [q['question_id'] for q in paper(other)['questions']])
+
+        answers = [{'question_id': q['question_id'],
+                    'selected_option': next(label for label, text in q['options'].items() if text == 'right')}
+                   for q in mine['questions']]
+        self.assertNotEqual({a['selected_option'] for a in answers}, {'A'})
+        response = self.client.post('/api/evaluate-exam/', {
+            'student_id': self.student.id, 'exam_schedule_id': self.exam.id, 'answers': answers
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['total_score'], 100)
@@ -1,6 +1,6 @@
 from django.urls import path,include
 from rest_framework.routers import DefaultRouter
-from .views import BoardViewSet,ClassViewSet,SubjectViewSet,ExamTypeViewSet,ExamPatternViewSet,VenueViewSet,ExamScheduleViewSet,smart_schedule_view
+from .views import BoardViewSet,ClassViewSet,SubjectViewSet,ExamTypeViewSet,ExamPatternViewSet,VenueViewSet,ExamScheduleViewSet,smart_schedule_view,repair_schedule_view,schedule_job_view,evaluate_exam,bulk_evaluate_view,generate_papers_view,student_paper_view,assessment_scores_view,assessment_weightages_view,assign_seats_view,autosave_answers_view,query_profile_view,import_view,export_results_view,timetable_view,cache_stats_view,exam_analytics_view,analytics_summaries_view,merit_list_view
 
 
 router = DefaultRouter()
@@ -18,4 +18,22 @@ router.register(r'exam-schedules', ExamScheduleViewSet)
 urlpatterns = [
     path('',include(router.urls)),
     path('smart-schedule/', smart_schedule_view, name = 'smart_schedule'),
+    path('smart-schedule/repair/', repair_schedule_view, name = 'repair_schedule'),
+    path('schedule-jobs/<int:job_id>/', schedule_job_view, name = 'schedule_job'),
+    path('evaluate-exam/', evaluate_exam, name = 'evaluate_exam'),
+    path('evaluate-exam/bulk/', bulk_evaluate_view, name = 'bulk_evaluate'),
+    path('question-papers/generate/', generate_papers_view, name = 'generate_papers'),
+    path('question-papers/<int:exam_schedule_id>/student/', student_paper_view, name = 'student_paper'),
+    path('assessment/scores/', assessment_scores_view, name = 'assessment_scores'),
+    path('assessment/weightages/', assessment_weightages_view, name = 'assessment_weightages'),
+    path('seating/assign/', assign_seats_view, name = 'assign_seats'),
+    path('answers/autosave/', autosave_answers_view, name = 'autosave_answers'),
+    path('profiling/queries/', query_profile_view, name = 'query_profile'),
+    path('profiling/cache/', cache_stats_view, name = 'cache_stats'),
+    path('imports/<str:kind>/', import_view, name = 'import'),
+    path('results/export/', export_results_view, name = 'export_results'),
+    path('results/merit-list/', merit_list_view, name = 'merit_list'),
+    path('timetable/', timetable_view, name = 'timetable'),
+    path('analytics/exams/<int:exam_schedule_id>/', exam_analytics_view, name = 'exam_analytics'),
+    path('analytics/summaries/', analytics_summaries_view, name = 'analytics_summaries'),
 ]
\ No newline at end of file
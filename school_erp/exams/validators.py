@@ -1,30 +1,49 @@
 from django.core.exceptions import ValidationError
+from django.db.models import Q, Sum
 from datetime import datetime, timedelta
-from .models import ExamSchedule, TeacherAvailability, Student, Question, StudentAnswer, ExamResult
+from .models import ExamSchedule, TeacherAvailability, Student, Question, StudentAnswer, ExamResult, Venue, VenueBooking
+from .shuffling import canonical_option
 
 def validate_exam_schedule(exam_data):
-    "Validate exam schedule for clashes"
+    "Validate exam schedule for class clashes and venue double-booking"
+    exam_id = exam_data.get('id')
     class_id = exam_data.get('class_assigned')
     date = exam_data.get('date')
     start_time = exam_data.get('start_time')
     duration = exam_data.get('duration_minutes')
     venue_id = exam_data.get('venue')
 
-    # Check for existing exams for the same class on the same date
-    existing_exams = ExamSchedule.objects.filter(
-        class_assigned_id=class_id,
-        date=date
-    )
-
-    exam_end_time = (datetime.combine(date, start_time) + timedelta(minutes=duration)).time()
-
-    for exam in existing_exams:
-        existing_end_time = (datetime.combine(date, exam.start_time) + 
-                           timedelta(minutes=exam.duration_minutes)).time()
-        
-        if ((start_time >= exam.start_time and start_time <= existing_end_time) or
-            (exam_end_time >= exam.start_time and exam_end_time <= existing_end_time)):
-            raise ValidationError(f"Exam clash detected for class {class_id} on {date}")
+    exam_end = datetime.combine(date, start_time) + timedelta(minutes=duration)
+    # end_time is compared as a time of day everywhere, so an exam must end on its own date
+    if exam_end.date() != date:
+        raise ValidationError(f"Exam on {date} starting at {start_time} must finish before midnight")
+    exam_end_time = exam_end.time()
+
+    # Exams on the same date whose [start_time, end_time) overlaps this one, tested in SQL
+    overlapping = ExamSchedule.objects.filter(
+        date=date,
+        start_time__lt=exam_end_time,
+        end_time__gt=start_time
+    ).exclude(id=exam_id)
+
+    if overlapping.filter(class_assigned_id=class_id).exists():
+        raise ValidationError(f"Exam clash detected for class {class_id} on {date}")
+
+    # Every exam in the venue at the same time has to fit, this one included. Exams split
+    # over rooms hold their booked seats, the rest their whole class in their own venue
+    booked = VenueBooking.objects.filter(exam_schedule__in=overlapping, venue_id=venue_id)
+    unbooked = overlapping.filter(venue_id=venue_id, venue_bookings__isnull=True)
+    own_bookings = VenueBooking.objects.filter(exam_schedule_id=exam_id) if exam_id else VenueBooking.objects.none()
+    if own_bookings.exists():
+        booked = booked | own_bookings.filter(venue_id=venue_id)
+        classes = Q(enrolled_class__in=unbooked.values('class_assigned'))
+    else:
+        classes = Q(enrolled_class_id=class_id) | Q(enrolled_class__in=unbooked.values('class_assigned'))
+    seats = Student.objects.filter(classes).count() + (booked.aggregate(seats=Sum('seats'))['seats'] or 0)
+    capacity = Venue.objects.values_list('capacity', flat=True).get(id=venue_id)
+    if seats > capacity:
+        raise ValidationError(
+            f"Venue {venue_id} is double-booked on {date}: {seats} seats needed, capacity {capacity}")
 
 def validate_teacher_availability(teacher_id, date, start_time, duration):
     "Validate teacher availability for exam supervision"
@@ -61,14 +80,20 @@ def validate_question_paper(questions):
 
     return True
 
-def validate_student_answers(student_id, exam_schedule_id, answers):
-    """Validate student answers before submission"""
+def validate_student_answers(student_id, exam_schedule_id, answers, exam=None, answer_key=None):
+    """
+    Validate student answers before submission.
+
+    Online exams show each student shuffled option labels, so every selected_option is
+    mapped back to its canonical Question.options key in place.
+    """
     # Check if student is registered for the exam
     if not Student.objects.filter(id=student_id).exists():
         raise ValidationError("Invalid student ID")
 
     # Check if exam exists and is ongoing
-    exam = ExamSchedule.objects.get(id=exam_schedule_id)
+    if exam is None:
+        exam = ExamSchedule.objects.get(id=exam_schedule_id)
     current_time = datetime.now().time()
     
     if current_time < exam.start_time:
@@ -79,16 +104,25 @@ def validate_student_answers(student_id, exam_schedule_id, answers):
     if current_time > exam_end_time:
         raise ValidationError("Exam has ended")
 
-    # Validate answer format for each question
+    # Validate answer format for each question against the exam's cached answer key
+    if answer_key is None:
+        from .grading import get_exam_answer_key
+        answer_key = get_exam_answer_key(exam)
     for answer in answers:
-        question = Question.objects.get(id=answer.question_id)
-        if not answer.selected_option in question.options:
-            raise ValidationError(f"Invalid option selected for question {question.id}")
-
-def calculate_grace_marks(student_id, exam_schedule_id, marks_obtained):
+        question_id = int(answer['question_id'])
+        if question_id not in answer_key:
+            raise ValidationError(f"Invalid question {question_id}")
+        selected_option = canonical_option(answer_key, question_id, answer['selected_option'], student_id, exam)
+        if selected_option is None:
+            raise ValidationError(f"Invalid option selected for question {question_id}")
+        answer['selected_option'] = selected_option
+    return answer_key
+
+def calculate_grace_marks(student_id, exam_schedule_id, marks_obtained, exam=None):
     """Calculate grace marks based on school policy"""
-    exam = ExamSchedule.objects.get(id=exam_schedule_id)
-    passing_marks = exam.passing_marks
+    if exam is None:
+        exam = ExamSchedule.objects.get(id=exam_schedule_id)
+    passing_marks = float(exam.passing_marks)
     max_grace = 5  # Maximum grace marks allowed
 
     if marks_obtained < passing_marks:
@@ -97,12 +131,13 @@ def calculate_grace_marks(student_id, exam_schedule_id, marks_obtained):
             return needed_grace
     return 0
 
-def validate_result_calculation(student_id, exam_schedule_id, marks_obtained, grace_marks=0):
+def validate_result_calculation(student_id, exam_schedule_id, marks_obtained, grace_marks=0, exam=None):
     """Validate result calculation including grace marks"""
     if marks_obtained < 0:
         raise ValidationError("Marks obtained cannot be negative")
 
-    exam = ExamSchedule.objects.get(id=exam_schedule_id)
+    if exam is None:
+        exam = ExamSchedule.objects.get(id=exam_schedule_id)
     
     # Validate against maximum marks
     if marks_obtained > exam.total_marks:
@@ -110,8 +145,18 @@ def validate_result_calculation(student_id, exam_schedule_id, marks_obtained, gr
 
     # Validate grace marks
     if grace_marks > 0:
-        calculated_grace = calculate_grace_marks(student_id, exam_schedule_id, marks_obtained)
+        calculated_grace = calculate_grace_marks(student_id, exam_schedule_id, marks_obtained - grace_marks, exam)
         if grace_marks > calculated_grace:
             raise ValidationError("Invalid grace marks applied")
 
-    return True
\ No newline at end of file
+    return True
+
+def validate_parameter_weightages(weightages):
+    """Validate that the assessment parameter weightages add up to 100 percent"""
+    if not weightages:
+        raise ValidationError("No assessment parameters defined")
+    if any(weightage < 0 for weightage in weightages.values()):
+        raise ValidationError("Weightages cannot be negative")
+    total = sum(weightages.values())
+    if abs(total - 100) > 0.01:
+        raise ValidationError(f"Assessment parameter weightages must add up to 100, got {round(total, 2)}")
@@ -1,68 +1,198 @@
+import hashlib
+import io
 import json
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.core.cache import caches
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.db.models import Sum
+from django.db.models import Sum, Max, Count
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from datetime import datetime, timedelta
 from collections import defaultdict
 from rest_framework.decorators import api_view,permission_classes
-from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticated
-from .models import Board, Class, Subject,Teacher, ExamType, ExamPattern,Venue,ExamSchedule,TeacherAvailability,Student,StudentAnswer,Question,ExamResult,ExamMode,GradeScale
-from .serializers import BoardSerializer,ClassSerializer,SubjectSerializer,ExamTypeSerializer,ExamPatternSerializer,VenueSerializer,ExamScheduleSerialzer
+from rest_framework import exceptions, viewsets
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from .models import Board, Class, Subject,Teacher, ExamType, ExamPattern,Venue,ExamSchedule,TeacherAvailability,Student,StudentAnswer,Question,ExamResult,ExamMode,GradeScale,ScheduleJob,ResultSummary
+from .serializers import BoardSerializer,ClassSerializer,SubjectSerializer,ExamTypeSerializer,ExamPatternSerializer,VenueSerializer,ExamScheduleSerialzer,TimetableEntrySerializer
+from .pagination import ExamScheduleCursorPagination
+from .caching import MASTER_DATA_CACHE, CachedListMixin, cache_stats, get_version, model_version_key
+from .analytics import refresh_summaries, serve_summaries, summary_as_dict
+from .merit import MERIT_COLUMNS, merit_list
+from .assessment import record_scores, update_weightages
+from .papers import generate_papers
+from .shuffling import student_paper
+from .scheduling import plan_schedule, repair_schedule
+from .seating import assign_seats
+from .jobs import submit_schedule_job, is_orphaned, fail_orphaned_jobs
+from .grading import score_answers, grade_exam, get_grade_bands, save_results
+from .autosave import answer_buffer
+from .profiling import profile_buffer, summarize
+from .importers import import_rows, read_rows
+from .exports import result_rows, stream_csv, stream_jsonl
 from .validators import validate_exam_schedule, validate_teacher_availability, validate_question_paper, validate_student_answers, validate_result_calculation, calculate_grace_marks
 from django.core.exceptions import ValidationError
 
 
-class BoardViewSet(viewsets.ModelViewSet):
+EXAM_SCHEDULE_FILTERS = {
+    'date': 'date',
+    'date_from': 'date__gte',
+    'date_to': 'date__lte',
+    'class': 'class_assigned_id',
+    'board': 'class_assigned__board_id',
+    'teacher': 'teacher_id',
+    'venue': 'venue_id',
+    'subject': 'subject_id',
+    'exam_type': 'exam_type_id',
+    'mode': 'mode',
+}
+
+
+def apply_filters(queryset, params, filter_params):
+    """Apply every query param named in filter_params, rejecting malformed values"""
+    for param, lookup in filter_params.items():
+        if param in params:
+            try:
+                queryset = queryset.filter(**{lookup: params[param]})
+            except (ValueError, ValidationError):
+                raise exceptions.ValidationError({param: f"Invalid value '{params[param]}'"})
+    return queryset
+
+
+def int_param(params, name, required=False):
+    """Integer query param or None when it is absent; anything else raises ValidationError"""
+    value = params.get(name)
+    if value in (None, ''):
+        if required:
+            raise ValidationError(f"{name} is required")
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError(f"{name} must be an integer, got '{value}'")
+
+
+class ListQueryMixin:
+    """
+    Query-param filters and sparse fieldsets for the read endpoints.
+
+    filter_params maps a query param to an ORM lookup. With ?fields=, only the
+    requested columns (plus the pagination ordering) are loaded from the database.
+    """
+    filter_params = {}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = self.request.query_params
+
+        queryset = apply_filters(queryset, params, self.filter_params)
+
+        requested = params.get('fields')
+        if requested and self.request.method == 'GET':
+            concrete = {field.name for field in queryset.model._meta.concrete_fields}
+            wanted = {name.strip() for name in requested.split(',')} & concrete
+            ordering = self.pagination_class.ordering if self.pagination_class else ()
+            ordering = [ordering] if isinstance(ordering, str) else list(ordering)
+            queryset = queryset.only('id', *wanted, *[field.lstrip('-') for field in ordering])
+        return queryset
+
+
+class BoardViewSet(CachedListMixin, ListQueryMixin, viewsets.ModelViewSet):
     queryset = Board.objects.all()
     serializer_class = BoardSerializer
     permission_classes = [IsAuthenticated]
 
 
-class ClassViewSet(viewsets.ModelViewSet):
+class ClassViewSet(CachedListMixin, ListQueryMixin, viewsets.ModelViewSet):
     queryset = Class.objects.all()
     serializer_class = ClassSerializer
     permission_classes = [IsAuthenticated]
+    filter_params = {'board': 'board_id'}
 
 
-class SubjectViewSet(viewsets.ModelViewSet):
+class SubjectViewSet(CachedListMixin, ListQueryMixin, viewsets.ModelViewSet):
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
     permission_classes = [IsAuthenticated]
+    filter_params = {'board': 'board_id'}
 
 
-class ExamTypeViewSet(viewsets.ModelViewSet):
+class ExamTypeViewSet(CachedListMixin, ListQueryMixin, viewsets.ModelViewSet):
     queryset = ExamType.objects.all()
     serializer_class = ExamTypeSerializer
     permission_classes = [IsAuthenticated]
 
 
-class ExamPatternViewSet(viewsets.ModelViewSet):
+class ExamPatternViewSet(CachedListMixin, ListQueryMixin, viewsets.ModelViewSet):
     queryset = ExamPattern.objects.all()
     serializer_class = ExamPatternSerializer
     permission_classes = [IsAuthenticated]
+    filter_params = {'board': 'board_id'}
 
 
-class VenueViewSet(viewsets.ModelViewSet):
+class VenueViewSet(CachedListMixin, ListQueryMixin, viewsets.ModelViewSet):
     queryset = Venue.objects.all()
     serializer_class = VenueSerializer
     permission_classes = [IsAuthenticated]
+    filter_params = {'min_capacity': 'capacity__gte'}
 
 
-class ExamScheduleViewSet(viewsets.ModelViewSet):
+class ExamScheduleViewSet(ListQueryMixin, viewsets.ModelViewSet):
     queryset = ExamSchedule.objects.all()
     serializer_class = ExamScheduleSerialzer
     permission_classes = [IsAuthenticated]
+    pagination_class = ExamScheduleCursorPagination
+    filter_params = EXAM_SCHEDULE_FILTERS
+
+
+TIMETABLE_MODELS = (Subject, Class, Teacher, Venue, ExamType)   # related rows named in each entry
+
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def timetable_view(request):
+    group_by = request.query_params.get('group_by')
+    if group_by not in (None, 'date', 'class'):
+        return JsonResponse({'error': "group_by must be 'date' or 'class'"}, status=400)
+
+    exams = apply_filters(ExamSchedule.objects.all(), request.query_params, EXAM_SCHEDULE_FILTERS)
+
+    # One aggregate decides whether the client's copy is still current. Names of the
+    # related rows are in the payload too, so their model versions are part of the tag.
+    stamp = exams.aggregate(changed=Max('updated_at'), rows=Count('id'), last_id=Max('id'))
+    versions = [get_version(caches[MASTER_DATA_CACHE], model_version_key(model)) for model in TIMETABLE_MODELS]
+    etag = hashlib.md5(
+        f"{request.get_full_path()}|{stamp['changed']}|{stamp['rows']}|{stamp['last_id']}|{versions}".encode()
+    ).hexdigest()
+    last_modified = stamp['changed'].timestamp() if stamp['changed'] else None
+    not_modified = get_conditional_response(request, etag=quote_etag(etag), last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    exams = exams.select_related(
+        'subject', 'class_assigned', 'teacher', 'venue', 'exam_type'
+    ).order_by('date', 'start_time', 'id')
+    entries = TimetableEntrySerializer(exams, many=True).data
+
+    if group_by is None:
+        payload = {'exams': entries}
+    else:
+        # Classes are grouped by id, two boards may well both have a "10-A"
+        groups = defaultdict(list)
+        labels = {}
+        for entry in entries:
+            key = entry['date'] if group_by == 'date' else entry['class']['id']
+            labels[key] = entry['date'] if group_by == 'date' else entry['class']['name']
+            groups[key].append(entry)
+        payload = {'group_by': group_by, 'groups': [{'key': key, 'label': labels[key], 'exams': items}
+                                                    for key, items in groups.items()]}
+
+    response = JsonResponse(payload)
+    response['ETag'] = quote_etag(etag)
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
 
-def is_teacher_available(teacher_id, date, start_time, duration):
-    exam_end_time = (datetime.combine(date,start_time) + timedelta(minutes=duration)).time()
-    slots = TeacherAvailability.objects.filter(teacher_id = teacher_id,date=date)
-    for slot in slots:
-        if slot.start_time <= start_time and slot.end_time >= exam_end_time:
-            return True
-    return False
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -70,97 +200,49 @@ def is_teacher_available(teacher_id, date, start_time, duration):
 def smart_schedule_view(request):
     try:
         data = json.loads(request.body)
-        exams = data.get('exams', [])
-        venues = data.get('venues', {})
-        start_time = datetime.strptime(data.get('start_date', '2025-09-10'), "%Y-%m-%d").date()
-
-        # Validate input data
-        if not exams:
-            raise ValidationError("No exams provided for scheduling")
-        if not venues:
-            raise ValidationError("No venues provided for scheduling")
-
-        schedule = []
-        student_exam_times = defaultdict(list)
-        venue_usage = defaultdict(lambda: defaultdict(int))
-        current_time = datetime.combine(start_time, datetime.strptime("09:00", "%H:%M").time())
-
-        for exam in exams:
-            # Validate exam data
-            required_fields = ['duration', 'students', 'venue_id', 'teacher_id', 
-                             'exam_type_id', 'exam_pattern_id', 'subject_id', 'class_id']
-            if not all(field in exam for field in required_fields):
-                raise ValidationError(f"Missing required fields in exam data: {required_fields}")
-
-            duration = exam["duration"]
-            students = exam["students"]
-            venue_id = exam["venue_id"]
-            teacher_id = exam["teacher_id"]
-            scheduled = False
-
-            while not scheduled:
-                clash = False
-                
-                # Validate venue capacity
-                if venue_usage[current_time.date()][venue_id] + len(students) > venues.get(str(venue_id), 0):
-                    clash = True
-
-                # Validate teacher availability
-                if not is_teacher_available(teacher_id, current_time.date(), current_time.time(), duration):
-                    clash = True
-
-                # Check student schedule clashes
-                for student in students:
-                    for t in student_exam_times[student]:
-                        if abs((current_time - t).total_seconds()) < duration * 60:
-                            clash = True
-                            break
-                    if clash:
-                        break
-
-                if not clash:
-                    # Create exam schedule with validation
-                    try:
-                        exam_schedule = ExamSchedule(
-                            exam_type_id=exam["exam_type_id"],
-                            exam_pattern_id=exam["exam_pattern_id"],
-                            subject_id=exam["subject_id"],
-                            class_assigned_id=exam["class_id"],
-                            teacher_id=teacher_id,
-                            date=current_time.date(),
-                            start_time=current_time.time(),
-                            duration_minutes=duration,
-                            venue_id=venue_id
-                        )
-                        exam_schedule.full_clean()  # This will run all model validations
-                        exam_schedule.save()
-                        
-                        schedule.append({
-                            "class_id": exam["class_id"],
-                            "subject_id": exam["subject_id"],
-                            "teacher_id": teacher_id,
-                            "date": current_time.date().isoformat(),
-                            "start_time": current_time.time().isoformat(timespec='minutes'),
-                            "duration": duration,
-                            "venue_id": venue_id
-                        })
-                        
-                        for student in students:
-                            student_exam_times[student].append(current_time)
-                        venue_usage[current_time.date()][venue_id] += len(students)
-                        scheduled = True
-                    except ValidationError as e:
-                        return JsonResponse({'error': str(e)}, status=400)
-                
-                if not scheduled:
-                    current_time += timedelta(minutes=duration + 30)
-
-        return JsonResponse({'scheduled_exams': schedule}, status=200)
+
+        # Long runs go to the background worker pool, the client polls the job
+        if data.get('async'):
+            job = submit_schedule_job(data)
+            return JsonResponse({'job_id': job.id, 'status': job.status}, status=202)
+
+        return JsonResponse(plan_schedule(data), status=200)
+    except ValidationError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def repair_schedule_view(request):
+    try:
+        return JsonResponse(repair_schedule(request.data), status=200)
     except ValidationError as e:
         return JsonResponse({'error': str(e)}, status=400)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def schedule_job_view(request, job_id):
+    try:
+        job = ScheduleJob.objects.get(id=job_id)
+    except ScheduleJob.DoesNotExist:
+        return JsonResponse({'error': f"Schedule job {job_id} not found"}, status=404)
+    if is_orphaned(job):
+        fail_orphaned_jobs([job.id])
+        job.refresh_from_db()
+
+    return JsonResponse({
+        'job_id': job.id,
+        'status': job.status,
+        'progress': job.progress,
+        'result': job.result,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'updated_at': job.updated_at.isoformat()
+    })
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def evaluate_exam(request):
@@ -170,38 +252,31 @@ def evaluate_exam(request):
         exam_schedule_id = data['exam_schedule_id']
         answers = data.get('answers', [])
 
-        # Validate student answers
-        validate_student_answers(student_id, exam_schedule_id, answers)
-
-        total_score = 0.0
-        for answer in answers:
-            if answer.selected_option == answer.question.correct_option:
-                total_score += answer.question.marks
+        # One exam fetch and one answer key fetch, shared by every validator
+        exam = ExamSchedule.objects.get(id=exam_schedule_id)
+        answer_key = validate_student_answers(student_id, exam_schedule_id, answers, exam)
+        total_score = score_answers(answers, answer_key)
 
         # Calculate grace marks if needed
-        grace_marks = calculate_grace_marks(student_id, exam_schedule_id, total_score)
+        grace_marks = calculate_grace_marks(student_id, exam_schedule_id, total_score, exam)
         final_score = total_score + grace_marks
 
         # Validate final result calculation
-        validate_result_calculation(student_id, exam_schedule_id, final_score, grace_marks)
+        validate_result_calculation(student_id, exam_schedule_id, final_score, grace_marks, exam)
 
         # Get appropriate grade
-        grade = None
-        for scale in GradeScale.objects.all():
-            if scale.min_score <= final_score <= scale.max_score:
-                grade = scale
-                break
-
-        ExamResult.objects.update_or_create(
-            student_id=student_id,
-            exam_schedule_id=exam_schedule_id,
-            defaults={
-                'marks_obtained': final_score,
-                'grade_scale': grade,
-                'is_manual': False,
-                'grace_marks': grace_marks
-            }
-        )
+        grade = get_grade_bands().lookup(final_score)
+
+        # A score outside every band is reported as ungraded and not stored, like grade_exam does
+        if grade is not None:
+            # Single INSERT ... ON CONFLICT on the unique (student, exam_schedule) pair
+            save_results([ExamResult(
+                student_id=student_id,
+                exam_schedule_id=exam_schedule_id,
+                marks_obtained=final_score,
+                graded_scale=grade,
+                is_manual=False
+            )])
 
         return JsonResponse({
             'student_id': student_id,
@@ -212,12 +287,271 @@ def evaluate_exam(request):
             'grade': grade.name if grade else "Ungraded"
         })
     
+    except ExamSchedule.DoesNotExist:
+        return JsonResponse({'error': f"Exam schedule {exam_schedule_id} not found"}, status=404)
     except ValidationError as e:
         return JsonResponse({'error': str(e)}, status=400)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_evaluate_view(request):
+    exam_schedule_id = request.data.get('exam_schedule_id')
+    try:
+        if not exam_schedule_id:
+            raise ValidationError("exam_schedule_id is required")
+        return JsonResponse(grade_exam(exam_schedule_id), status=200)
+    except ExamSchedule.DoesNotExist:
+        return JsonResponse({'error': f"Exam schedule {exam_schedule_id} not found"}, status=404)
+    except ValidationError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def assign_seats_view(request):
+    exam_schedule_id = request.data.get('exam_schedule_id')
+    try:
+        if not exam_schedule_id:
+            raise ValidationError("exam_schedule_id is required")
+        return JsonResponse(assign_seats(exam_schedule_id, request.data.get('venue_ids')), status=200)
+    except ExamSchedule.DoesNotExist:
+        return JsonResponse({'error': f"Exam schedule {exam_schedule_id} not found"}, status=404)
+    except ValidationError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def generate_papers_view(request):
+    data = request.data
+    exam_schedule_id = data.get('exam_schedule_id')
+    try:
+        if not exam_schedule_id or not data.get('questions'):
+            raise ValidationError("exam_schedule_id and questions are required")
+        # Form posts send every field as a string
+        try:
+            papers, questions = int(data.get('papers', 1)), int(data['questions'])
+            total_marks = float(data['total_marks']) if data.get('total_marks') not in (None, '') else None
+        except (TypeError, ValueError):
+            raise ValidationError("papers and questions must be integers and total_marks a number")
+        report = generate_papers(exam_schedule_id, papers, questions, total_marks, data.get('seed'))
+        return JsonResponse(report, status=200)
+    except ExamSchedule.DoesNotExist:
+        return JsonResponse({'error': f"Exam schedule {exam_schedule_id} not found"}, status=404)
+    except ValidationError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def student_paper_view(request, exam_schedule_id):
+    student_id = request.query_params.get('student_id')
+    try:
+        exam = ExamSchedule.objects.get(id=exam_schedule_id)
+        if not student_id or not Student.objects.filter(id=student_id).exists():
+            raise ValidationError("Invalid student ID")
+        # The paper is only handed out once the exam has begun
+        if datetime.now() < datetime.combine(exam.date, exam.start_time):
+            raise ValidationError("Exam has not started yet")
+        return JsonResponse(student_paper(exam, int(student_id)), status=200)
+    except ExamSchedule.DoesNotExist:
+        return JsonResponse({'error': f"Exam schedule {exam_schedule_id} not found"}, status=404)
+    except (ValidationError, ValueError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def assessment_scores_view(request):
+    exam_schedule_id = request.data.get('exam_schedule_id')
+    try:
+        if not exam_schedule_id:
+            raise ValidationError("exam_schedule_id is required")
+        return JsonResponse(record_scores(exam_schedule_id, request.data.get('scores', [])), status=200)
+    except ExamSchedule.DoesNotExist:
+        return JsonResponse({'error': f"Exam schedule {exam_schedule_id} not found"}, status=404)
+    except ValidationError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@api_view(['PUT'])
+@permission_classes([IsAdminUser])
+def assessment_weightages_view(request):
+    try:
+        return JsonResponse(update_weightages(request.data.get('weightages') or {}), status=200)
+    except ValidationError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def autosave_answers_view(request):
+    try:
+        data = request.data
+        student_id = data['student_id']
+        exam_schedule_id = data['exam_schedule_id']
+        answers = data.get('answers', [])
+        final = bool(data.get('final', False))
+
+        exam = ExamSchedule.objects.get(id=exam_schedule_id)
+        validate_student_answers(student_id, exam_schedule_id, answers, exam)
+
+        # Partial batches are buffered, a final submit writes the whole sheet now
+        if final:
+            flushed = answer_buffer.submit(student_id, exam_schedule_id, answers)
+        else:
+            flushed = answer_buffer.add(student_id, exam_schedule_id, answers)
+
+        return JsonResponse({
+            'student_id': student_id,
+            'exam_schedule_id': exam_schedule_id,
+            'received': len(answers),
+            'flushed': flushed,
+            'final': final
+        })
+    except ExamSchedule.DoesNotExist:
+        return JsonResponse({'error': f"Exam schedule {exam_schedule_id} not found"}, status=404)
+    except ValidationError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def query_profile_view(request):
+    records = profile_buffer.records()
+    return JsonResponse({
+        'sampled_requests': len(records),
+        'routes': summarize(records),
+        'recent': records[-50:]
+    })
+
+
+ANALYTICS_FILTERS = {
+    'class': 'class_assigned_id',
+    'board': 'class_assigned__board_id',
+    'subject': 'subject_id',
+    'exam_type': 'exam_schedule__exam_type_id',
+    'date_from': 'exam_schedule__date__gte',
+    'date_to': 'exam_schedule__date__lte',
+}
+MAX_ANALYTICS_ROWS = 1000
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def exam_analytics_view(request, exam_schedule_id):
+    summaries = ResultSummary.objects.filter(exam_schedule_id=exam_schedule_id)
+    if not summaries.exists():
+        # Results written before summaries existed, `rebuild_result_summaries` backfills all of them
+        if not refresh_summaries([exam_schedule_id]):
+            return JsonResponse({'error': f"Exam schedule {exam_schedule_id} not found"}, status=404)
+    return JsonResponse(summary_as_dict(serve_summaries(summaries)[0]))
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def analytics_summaries_view(request):
+    summaries = apply_filters(ResultSummary.objects.all(), request.query_params, ANALYTICS_FILTERS)
+    summaries = summaries.order_by('-exam_schedule__date', 'exam_schedule_id')[:MAX_ANALYTICS_ROWS]
+    return JsonResponse({'results': [summary_as_dict(summary) for summary in serve_summaries(summaries)]})
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats_view(request):
+    return JsonResponse({'master_data': cache_stats.snapshot()})
+
+
+MAX_REPORTED_IMPORT_ERRORS = 1000
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def import_view(request, kind):
+    try:
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError("Upload the data as a 'file' field")
+        fmt = request.data.get('format') or upload.name.rsplit('.', 1)[-1].lower()
+
+        errors = []
+        def on_error(row_number, message):
+            if len(errors) < MAX_REPORTED_IMPORT_ERRORS:
+                errors.append({'row': row_number, 'error': message})
+
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        report = import_rows(kind, read_rows(stream, fmt), on_error=on_error)
+        report['errors'] = errors
+        return JsonResponse(report, status=200)
+    except ValidationError as e:
+        return JsonResponse({'error': '; '.join(e.messages)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_results_view(request):
+    # 'format' is taken by DRF's format suffixes, so the file type comes in as 'output'
+    output = request.query_params.get('output', 'csv')
+    if output not in ('csv', 'jsonl'):
+        return JsonResponse({'error': "output must be 'csv' or 'jsonl'"}, status=400)
+
+    # The rows stream after the response has started, so bad filters are caught here
+    try:
+        rows = result_rows(
+            exam_type_id=int_param(request.query_params, 'exam_type'),
+            class_id=int_param(request.query_params, 'class'),
+            board_id=int_param(request.query_params, 'board')
+        )
+    except ValidationError as e:
+        return JsonResponse({'error': '; '.join(e.messages)}, status=400)
+    if output == 'csv':
+        response = StreamingHttpResponse(stream_csv(rows), content_type='text/csv')
+    else:
+        response = StreamingHttpResponse(stream_jsonl(rows), content_type='application/x-ndjson')
+    response['Content-Disposition'] = f'attachment; filename="exam_results.{output}"'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def merit_list_view(request):
+    output = request.query_params.get('output', 'jsonl')
+    if output not in ('csv', 'jsonl'):
+        return JsonResponse({'error': "output must be 'csv' or 'jsonl'"}, status=400)
+
+    # The rows stream after the response has started, so bad ids are caught here
+    try:
+        rows = merit_list(int_param(request.query_params, 'board', required=True),
+                          int_param(request.query_params, 'exam_type', required=True),
+                          subject_id=int_param(request.query_params, 'subject'),
+                          class_id=int_param(request.query_params, 'class'),
+                          method=request.query_params.get('method', 'auto'))
+    except ValidationError as e:
+        return JsonResponse({'error': '; '.join(e.messages)}, status=400)
+    if output == 'csv':
+        response = StreamingHttpResponse(stream_csv(rows, MERIT_COLUMNS), content_type='text/csv')
+    else:
+        response = StreamingHttpResponse(stream_jsonl(rows, MERIT_COLUMNS), content_type='application/x-ndjson')
+    response['Content-Disposition'] = f'attachment; filename="merit_list.{output}"'
+    return response
+
+
 
 
 # Create your views here.
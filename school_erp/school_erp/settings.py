@@ -50,8 +50,13 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'exams.middleware.QueryProfileMiddleware',
 ]
 
+# Per-route query profiling, see exams.middleware.QueryProfileMiddleware
+QUERY_PROFILE_SAMPLE_RATE = 0.1
+QUERY_PROFILE_DIR = BASE_DIR / 'query_profiles'
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES' : (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
@@ -59,6 +64,8 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CALSSES' : (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_PAGINATION_CLASS' : 'exams.pagination.IdCursorPagination',
+    'PAGE_SIZE' : 100,
 }
 
 
@@ -94,6 +101,36 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'school-erp',
+    },
+    # List responses of Board/Class/Subject/ExamType/ExamPattern/Venue, see exams.caching.
+    # The model version counters also feed the timetable ETag. Locmem evicts least
+    # recently used entries past MAX_ENTRIES. Swap in the file or database backend to
+    # share entries and version counters between worker processes.
+    'master_data': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'master-data',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+    # Version counters that retire per-process copies (grade bands, answer keys), see
+    # exams.caching.VERSION_CACHE. Every worker must read the same counters, so this
+    # cannot be locmem: the file backend is shared by the processes of one host, use
+    # Redis, Memcached or the database backend when workers run on several hosts.
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache' / 'versions',
+        'TIMEOUT': None,
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 